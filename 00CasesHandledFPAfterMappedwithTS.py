@@ -1,30 +1,33 @@
-import pandas as pd
 import os
+from AnalyticsStore import ANALYTICS_DB, AnalyticsStore
 
 # Define input and output paths
 input_file = '/home/iit/Downloads/Thesis/Data/SM_CP_FP/TS_FP/tsfp.csv'
 output_file = '/home/iit/Downloads/Thesis/Data/SM_CP_FP/TS_FP/00CaseHandlesFP.csv'
 
-# Read the input CSV
-df = pd.read_csv(input_file)
+# Query tsfp.csv through the analytics database (ingested only when the CSV changed)
+store = AnalyticsStore(ANALYTICS_DB)
+store.ensure_table('tsfp', input_file, project_column=None)
 
-# Print initial statistics
-print(f"Original number of rows: {len(df)}")
+# Count rows per (Prod_Is_Faulty, Test_Is_Faulty) case
+case_counts = store.count('tsfp', group_by=['Prod_Is_Faulty', 'Test_Is_Faulty'])
+cases = {(row.Prod_Is_Faulty, row.Test_Is_Faulty): row.Count for row in case_counts.itertuples()}
+total_rows = store.count('tsfp')
 
-# Create a mask for cases where either Production or Test is faulty
-faulty_mask = (df['Prod_Is_Faulty'] == 1) | (df['Test_Is_Faulty'] == 1)
+# Print initial statistics
+print(f"Original number of rows: {total_rows}")
 
-# Filter the dataframe to keep only cases where at least one is faulty
-filtered_df = df[faulty_mask]
+# Keep only cases where either Production or Test is faulty
+filtered_df = store.sql('SELECT * FROM tsfp WHERE "Prod_Is_Faulty" = 1 OR "Test_Is_Faulty" = 1 ORDER BY rowid')
 
 # Print detailed statistics about the filtering
 print("\nDetailed Statistics:")
 print("-" * 50)
 print("Cases in original dataset:")
-print(f"(0-0) Neither faulty: {len(df[~faulty_mask])}")
-print(f"(1-0) Only Production faulty: {len(df[(df['Prod_Is_Faulty'] == 1) & (df['Test_Is_Faulty'] == 0)])}")
-print(f"(0-1) Only Test faulty: {len(df[(df['Prod_Is_Faulty'] == 0) & (df['Test_Is_Faulty'] == 1)])}")
-print(f"(1-1) Both faulty: {len(df[(df['Prod_Is_Faulty'] == 1) & (df['Test_Is_Faulty'] == 1)])}")
+print(f"(0-0) Neither faulty: {total_rows - len(filtered_df)}")
+print(f"(1-0) Only Production faulty: {cases.get((1, 0), 0)}")
+print(f"(0-1) Only Test faulty: {cases.get((0, 1), 0)}")
+print(f"(1-1) Both faulty: {cases.get((1, 1), 0)}")
 
 # Create output directory if it doesn't exist
 os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -34,11 +37,13 @@ filtered_df.to_csv(output_file, index=False)
 
 # Print final statistics
 print(f"\nFinal number of rows (excluding 0-0 cases): {len(filtered_df)}")
-print(f"Number of rows removed: {len(df) - len(filtered_df)}")
+print(f"Number of rows removed: {total_rows - len(filtered_df)}")
 print(f"\nOutput file saved to: {output_file}")
 
 # Additional verification
 print("\nVerification of filtered dataset:")
 print("-" * 50)
 zero_zero_cases = len(filtered_df[(filtered_df['Prod_Is_Faulty'] == 0) & (filtered_df['Test_Is_Faulty'] == 0)])
-print(f"Number of (0-0) cases in filtered dataset: {zero_zero_cases} (should be 0)")
\ No newline at end of file
+print(f"Number of (0-0) cases in filtered dataset: {zero_zero_cases} (should be 0)")
+
+store.close()
@@ -0,0 +1,273 @@
+import os
+import re
+import time
+import sqlite3
+import argparse
+
+import pandas as pd
+from Schemas import SMELL_COLUMNS
+
+ANALYTICS_DB = '/home/iit/Downloads/Thesis/Data/SM_CP_FP/analytics.sqlite'
+
+# Columns indexed on ingestion, when present in the dataset
+PROJECT_COLUMN = 'Project'
+TEST_FILE_COLUMN = 'TestFile'
+FAULT_COLUMNS = ['Is_Faulty', 'ProdIs_Faulty', 'Prod_Is_Faulty', 'Test_Is_Faulty']
+INDEXED_COLUMNS = [PROJECT_COLUMN, TEST_FILE_COLUMN] + FAULT_COLUMNS + SMELL_COLUMNS + ['Total Smells', 'total_smells']
+
+SQL_OPERATORS = {'==': '=', '=': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>=',
+                 'in': 'IN', 'not in': 'NOT IN'}
+
+
+def quote(identifier):
+    """Quote a column or table name for SQL (smell columns contain spaces)."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def project_from_label(label):
+    """Project name from a Source_File label such as '_flask_final'."""
+    return re.sub(r'_final$', '', re.sub(r'^_', '', str(label)))
+
+
+def build_where(filters=None, projects=None):
+    """
+    Build a parameterized WHERE clause.
+
+    Parameters:
+    filters (list): (column, op, value) predicates combined with AND,
+        the same format as IntermediateStore filters
+    projects (list): Projects to keep
+
+    Returns:
+    tuple: (SQL clause or '', parameters)
+    """
+    clauses = []
+    params = []
+    for column, op, value in filters or []:
+        if op not in SQL_OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        if op in ('in', 'not in'):
+            values = list(value)
+            clauses.append(f"{quote(column)} {SQL_OPERATORS[op]} ({', '.join('?' * len(values))})")
+            params.extend(values)
+        else:
+            clauses.append(f"{quote(column)} {SQL_OPERATORS[op]} ?")
+            params.append(value)
+    if projects:
+        clauses.append(f"{quote(PROJECT_COLUMN)} IN ({', '.join('?' * len(projects))})")
+        params.extend(projects)
+    if not clauses:
+        return '', params
+    return ' WHERE ' + ' AND '.join(clauses), params
+
+
+class AnalyticsStore:
+    """
+    Final TS/CP/FP datasets kept in a local SQLite database for ad-hoc slicing.
+
+    Each dataset (e.g. Allcombined.csv, tsfp.csv) is one table with indexes on
+    the project, test file, fault flag and smell columns. The source file and its
+    modification time are recorded, so a table is only re-ingested when its CSV changes.
+
+    Parameters:
+    db_path (str): Path of the SQLite database file
+    """
+
+    def __init__(self, db_path=ANALYTICS_DB):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS _sources "
+                          "(table_name TEXT PRIMARY KEY, source_file TEXT, source_mtime REAL, rows INTEGER)")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tables(self):
+        return [row[0] for row in self.conn.execute("SELECT table_name FROM _sources ORDER BY table_name")]
+
+    def columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({quote(table)})")]
+
+    def is_current(self, table, source_file):
+        """Whether the table was ingested from this file and the file has not changed since."""
+        row = self.conn.execute("SELECT source_file, source_mtime FROM _sources WHERE table_name = ?",
+                                (table,)).fetchone()
+        return (row is not None and row[0] == os.path.abspath(source_file)
+                and row[1] >= os.path.getmtime(source_file))
+
+    def _create_indexes(self, table):
+        for column in self.columns(table):
+            if column in INDEXED_COLUMNS:
+                index_name = quote(f"idx_{table}_{column}".replace(' ', '_'))
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {quote(table)} ({quote(column)})")
+
+    def _prepare(self, chunk, project_column):
+        # Store a normalized Project column next to the original label column
+        if project_column and project_column in chunk.columns and PROJECT_COLUMN not in chunk.columns:
+            chunk[PROJECT_COLUMN] = chunk[project_column].map(project_from_label)
+        # Categoricals are written as their text values
+        for column in chunk.select_dtypes('category').columns:
+            chunk[column] = chunk[column].astype(object)
+        return chunk
+
+    def write_frame(self, table, df, project_column='Source_File', source_file=None):
+        """
+        Replace a table with the rows of a DataFrame and index it.
+
+        Parameters:
+        table (str): Table name
+        df (pd.DataFrame): Dataset rows
+        project_column (str): Column holding project labels, used to fill 'Project'
+        source_file (str): CSV the rows were written to, recorded for freshness checks
+
+        Returns:
+        int: Number of rows stored
+        """
+        with self.conn:
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+            self._prepare(df.copy(), project_column).to_sql(table, self.conn, index=False)
+            self._create_indexes(table)
+            self._record(table, source_file, len(df))
+        return len(df)
+
+    def ingest_csv(self, table, csv_file, project_column='Source_File', chunksize=100000):
+        """
+        Replace a table with the contents of a CSV file, streamed in chunks.
+
+        Returns:
+        int: Number of rows ingested
+        """
+        rows = 0
+        with self.conn:
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+            for chunk in pd.read_csv(csv_file, skipinitialspace=True, chunksize=chunksize):
+                self._prepare(chunk, project_column).to_sql(table, self.conn, index=False, if_exists='append')
+                rows += len(chunk)
+            self._create_indexes(table)
+            self._record(table, csv_file, rows)
+        return rows
+
+    def _record(self, table, source_file, rows):
+        if source_file is not None and os.path.exists(source_file):
+            source, mtime = os.path.abspath(source_file), os.path.getmtime(source_file)
+        else:
+            source, mtime = None, 0.0
+        self.conn.execute("INSERT OR REPLACE INTO _sources VALUES (?, ?, ?, ?)", (table, source, mtime, rows))
+
+    def ensure_table(self, table, csv_file, project_column='Source_File'):
+        """Ingest a CSV unless the table is already up to date with it."""
+        if not self.is_current(table, csv_file):
+            print(f"Ingesting {csv_file} into table '{table}'")
+            self.ingest_csv(table, csv_file, project_column)
+
+    def query(self, table, columns=None, filters=None, projects=None, limit=None):
+        """
+        Select rows of a table, in the order of the source file.
+
+        Parameters:
+        table (str): Table name
+        columns (list): Columns to return (default: all)
+        filters (list): (column, op, value) predicates combined with AND
+        projects (list): Projects to keep
+        limit (int): Maximum number of rows
+
+        Returns:
+        pd.DataFrame: Matching rows
+        """
+        select = ', '.join(quote(c) for c in columns) if columns else '*'
+        where, params = build_where(filters, projects)
+        statement = f"SELECT {select} FROM {quote(table)}{where} ORDER BY rowid"
+        if limit is not None:
+            statement += f" LIMIT {int(limit)}"
+        return pd.read_sql_query(statement, self.conn, params=params)
+
+    def count(self, table, filters=None, projects=None, group_by=None):
+        """Count rows matching the filters, optionally per value of the group_by columns."""
+        where, params = build_where(filters, projects)
+        if not group_by:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {quote(table)}{where}", params).fetchone()[0]
+        groups = ', '.join(quote(c) for c in group_by)
+        statement = f"SELECT {groups}, COUNT(*) AS Count FROM {quote(table)}{where} GROUP BY {groups} ORDER BY {groups}"
+        return pd.read_sql_query(statement, self.conn, params=params)
+
+    def sql(self, statement, params=()):
+        """Run a raw SELECT statement."""
+        return pd.read_sql_query(statement, self.conn, params=params)
+
+
+def ingest_dataset(db_path, table, csv_file, project_column='Source_File'):
+    """Load a dataset CSV into a table of the analytics database."""
+    with AnalyticsStore(db_path) as store:
+        return store.ingest_csv(table, csv_file, project_column)
+
+
+def parse_value(value):
+    """CLI filter values are numbers when they look like numbers."""
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the final TS/CP/FP datasets from a local SQLite database')
+    parser.add_argument('--db', help='Path of the analytics database', default=ANALYTICS_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Load a dataset CSV into a table')
+    ingest_parser.add_argument('table', help='Table name, e.g. combined or tsfp')
+    ingest_parser.add_argument('csv_file', help='Dataset CSV file')
+    ingest_parser.add_argument('--project_column', default='Source_File',
+                               help='Column with project labels used to fill the Project column')
+
+    query_parser = subparsers.add_parser('query', help='Select rows of a table')
+    query_parser.add_argument('table', help='Table name')
+    query_parser.add_argument('--columns', nargs='+', help='Columns to return')
+    query_parser.add_argument('--filter', nargs=3, action='append', metavar=('COLUMN', 'OP', 'VALUE'),
+                              help="Predicate such as --filter 'Sleepy Test' '>' 0 (repeatable)")
+    query_parser.add_argument('--project', action='append', help='Project to keep (repeatable)')
+    query_parser.add_argument('--limit', type=int, help='Maximum number of rows')
+    query_parser.add_argument('--count', action='store_true', help='Only print the number of matching rows')
+    query_parser.add_argument('--output', help='Write the rows to this CSV file instead of printing them')
+
+    subparsers.add_parser('tables', help='List the ingested tables')
+
+    args = parser.parse_args()
+
+    with AnalyticsStore(args.db) as store:
+        if args.command == 'ingest':
+            start = time.time()
+            rows = store.ingest_csv(args.table, args.csv_file, args.project_column)
+            print(f"Ingested {rows} rows into '{args.table}' in {time.time() - start:.1f}s")
+
+        elif args.command == 'tables':
+            for table in store.tables():
+                print(f"{table}: {store.count(table)} rows")
+
+        else:
+            filters = [(column, op, parse_value(value)) for column, op, value in args.filter or []]
+            if args.count:
+                print(store.count(args.table, filters, args.project))
+                return
+            start = time.time()
+            result = store.query(args.table, args.columns, filters, args.project, args.limit)
+            if args.output:
+                result.to_csv(args.output, index=False)
+                print(f"{len(result)} rows saved to {args.output}")
+            else:
+                print(result.to_string(index=False))
+            print(f"\n{len(result)} rows in {time.time() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
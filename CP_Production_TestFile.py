@@ -1,6 +1,9 @@
 import pandas as pd
 import os
 import re
+from PathIndex import PATH_INDEX_DIR, project_dictionary
+from Schemas import load_csv
+from IntermediateStore import open_store
 
 def is_test_file(filename):
     """Determine if a file is a test file"""
@@ -45,10 +48,10 @@ def find_matching_files(files):
     
     return file_pairs
 
-def transform_csv(input_path, output_path):
+def transform_csv(input_path, output_path, dictionary=None):
     """Transform CSV data to group test and production files together with their metrics."""
     # Read input CSV
-    data = pd.read_csv(input_path)
+    data = load_csv(input_path, 'cp_analysis')
     
     # Get all unique filenames
     all_files = data['Filename'].unique()
@@ -99,26 +102,46 @@ def transform_csv(input_path, output_path):
     # Convert to DataFrame
     result_df = pd.DataFrame(paired_data)
     
+    # Attach the project-wide file IDs ('N/A' marks a production file without test)
+    if dictionary is not None and not result_df.empty:
+        result_df['ProductionFileID'] = dictionary.intern_series(result_df['ProductionFile'])
+        result_df['TestFileID'] = dictionary.intern_series(result_df['TestFile'].where(result_df['TestFile'] != 'N/A'))
+    
     # Save transformed CSV
     result_df.to_csv(output_path, index=False)
     print(f"Transformed CSV saved to: {output_path}")
+    return result_df
 
-# Process all CSVs in the input directory
-input_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/ChangeProneness_analysis_results"
-output_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/CP_Summary"
-
-# Ensure output directory exists
-os.makedirs(output_dir, exist_ok=True)
+def transform_all(input_dir, output_dir, index_dir=PATH_INDEX_DIR, store=None):
+    """
+    Transform every '<project>_analysis.csv' of input_dir into '<project>_transformed.csv'.
+    With an IntermediateStore (or its directory), each result is also stored typed
+    under the 'cp_transformed' stage for the stages that read it.
+    """
+    # Ensure output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+    store = open_store(store)
+    
+    # Process each CSV file
+    for filename in os.listdir(input_dir):
+        if filename.endswith('_analysis.csv'):
+            input_path = os.path.join(input_dir, filename)
+            # Create output filename
+            output_filename = filename.replace('_analysis.csv', '_transformed.csv')
+            output_path = os.path.join(output_dir, output_filename)
+            
+            try:
+                project = filename.replace('_analysis.csv', '')
+                with project_dictionary(project, index_dir) as dictionary:
+                    result_df = transform_csv(input_path, output_path, dictionary)
+                if store is not None:
+                    store.put('cp_transformed', project, result_df, output_path, 'cp_transformed')
+            except Exception as e:
+                print(f"Error processing {filename}: {e}")
 
-# Process each CSV file
-for filename in os.listdir(input_dir):
-    if filename.endswith('_analysis.csv'):
-        input_path = os.path.join(input_dir, filename)
-        # Create output filename
-        output_filename = filename.replace('_analysis.csv', '_transformed.csv')
-        output_path = os.path.join(output_dir, output_filename)
-        
-        try:
-            transform_csv(input_path, output_path)
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    # Process all CSVs in the input directory
+    input_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/ChangeProneness_analysis_results"
+    output_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/CP_Summary"
+    
+    transform_all(input_dir, output_dir)
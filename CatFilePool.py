@@ -0,0 +1,232 @@
+import re
+import queue
+import argparse
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Revisions that always name the same object and can be cached: a full object ID,
+# optionally followed by ':<path>'
+IMMUTABLE_REVISION = re.compile(r'^[0-9a-f]{40}(:.*)?$', re.S)
+
+
+class CatFileProcess:
+    """One long-lived 'git cat-file --batch' process."""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.process = None
+        self.start()
+
+    def start(self):
+        self.process = subprocess.Popen(['git', '-C', str(self.repo_path), 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def read(self, revision: str) -> Optional[Tuple[str, str, bytes]]:
+        """
+        Read one object.
+
+        Returns:
+        tuple: (object ID, type, content), or None if the revision names no object
+        """
+        if '\n' in revision:
+            raise ValueError(f"Invalid revision: {revision!r}")
+        if self.process.poll() is not None:
+            self.start()
+        self.process.stdin.write(revision.encode('utf-8') + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().decode('utf-8', errors='replace').rstrip('\n')
+        if not header:
+            raise RuntimeError(f"git cat-file exited in {self.repo_path}")
+        fields = header.split()
+        if len(fields) != 3 or fields[-1] in ('missing', 'ambiguous'):
+            return None
+        object_id, object_type, size = fields
+        content = self.process.stdout.read(int(size))
+        if len(content) != int(size) or self.process.stdout.read(1) != b'\n':
+            raise RuntimeError(f"git cat-file exited in {self.repo_path} while sending {object_id}")
+        return object_id, object_type, content
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def restart(self):
+        """Kill the process, whatever it was sending, and start a fresh one."""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.start()
+
+
+class ObjectCache:
+    """LRU cache of decoded objects, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.items: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.items:
+                self.bytes -= self.items.pop(key)[1]
+            self.items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self.items.popitem(last=False)
+                self.bytes -= evicted_size
+
+
+def parse_commit(content: bytes) -> Dict:
+    """Split a raw commit object into tree, parents, author, committer and message."""
+    header, _, message = content.decode('utf-8', errors='replace').partition('\n\n')
+    commit = {'tree': None, 'parents': [], 'author': '', 'committer': '', 'message': message}
+    for line in header.split('\n'):
+        key, _, value = line.partition(' ')
+        if key == 'parent':
+            commit['parents'].append(value)
+        elif key in ('tree', 'author', 'committer'):
+            commit[key] = value
+    return commit
+
+
+class CatFilePool:
+    """
+    Shared object access for a repository: N long-lived 'git cat-file --batch'
+    processes behind an LRU cache of decoded objects.
+
+    Requests from any number of threads are spread over the processes; a
+    process is used by one request at a time. Only revisions that always name
+    the same object (full object IDs, '<commit ID>:<path>') are cached.
+
+    Parameters:
+    repo_path (str): Path to the Git repository
+    processes (int): Number of cat-file processes
+    cache_bytes (int): Maximum total size of the cached objects
+    """
+
+    def __init__(self, repo_path: str, processes: int = 2, cache_bytes: int = 64 * 2**20):
+        self.repo_path = str(repo_path)
+        self.workers = [CatFileProcess(self.repo_path) for _ in range(max(1, processes))]
+        self.idle = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.cache = ObjectCache(cache_bytes)
+
+    def _read(self, revision: str):
+        worker = self.idle.get()
+        try:
+            try:
+                return worker.read(revision)
+            except (BrokenPipeError, RuntimeError):
+                # The process died (e.g. killed by the OOM killer): restart it and retry once
+                worker.restart()
+                return worker.read(revision)
+        except BaseException:
+            # A read that failed half-way may leave the rest of a reply in the pipe,
+            # which the next request would take for its own: never reuse that process
+            worker.restart()
+            raise
+        finally:
+            self.idle.put(worker)
+
+    def _get(self, revision: str, kind: str, decode):
+        cacheable = IMMUTABLE_REVISION.match(revision) is not None
+        key = (kind, revision)
+        if cacheable:
+            value = self.cache.get(key)
+            if value is not None:
+                return value
+        item = self._read(revision)
+        if item is None:
+            return None
+        value = decode(item)
+        if cacheable:
+            self.cache.put(key, value, len(item[2]))
+        return value
+
+    def read(self, revision: str) -> Optional[Tuple[str, str, bytes]]:
+        """(object ID, type, content) of a revision, or None if it does not exist."""
+        return self._get(revision, 'raw', lambda item: item)
+
+    def blob(self, revision: str) -> Optional[bytes]:
+        return self._get(revision, 'blob', lambda item: item[2] if item[1] == 'blob' else None)
+
+    def text(self, revision: str) -> Optional[str]:
+        return self._get(revision, 'text',
+                         lambda item: item[2].decode('utf-8', errors='replace') if item[1] == 'blob' else None)
+
+    def file_at(self, commit: str, path: str) -> Optional[str]:
+        """Content of a file at a commit as text, or None if it did not exist there."""
+        return self.text(f'{commit}:{path}')
+
+    def commit(self, revision: str) -> Optional[Dict]:
+        return self._get(revision, 'commit', lambda item: parse_commit(item[2]) if item[1] == 'commit' else None)
+
+    def message(self, revision: str) -> str:
+        commit = self.commit(revision)
+        return commit['message'] if commit else ''
+
+    def read_many(self, revisions: Iterable[str], kind: str = 'text') -> List:
+        """Fetch many objects over all processes at once; results are in request order."""
+        getter = getattr(self, kind)
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+            return list(executor.map(getter, revisions))
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.cache.hits, 'misses': self.cache.misses,
+                'cached_objects': len(self.cache.items), 'cached_bytes': self.cache.bytes}
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read objects of a repository through a cat-file pool')
+    parser.add_argument('repo_path', help='Path to the Git repository')
+    parser.add_argument('revisions', nargs='+', help='Revisions to read, e.g. HEAD:setup.py')
+    parser.add_argument('--processes', type=int, default=2, help='Number of cat-file processes')
+    args = parser.parse_args()
+
+    with CatFilePool(args.repo_path, args.processes) as pool:
+        for revision, item in zip(args.revisions, pool.read_many(args.revisions, 'read')):
+            if item is None:
+                print(f"{revision}: missing")
+            else:
+                print(f"{revision}: {item[1]} {item[0]} ({len(item[2])} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,58 @@
 # Python script (analyze_projects.py)
 import os
+import time
+import uuid
+import argparse
+import subprocess
 import pandas as pd
+from WorkQueue import WorkQueue
 
 # Path to the directory containing Python projects
 projects_path = "/home/iit/Downloads/Thesis/Pynose_Projects"
 
-def analyze_projects():
-    # Get absolute path for output directory
+def default_output_dir():
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(current_dir, "ChangeProneness_analysis_results")
+    return os.path.join(current_dir, "ChangeProneness_analysis_results")
+
+def analyze_project(project, project_path, output_dir, cancelled=None, poll_interval=1.0):
+    """
+    Run CP.sh on one project; returns its exit status.
+
+    CP.sh writes to a partial file of its own that is renamed into place only on
+    success. Once cancelled() returns True (e.g. the project's lease was lost),
+    CP.sh is killed and its output discarded, so two workers never write the
+    same CSV.
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    print(f"Analyzing project: {project}")
+    
+    # Generate CSV filename with absolute path
+    csv_filename = f"{project}_analysis.csv"
+    csv_path = os.path.join(output_dir, csv_filename)
+    partial_path = f"{csv_path}.{uuid.uuid4().hex}.partial"
+    
+    # Run the bash script for analysis
+    process = subprocess.Popen(['bash', os.path.join(current_dir, 'CP.sh'), project, project_path, partial_path])
+    while process.poll() is None and not (cancelled is not None and cancelled()):
+        time.sleep(poll_interval)
+    if process.poll() is None:
+        print(f"Cancelled analysis of {project}")
+        process.kill()
+        process.wait()
+    
+    # Keep the output only if CP.sh succeeded and the project is still ours
+    if process.returncode == 0 and not (cancelled is not None and cancelled()) and os.path.exists(partial_path):
+        os.replace(partial_path, csv_path)
+    elif os.path.exists(partial_path):
+        os.remove(partial_path)
+    return process.returncode
+
+def analyze_projects(projects_dir=projects_path, output_dir=None):
+    """Run CP.sh on every project; raises RuntimeError naming the projects whose run failed."""
+    # Get absolute path for output directory
+    if output_dir is None:
+        output_dir = default_output_dir()
     
     # Create the output directory if it doesn't exist
     if not os.path.exists(output_dir):
@@ -16,23 +60,60 @@ def analyze_projects():
         print(f"Created output directory: {output_dir}")
 
     # Iterate through each project in the directory
-    for project in os.listdir(projects_path):
-        project_path = os.path.join(projects_path, project)
+    failed = {}
+    for project in os.listdir(projects_dir):
+        project_path = os.path.join(projects_dir, project)
         
         # Skip if not a directory
         if not os.path.isdir(project_path):
             continue
             
-        print(f"Analyzing project: {project}")
-        
-        # Generate CSV filename with absolute path
-        csv_filename = f"{project}_analysis.csv"
-        csv_path = os.path.join(output_dir, csv_filename)
-        
-        # Run the bash script for analysis
-        command = f"bash CP.sh '{project}' '{project_path}' '{csv_path}'"
-        os.system(command)
+        status = analyze_project(project, project_path, output_dir)
+        if status != 0:
+            print(f"CP.sh failed for {project} with status {status}")
+            failed[project] = status
+    
+    # A failed project must fail the stage, or the Pipeline would cache it as done
+    if failed:
+        raise RuntimeError(f"CP.sh failed for {len(failed)} projects: "
+                           + ', '.join(f'{project} ({status})' for project, status in sorted(failed.items())))
+
+def analyze_projects_from_queue(queue_dir, projects_dir=projects_path, output_dir=None, lease_timeout=600.0):
+    """Analyze projects claimed from a work queue shared by workers on any number of hosts."""
+    if output_dir is None:
+        output_dir = default_output_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    queue = WorkQueue(queue_dir, lease_timeout)
+    for project in sorted(os.listdir(projects_dir)):
+        if os.path.isdir(os.path.join(projects_dir, project)):
+            queue.enqueue(project)
+    
+    for lease in queue.work():
+        with lease:
+            status = analyze_project(lease.name, os.path.join(projects_dir, lease.name), output_dir,
+                                     cancelled=lambda: not lease.held())
+            if lease.lost:
+                # Another worker owns the task now: give it up without marking it done
+                lease.release()
+            elif status != 0:
+                lease.fail(f"CP.sh exited with status {status}")
+            else:
+                lease.complete()
+    
+    print(f"Queue drained: {queue.counts()}")
 
 if __name__ == "__main__":
-    analyze_projects()
+    parser = argparse.ArgumentParser(description='Run the change proneness analysis of every project')
+    parser.add_argument('--projects_dir', help='Directory containing the projects', default=projects_path)
+    parser.add_argument('--output_dir', help='Output directory (default: ChangeProneness_analysis_results next to this script)')
+    parser.add_argument('--queue_dir', help='Pull projects from a shared work queue')
+    parser.add_argument('--lease_timeout', type=float, default=600.0,
+                        help='Seconds without a heartbeat after which a queued project is reclaimed')
+    args = parser.parse_args()
+    
+    if args.queue_dir:
+        analyze_projects_from_queue(args.queue_dir, args.projects_dir, args.output_dir, args.lease_timeout)
+    else:
+        analyze_projects(args.projects_dir, args.output_dir)
 
@@ -0,0 +1,215 @@
+import io
+import os
+import csv
+import json
+import glob
+import time
+import subprocess
+
+
+def repo_head(repo_path):
+    """Commit checked out in a repository, or None if it cannot be read."""
+    result = subprocess.run(['git', '-C', str(repo_path), 'rev-parse', 'HEAD'],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode('ascii').strip() or None
+
+
+def remove_partials(output_dir):
+    """Delete the '.partial' files (and their keys) of interrupted runs in a directory."""
+    for partial_file in glob.glob(os.path.join(glob.escape(output_dir), '*.partial*')):
+        os.remove(partial_file)
+
+
+class RunJournal:
+    """
+    Append-only journal of the units (e.g. repositories) a long run has completed.
+
+    Each line is a JSON record {"name": ..., "finished": ..., **details}. A rerun
+    skips the units recorded here, so a crash on repo 37 resumes at repo 37.
+    Details such as the repository's HEAD and the run parameters can be compared
+    in is_done, so a unit is run again when its input or the parameters changed.
+
+    Parameters:
+    journal_file (str): Path of the journal (JSON lines)
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.records = {}
+        if os.path.exists(journal_file):
+            with open(journal_file) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line of a killed run
+                        continue
+                    self.records[record['name']] = record
+
+    def is_done(self, name, output_file=None, **details):
+        """
+        Whether a unit completed, its output (if given) still exists and its
+        record has the given details (e.g. head=..., params=...).
+        """
+        record = self.records.get(name)
+        if record is None or (output_file is not None and not os.path.exists(output_file)):
+            return False
+        return all(record.get(key) == value for key, value in details.items())
+
+    def record(self, name, **details):
+        record = {'name': name, 'finished': time.strftime('%Y-%m-%d %H:%M:%S'), **details}
+        os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+        with open(self.journal_file, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[name] = record
+
+    def reset(self, partial_dir=None):
+        """Forget all units; with partial_dir, also delete the partial outputs there so nothing is resumed."""
+        self.records = {}
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        if partial_dir is not None:
+            remove_partials(partial_dir)
+
+
+class RunCancelled(Exception):
+    """Raised by CheckpointedCSV when its run was cancelled, e.g. because its lease was lost."""
+
+
+class CheckpointedCSV:
+    """
+    CSV output written to '<output_file>.partial' in flushed batches and renamed
+    into place only when complete, so a partial CSV is never mistaken for a
+    finished one.
+
+    Reopening resumes an existing partial file: rows already written are kept
+    (a torn last row is dropped) and their keys are exposed as `done`. With a
+    run_key (e.g. the repository's HEAD and the run parameters), a partial file
+    is only resumed by a run with the same key; it is kept in '<partial>.key'.
+
+    Rows are buffered in memory between flushes. When the cancelled callable
+    returns True, the next flush or commit raises RunCancelled and the buffered
+    rows are dropped, so a worker that lost its task never writes to a partial
+    file the new owner is using.
+
+    Parameters:
+    output_file (str): Final CSV path
+    header (list): Column names
+    key_column (str): Column identifying a row, used to skip finished work on resume
+    batch_size (int): Number of rows between flushes to disk
+    on_flush (callable): Called after every flush, e.g. to persist state the rows refer to
+    flush_interval (float): Maximum seconds between flushes, so slow runs still show progress
+    run_key (dict): JSON-serializable identity of the run that wrote the partial file
+    cancelled (callable): Returns True once the run must stop writing
+    """
+
+    def __init__(self, output_file, header, key_column, batch_size=100, on_flush=None, flush_interval=None,
+                 run_key=None, cancelled=None):
+        self.output_file = output_file
+        self.partial_file = output_file + '.partial'
+        self.key_file = self.partial_file + '.key'
+        self.run_key = run_key
+        self.header = list(header)
+        self.key_index = self.header.index(key_column)
+        self.batch_size = max(1, batch_size)
+        self.on_flush = on_flush
+        self.cancelled = cancelled
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+        self.done = set()
+        self.rows = 0
+        self.pending = 0
+        self.file = None
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.output_file) or '.', exist_ok=True)
+        if os.path.exists(self.partial_file) and self._same_run() and self._resume():
+            self.file = open(self.partial_file, 'a', newline='')
+            print(f"Resuming {self.partial_file} after {self.rows} rows")
+        else:
+            with open(self.partial_file, 'w', newline='') as f:
+                csv.writer(f).writerow(self.header)
+            # Appends only, so a late write can never overwrite rows at an earlier offset
+            self.file = open(self.partial_file, 'a', newline='')
+            if self.run_key is not None:
+                with open(self.key_file, 'w') as f:
+                    json.dump(self.run_key, f)
+        return self
+
+    def _same_run(self):
+        if self.run_key is None:
+            return True
+        try:
+            with open(self.key_file) as f:
+                return json.load(f) == self.run_key
+        except (OSError, json.JSONDecodeError):
+            return False
+
+    def _resume(self):
+        with open(self.partial_file, 'rb') as f:
+            content = f.read()
+        # Drop a row torn by a kill in the middle of a write
+        complete = content[:content.rfind(b'\n') + 1]
+        if len(complete) != len(content):
+            with open(self.partial_file, 'r+b') as f:
+                f.truncate(len(complete))
+
+        rows = list(csv.reader(complete.decode('utf-8').splitlines()))
+        if not rows or rows[0] != self.header:
+            return False
+        for row in rows[1:]:
+            if len(row) == len(self.header):
+                self.done.add(row[self.key_index])
+                self.rows += 1
+        return True
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.done.add(str(row[self.key_index]))
+        self.rows += 1
+        self.pending += 1
+        if self.pending >= self.batch_size or (
+                self.flush_interval is not None and time.time() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def _is_cancelled(self):
+        return self.cancelled is not None and self.cancelled()
+
+    def flush(self):
+        if self._is_cancelled():
+            raise RunCancelled(f"Writing {self.output_file} was cancelled; dropped {self.pending} unflushed rows")
+        if self.on_flush is not None:
+            self.on_flush()
+        self.file.write(self.buffer.getvalue())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_flush = time.time()
+
+    def commit(self):
+        """Flush the remaining rows and atomically move the partial file into place."""
+        self.flush()
+        self.file.close()
+        os.replace(self.partial_file, self.output_file)
+        if os.path.exists(self.key_file):
+            os.remove(self.key_file)
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            if not self._is_cancelled():
+                self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,3 @@
-import os
-import subprocess
-import time
-
 # Target directory
 CLONE_DIR = "/home/iit/Downloads/Thesis/Pynose_Projects"
 
@@ -38,17 +34,17 @@ projects = [
 "https://github.com/aiortc/aiortc.git",
 "https://github.com/airspeed-velocity/asv.git",
 "https://github.com/aldebaran/qibuild.git",
-"https://github.com/arrow-py/arrow.git"
+"https://github.com/arrow-py/arrow.git",
 "https://github.com/arsenetar/dupeguru.git",
-"https://github.com/asciidoc/asciidoc-py3.git"
-"https://github.com/asdf-format/asdf.git"
-"https://github.com/astropy/astroplan.git"
+"https://github.com/asciidoc/asciidoc-py3.git",
+"https://github.com/asdf-format/asdf.git",
+"https://github.com/astropy/astroplan.git",
 "https://github.com/authomatic/authomatic.git",
 "https://github.com/automl/SMAC3.git",
 "https://github.com/automl/auto-sklearn.git",
 "https://github.com/autorope/donkeycar.git",
 "https://github.com/avocado-framework/avocado.git",
-"https://github.com/awesto/django-shop.git"
+"https://github.com/awesto/django-shop.git",
 "https://github.com/aws-cloudformation/cfn-python-lint.git",
 "https://github.com/aws-quickstart/taskcat.git",
 "https://github.com/aws/aws-cli.git",
@@ -69,45 +65,17 @@ projects = [
 "https://github.com/gitpython-developers/GitPython.git",
 "https://github.com/psd-tools/psd-tools.git",
 "https://github.com/pydoit/doit.git",
-"https://github.com/thouska/spotpy.git"
+"https://github.com/thouska/spotpy.git",
 "https://github.com/whoosh-community/whoosh.git"
 ]
 
-def clone_projects():
-    # Create directory if it doesn't exist
-    if not os.path.exists(CLONE_DIR):
-        os.makedirs(CLONE_DIR)
-        print(f"Created directory: {CLONE_DIR}")
-
-    # Change to the target directory
-    os.chdir(CLONE_DIR)
-    print(f"Changed to directory: {CLONE_DIR}")
-
-    # Clone each project
-    for i, repo_url in enumerate(projects, 1):
-        # Extract project name from URL
-        project_name = repo_url.split('/')[-1].replace('.git', '')
-        
-        # Skip if project already exists
-        if os.path.exists(os.path.join(CLONE_DIR, project_name)):
-            print(f"[{i}/50] Skipping {project_name} - already exists")
-            continue
-
-        print(f"[{i}/50] Cloning {project_name}...")
-        try:
-            # Clone with depth=1 to save time and space
-            subprocess.run(['git', 'clone', repo_url], 
-                         check=True, 
-                         stdout=subprocess.PIPE, 
-                         stderr=subprocess.PIPE)
-            print(f"Successfully cloned {project_name}")
-            
-            # Small delay to avoid overwhelming the server
-            time.sleep(1)
-            
-        except subprocess.CalledProcessError as e:
-            print(f"Error cloning {project_name}: {e}")
-            continue
+def clone_projects(mode='full', jobs=8, clone_dir=CLONE_DIR, status_file=None):
+    """Clone the projects concurrently, fetching updates into existing clones (see CloneManager)."""
+    from CloneManager import MINING_MODES, clone_all
+    # These clones are what the mining stages read, so they need working trees
+    if mode not in MINING_MODES:
+        raise ValueError(f"Mode '{mode}' cannot be mined, expected one of {MINING_MODES}")
+    return clone_all(projects, clone_dir, mode=mode, jobs=jobs, status_file=status_file)
 
 if __name__ == "__main__":
     print("Starting to clone 50 Python projects...")
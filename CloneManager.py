@@ -0,0 +1,218 @@
+import os
+import re
+import time
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+MODES = ['full', 'blobless', 'mirror']
+# The miners read working trees; a bare mirror is only an archive of the history
+MINING_MODES = ['full', 'blobless']
+STATUS_COLUMNS = ['Project', 'URL', 'Mode', 'Action', 'Status', 'Seconds', 'Error']
+
+
+def project_name(url):
+    """Project name of a repository URL or path, e.g. 'aiohttp' for .../aio-libs/aiohttp.git."""
+    name = url.rstrip('/').split('/')[-1]
+    return name[:-len('.git')] if name.endswith('.git') else name
+
+
+def validate_manifest(urls):
+    """
+    Check a list of repository URLs.
+
+    Catches entries glued together by a missing comma in a Python list, duplicate
+    URLs and different URLs that would clone into the same directory.
+
+    Returns:
+    tuple: (valid URLs, list of error messages)
+    """
+    valid = []
+    errors = []
+    seen_urls = set()
+    seen_names = {}
+    for url in urls:
+        url = url.strip()
+        if not url:
+            continue
+        if len(re.findall(r'://|git@', url)) > 1:
+            errors.append(f"Concatenated URLs (missing comma?): {url}")
+            continue
+        if url in seen_urls:
+            errors.append(f"Duplicate URL: {url}")
+            continue
+        name = project_name(url)
+        if name in seen_names:
+            errors.append(f"{url} and {seen_names[name]} both clone into '{name}'")
+            continue
+        seen_urls.add(url)
+        seen_names[name] = url
+        valid.append(url)
+    return valid, errors
+
+
+def read_manifest(manifest_file):
+    """Read one URL per line; blank lines and '#' comments are ignored."""
+    with open(manifest_file) as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+
+def run_git(args, cwd=None):
+    result = subprocess.run(['git'] + args, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"git {' '.join(args)} failed")
+    return result.stdout
+
+
+def target_path(url, clone_dir, mode):
+    name = project_name(url)
+    return os.path.join(clone_dir, f'{name}.git' if mode == 'mirror' else name)
+
+
+def staging_dir(clone_dir):
+    """
+    Sibling directory in which clones are made before being moved into clone_dir.
+    Outside clone_dir, so the miners listing clone_dir never see a partial clone;
+    next to it, so the move is a rename on the same file system.
+    """
+    return os.path.abspath(clone_dir).rstrip(os.sep) + '.partial'
+
+
+def default_status_file(clone_dir):
+    """Status CSV next to clone_dir, so it is not taken for a project or part of the clones."""
+    return os.path.abspath(clone_dir).rstrip(os.sep) + '_clone_status.csv'
+
+
+def remove_partial_clones(clone_dir):
+    """Remove '<name>.partial' clones that older runs left inside clone_dir."""
+    removed = []
+    for name in os.listdir(clone_dir):
+        path = os.path.join(clone_dir, name)
+        if name.endswith('.partial') and os.path.isdir(path):
+            shutil.rmtree(path)
+            removed.append(name)
+    return removed
+
+
+def clone_or_update(url, clone_dir, mode='full'):
+    """
+    Clone a repository, or fetch into an existing clone.
+
+    Modes:
+    - full: regular clone with working tree
+    - blobless: --filter=blob:none; history is complete, file contents are fetched on demand
+    - mirror: bare mirror (history only, no working tree); not readable by the miners
+
+    Returns:
+    dict: Status row for the report
+    """
+    path = target_path(url, clone_dir, mode)
+    action = 'update' if os.path.exists(path) else 'clone'
+    start = time.time()
+    row = {'Project': project_name(url), 'URL': url, 'Mode': mode, 'Action': action}
+    try:
+        if action == 'clone':
+            args = ['clone', '--quiet']
+            if mode == 'blobless':
+                args.append('--filter=blob:none')
+            elif mode == 'mirror':
+                args.append('--mirror')
+            # Clone outside clone_dir so an interrupted clone is never taken for a complete one
+            temp_path = os.path.join(staging_dir(clone_dir), os.path.basename(path))
+            if os.path.exists(temp_path):
+                shutil.rmtree(temp_path)
+            run_git(args + [url, temp_path])
+            os.rename(temp_path, path)
+        elif mode == 'mirror':
+            run_git(['-C', path, 'remote', 'update', '--prune'])
+        else:
+            run_git(['-C', path, 'fetch', '--quiet', '--prune'])
+            # Move the checked-out branch to the fetched tip when that is a fast-forward
+            if subprocess.run(['git', '-C', path, 'rev-parse', '--abbrev-ref', '@{upstream}'],
+                              capture_output=True).returncode == 0:
+                run_git(['-C', path, 'merge', '--ff-only', '--quiet', '@{upstream}'])
+        row.update(Status='ok', Error='')
+    except (RuntimeError, OSError) as e:
+        row.update(Status='failed', Error=str(e).splitlines()[-1] if str(e) else type(e).__name__)
+    row['Seconds'] = round(time.time() - start, 2)
+    return row
+
+
+def clone_all(urls, clone_dir, mode='full', jobs=8, status_file=None):
+    """
+    Clone or update every repository of a manifest with a bounded worker pool.
+
+    Parameters:
+    urls (list): Repository URLs or paths (file:// and bare paths work offline)
+    clone_dir (str): Directory for the clones
+    mode (str): 'full', 'blobless' or 'mirror' (an archive the miners cannot read)
+    jobs (int): Number of concurrent git processes
+    status_file (str): CSV for the per-repository status (default: <clone_dir>_clone_status.csv)
+
+    Returns:
+    pd.DataFrame: Per-repository status and timing
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    valid, errors = validate_manifest(urls)
+    for error in errors:
+        print(f"Manifest error: {error}")
+
+    os.makedirs(clone_dir, exist_ok=True)
+    os.makedirs(staging_dir(clone_dir), exist_ok=True)
+    for name in remove_partial_clones(clone_dir):
+        print(f"Removed partial clone: {name}")
+    rows = [{'Project': '', 'URL': error, 'Mode': mode, 'Action': 'validate', 'Status': 'invalid',
+             'Seconds': 0.0, 'Error': 'manifest'} for error in errors]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {executor.submit(clone_or_update, url, clone_dir, mode): url for url in valid}
+        for i, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows.append(row)
+            print(f"[{i}/{len(valid)}] {row['Action']} {row['Project']}: {row['Status']} ({row['Seconds']}s)"
+                  + (f" - {row['Error']}" if row['Error'] else ''))
+
+    status = pd.DataFrame(rows, columns=STATUS_COLUMNS).sort_values(['Status', 'Project']).reset_index(drop=True)
+    status_file = status_file or default_status_file(clone_dir)
+    status.to_csv(status_file, index=False)
+    print(f"Status written to: {status_file}")
+    return status
+
+
+def main():
+    from Clone import CLONE_DIR, projects
+
+    parser = argparse.ArgumentParser(description='Clone or update the study repositories in parallel')
+    parser.add_argument('--manifest', help='File with one repository URL per line (default: the list in Clone.py)')
+    parser.add_argument('--clone_dir', help='Directory for the clones', default=CLONE_DIR)
+    parser.add_argument('--mode', choices=MODES, default='full',
+                        help='full clone, blobless (--filter=blob:none) or bare mirror '
+                             '(archive only, not allowed in the clone directory the miners read)')
+    parser.add_argument('--jobs', type=int, default=8, help='Number of concurrent clones')
+    parser.add_argument('--status_file', help='Status CSV (default: <clone_dir>_clone_status.csv)')
+    parser.add_argument('--validate', action='store_true', help='Only validate the manifest')
+    args = parser.parse_args()
+
+    urls = read_manifest(args.manifest) if args.manifest else projects
+
+    if args.validate:
+        valid, errors = validate_manifest(urls)
+        for error in errors:
+            print(f"Manifest error: {error}")
+        print(f"{len(valid)} valid repositories, {len(errors)} errors")
+        raise SystemExit(1 if errors else 0)
+
+    if args.mode not in MINING_MODES and os.path.abspath(args.clone_dir) == os.path.abspath(CLONE_DIR):
+        parser.error(f"--mode {args.mode} makes bare repositories the miners cannot read; "
+                     f"use another --clone_dir for an archive")
+
+    status = clone_all(urls, args.clone_dir, args.mode, args.jobs, args.status_file)
+    print(status['Status'].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import os
+import re
+import csv
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+from Sharding import PLAN_FILE, shard_projects, shard_dir
+
+# Mersenne prime 2^31 - 1: a * x stays below 2^62, so the universal hash
+# (a * x + b) mod p never overflows uint64.
+MERSENNE_PRIME = (1 << 31) - 1
+COMMIT_MARKER = '\x00'
+
+
+def is_test_file(file_path: str) -> bool:
+    """Determine if a file is a test file based on common naming conventions."""
+    test_patterns = [
+        r"(^|/)tests?(/|$)",  # Matches folders named 'test' or 'tests'
+        r"(^|/)test_.*\.py$",  # Matches 'test_*.py'
+        r"(^|/).*_test\.py$",  # Matches '*_test.py'
+        r"(^|/)unittests?(/|$)",  # Matches 'unittest' or 'unittests' folders
+        r"(^|/)specs?(/|$)",  # Matches 'spec' or 'specs' folders
+    ]
+    return any(re.search(pattern, file_path) for pattern in test_patterns)
+
+
+def iter_commit_file_lists(repo_path: str, extension: str = '.py'):
+    """
+    Stream the history of a repository once, yielding the list of files
+    touched by each commit (newest first).
+    """
+    command = [
+        'git', '-C', str(repo_path), '-c', 'core.quotepath=off',
+        'log', '--no-renames', '--name-only', '--format=%x00%H', 'HEAD'
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               universal_newlines=True, encoding='utf-8', errors='replace')
+    files = None
+    for line in process.stdout:
+        line = line.rstrip('\n')
+        if line.startswith(COMMIT_MARKER):
+            if files is not None:
+                yield files
+            files = []
+        elif line and files is not None and line.endswith(extension):
+            files.append(line)
+    if files is not None:
+        yield files
+    process.stdout.close()
+    process.wait()
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick the (bands, rows) split of a MinHash signature whose LSH
+    S-curve threshold (1/b)^(1/r) is closest to the requested Jaccard threshold.
+    """
+    best = None
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        distance = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or distance < best[0]:
+            best = (distance, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashCoChange:
+    """
+    Approximate co-change detector. MinHash signatures of every file's commit
+    set are updated while the history is streamed, so memory is bounded by
+    files x num_perm regardless of history length.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = None, threshold: float = 0.5, seed: int = 1):
+        self.num_perm = num_perm
+        self.threshold = threshold
+        if bands is None:
+            self.bands, self.rows = choose_bands(num_perm, threshold)
+        else:
+            if num_perm % bands:
+                raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+            self.bands, self.rows = bands, num_perm // bands
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def _hash_commit(self, ordinal: int) -> np.ndarray:
+        return ((self.a * np.uint64(ordinal) + self.b) % np.uint64(MERSENNE_PRIME)).astype(np.uint32)
+
+    def add_commit(self, ordinal: int, files: List[str]):
+        hashed = self._hash_commit(ordinal)
+        for file_path in files:
+            signature = self.signatures.get(file_path)
+            if signature is None:
+                self.signatures[file_path] = hashed.copy()
+            else:
+                np.minimum(signature, hashed, out=signature)
+
+    def candidate_pairs(self):
+        """Yield (production, test) pairs that share at least one LSH bucket."""
+        is_test = {file_path: is_test_file(file_path) for file_path in self.signatures}
+        seen = set()
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets = defaultdict(lambda: ([], []))
+            for file_path, signature in self.signatures.items():
+                key = signature[start:start + self.rows].tobytes()
+                buckets[key][1 if is_test[file_path] else 0].append(file_path)
+            for prod_files, test_files in buckets.values():
+                for prod_file in prod_files:
+                    for test_file in test_files:
+                        if (prod_file, test_file) not in seen:
+                            seen.add((prod_file, test_file))
+                            yield prod_file, test_file
+
+    def similarity(self, file1: str, file2: str) -> float:
+        return float(np.mean(self.signatures[file1] == self.signatures[file2]))
+
+    def find_partners(self) -> List[Tuple[str, str, float]]:
+        pairs = []
+        for prod_file, test_file in self.candidate_pairs():
+            jaccard = self.similarity(prod_file, test_file)
+            if jaccard >= self.threshold:
+                pairs.append((prod_file, test_file, jaccard))
+        return pairs
+
+
+class ExactCoChange:
+    """Exact Jaccard co-change over the full commit sets of every file."""
+
+    def __init__(self, threshold: float = 0.5):
+        self.threshold = threshold
+        self.commit_counts: Dict[str, int] = defaultdict(int)
+        self.pair_counts: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def add_commit(self, ordinal: int, files: List[str]):
+        test_files = [f for f in files if is_test_file(f)]
+        prod_files = [f for f in files if not is_test_file(f)]
+        for file_path in files:
+            self.commit_counts[file_path] += 1
+        for prod_file in prod_files:
+            for test_file in test_files:
+                self.pair_counts[(prod_file, test_file)] += 1
+
+    def find_partners(self) -> List[Tuple[str, str, float]]:
+        pairs = []
+        for (prod_file, test_file), together in self.pair_counts.items():
+            union = self.commit_counts[prod_file] + self.commit_counts[test_file] - together
+            jaccard = together / union
+            if jaccard >= self.threshold:
+                pairs.append((prod_file, test_file, jaccard))
+        return pairs
+
+
+def analyze_cochange(repo_path: str, mode: str = 'minhash', threshold: float = 0.5,
+                     num_perm: int = 128, bands: int = None, max_commit_files: int = 100,
+                     seed: int = 1) -> List[Tuple[str, str, float]]:
+    """
+    Find test/production partners whose commit sets have a high Jaccard similarity.
+
+    Parameters:
+    repo_path (str): Path to the Git repository
+    mode (str): 'exact' for exact Jaccard, 'minhash' for MinHash/LSH approximation
+    threshold (float): Minimum Jaccard similarity for a partner pair
+    num_perm (int): MinHash signature length; larger is more accurate but slower
+    bands (int): Number of LSH bands; chosen from the threshold when omitted
+    max_commit_files (int): Commits touching more files than this (bulk
+        reformatting, vendoring) are ignored, as is usual for co-change mining
+    seed (int): Seed for the MinHash permutations
+
+    Returns:
+    list: (ProductionFile, TestFile, Jaccard) tuples sorted by production file
+    """
+    if mode == 'exact':
+        detector = ExactCoChange(threshold)
+    elif mode == 'minhash':
+        detector = MinHashCoChange(num_perm=num_perm, bands=bands, threshold=threshold, seed=seed)
+    else:
+        raise ValueError(f"Unknown co-change mode: {mode}")
+
+    for ordinal, files in enumerate(iter_commit_file_lists(repo_path)):
+        if not files or len(files) > max_commit_files:
+            continue
+        detector.add_commit(ordinal, files)
+
+    pairs = detector.find_partners()
+    pairs.sort(key=lambda pair: (pair[0], -pair[2], pair[1]))
+    return pairs
+
+
+def process_project(project_path: str, output_dir: str, **options):
+    os.makedirs(output_dir, exist_ok=True)
+    project_name = os.path.basename(project_path)
+    output_file = os.path.join(output_dir, f'{project_name}_cochange.csv')
+
+    try:
+        pairs = analyze_cochange(project_path, **options)
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ProductionFile', 'TestFile', 'Jaccard'])
+            for prod_file, test_file, jaccard in pairs:
+                writer.writerow([prod_file, test_file, round(jaccard, 4)])
+
+        print(f"Co-change analysis complete for {project_name}. Found {len(pairs)} pairs.")
+        print(f"Results written to: {output_file}")
+
+    except Exception as e:
+        print(f"Error analyzing project {project_name}: {str(e)}")
+
+
+def main():
+    default_input = '/home/siam/Desktop/volume1/MS_Papers_Arif/PynoseProjects'
+    default_output = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/CoChange'
+
+    parser = argparse.ArgumentParser(description='Map production files to test files by co-change')
+    parser.add_argument('--input_dir', help='Directory containing Git repositories', default=default_input)
+    parser.add_argument('--output_dir', help='Output directory path', default=default_output)
+    parser.add_argument('--mode', choices=['exact', 'minhash'], default='minhash',
+                        help='Exact Jaccard or approximate MinHash/LSH')
+    parser.add_argument('--threshold', type=float, default=0.5, help='Minimum Jaccard similarity')
+    parser.add_argument('--num_perm', type=int, default=128,
+                        help='MinHash signature length (accuracy vs. speed)')
+    parser.add_argument('--bands', type=int, default=None, help='Number of LSH bands')
+    parser.add_argument('--max_commit_files', type=int, default=100,
+                        help='Ignore commits touching more files than this')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for MinHash permutations')
+    parser.add_argument('--shard', help='Only analyze shard i/N of the repositories, writing to <output_dir>/shard-i-of-N')
+    parser.add_argument('--plan_file', help='Shard plan shared by all nodes (default: <output_dir>/shard_plan.csv)')
+
+    args = parser.parse_args()
+
+    output_dir = args.output_dir
+    project_names = sorted(os.listdir(args.input_dir))
+    if args.shard:
+        project_names = shard_projects(args.input_dir, args.shard, args.plan_file or os.path.join(output_dir, PLAN_FILE))
+        output_dir = shard_dir(args.output_dir, args.shard)
+
+    for project_name in project_names:
+        project_path = os.path.join(args.input_dir, project_name)
+
+        if not os.path.isdir(project_path):
+            continue
+
+        process_project(project_path, output_dir, mode=args.mode, threshold=args.threshold,
+                        num_perm=args.num_perm, bands=args.bands,
+                        max_commit_files=args.max_commit_files, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import argparse
+import pandas as pd
+from PathIndex import PATH_INDEX_DIR, project_dictionary, ensure_ids
+from SmellsPlusCP import extract_filename, merge_on_file_ids
+from Schemas import load_csv
+from IntermediateStore import open_store
+from StreamingCombine import stream_combine
+
+# Per-file fault columns -> names of the pair columns TS_FP_mapping reads, without
+# the 'Prod_'/'Test_' prefix. FaultCount (FaultProneness) and TotalFaultyCommit (SZZ)
+# both count fixing commits; FaultyInsertions/FaultyDeletions only come from SZZ.
+# Prod_/Test_TotalCommits are the CP columns of the same name.
+PAIR_FP_COLUMNS = {
+    'Is_Faulty': 'Is_Faulty',
+    'FaultCount': 'TotalFaultyCommit',
+    'TotalFaultyCommit': 'TotalFaultyCommit',
+    'FaultyInsertions': 'FaultyInsertions',
+    'FaultyDeletions': 'FaultyDeletions'
+}
+
+
+def get_project_names(smell_dir, cp_dir, fp_dir):
+    """
+    Get the projects that have a smell summary, CP summary and fault proneness file.
+
+    Parameters:
+    smell_dir (str): Directory with '<project>_csv/Summary/smell_summary.csv' folders
+    cp_dir (str): Directory with '<project>_transformed.csv' files
+    fp_dir (str): Directory with '<project>_fault_proneness.csv' files
+
+    Returns:
+    list: Sorted project names present in all three sources
+    """
+    smell_projects = {f[:-len('_csv')] for f in os.listdir(smell_dir)
+                      if f.endswith('_csv') and os.path.exists(os.path.join(smell_dir, f, 'Summary', 'smell_summary.csv'))}
+    cp_projects = {f.replace('_transformed.csv', '') for f in os.listdir(cp_dir) if f.endswith('_transformed.csv')}
+    fp_projects = {f.replace('_fault_proneness.csv', '') for f in os.listdir(fp_dir) if f.endswith('_fault_proneness.csv')}
+    return sorted(smell_projects & cp_projects & fp_projects)
+
+
+def load_source(store, stage, project, csv_path, kind):
+    """Read a source from the intermediate store when it is current, else from its CSV."""
+    if store is not None:
+        return store.load(stage, project, csv_path, kind)
+    return load_csv(csv_path, kind)
+
+
+def pair_fault_columns(fp_df, prefix, id_column):
+    """
+    Fault columns of one side of the test/production pairs, keyed by id_column.
+
+    Parameters:
+    fp_df (pd.DataFrame): Per-file fault data with a FileID column
+    prefix (str): 'Prod_' or 'Test_'
+    id_column (str): Pair column the FileID is renamed to
+
+    Returns:
+    pd.DataFrame: id_column plus the prefixed TS_FP_mapping columns present in fp_df
+    """
+    columns = {}
+    for source, target in PAIR_FP_COLUMNS.items():
+        if source in fp_df.columns and prefix + target not in columns.values():
+            columns[source] = prefix + target
+    return fp_df[['FileID'] + list(columns)].rename(columns={**columns, 'FileID': id_column})
+
+
+def build_project_dataset(smell_df, cp_df, fp_df, dictionary, include_production_fp=True, pair_fp_df=None):
+    """
+    Join the smell summary, change proneness and fault proneness of one project in memory.
+
+    Join keys and dedup rules:
+    - CP rows are deduplicated on (ProductionFile, TestFile).
+    - The smell summary and the fault proneness data keep one row per file ID.
+    - CP.TestFileID = smells.FileID (replaces SmellsPlusCP + RevisedSmellswithCP).
+    - CP.TestFileID = FP.FileID (replaces FinalExtraction.merge_project_data); the
+      test side is also attached under the Test_* names TS_FP_mapping reads.
+    - Optionally CP.ProductionFileID = FP.FileID as a left join for the Prod_* columns.
+    - With pair_fp_df (the SZZ rows), the Prod_*/Test_* columns come from it by
+      FileID instead, as left joins, so files SZZ has no row for stay blank.
+
+    Parameters:
+    smell_df (pd.DataFrame): smell_summary.csv of the project
+    cp_df (pd.DataFrame): <project>_transformed.csv of the project
+    fp_df (pd.DataFrame): <project>_fault_proneness.csv of the project
+    dictionary (PathDictionary): Path dictionary of the project
+    include_production_fp (bool): Attach fault proneness of the production file
+    pair_fp_df (pd.DataFrame): <project>_szz.csv of the project, source of the pair columns
+
+    Returns:
+    pd.DataFrame: Final dataset of the project
+    """
+    cp_df = ensure_ids(cp_df, 'TestFile', 'TestFileID', dictionary)
+    cp_df = ensure_ids(cp_df, 'ProductionFile', 'ProductionFileID', dictionary)
+    smell_df = ensure_ids(smell_df, 'File Path', 'FileID', dictionary)
+    fp_df = ensure_ids(fp_df, 'File', 'FileID', dictionary)
+
+    cp_df = cp_df.drop_duplicates(subset=['ProductionFile', 'TestFile'])
+    smell_df = smell_df.dropna(subset=['FileID']).drop_duplicates(subset=['FileID'])
+    fp_df = fp_df.dropna(subset=['FileID']).drop_duplicates(subset=['FileID'])
+    if pair_fp_df is None:
+        pair_fp_df = fp_df
+    else:
+        pair_fp_df = ensure_ids(pair_fp_df, 'File', 'FileID', dictionary)
+        pair_fp_df = pair_fp_df.dropna(subset=['FileID']).drop_duplicates(subset=['FileID'])
+
+    cp_df['test_filename'] = cp_df['TestFile'].apply(extract_filename)
+
+    # Smells + CP on full test file paths
+    merged_df = merge_on_file_ids(cp_df, smell_df.drop(columns=['test_filename'], errors='ignore'))
+
+    # The smell FileID equals TestFileID after the full-path join
+    merged_df = merged_df.drop(columns=['FileID'])
+
+    # Test side fault proneness, as FinalExtraction laid it out and under the TS_FP names
+    merged_df = merged_df.merge(fp_df, left_on='TestFileID', right_on='FileID', how='inner')
+    merged_df = merged_df.merge(pair_fault_columns(pair_fp_df, 'Test_', 'TestFileID'), on='TestFileID', how='left')
+
+    # Production side fault proneness
+    if include_production_fp:
+        merged_df = merged_df.merge(pair_fault_columns(pair_fp_df, 'Prod_', 'ProductionFileID'),
+                                    on='ProductionFileID', how='left')
+
+    return merged_df
+
+
+def build_all_projects(smell_dir, cp_dir, fp_dir, output_dir, combined_file=None,
+                       index_dir=PATH_INDEX_DIR, include_production_fp=True, store=None, szz_dir=None):
+    """
+    Build the final per-project datasets and the combined dataset in one pass.
+
+    Per-project files are written as '_<project>_final.csv' (as FinalExtraction did)
+    and the combined file carries the same 'Source_File' column as AllCombined. The
+    combined file is streamed from the per-project files, so no project is held in
+    memory after it is written.
+
+    With szz_dir, the Prod_*/Test_* fault columns of the pairs come from
+    '<project>_szz.csv' (including FaultyInsertions/FaultyDeletions); projects
+    without SZZ results fall back to the fault proneness data.
+
+    With an IntermediateStore (or its directory), the parsed sources are read from
+    the store while they are current and the per-project datasets are also stored
+    under the 'final' stage; the CSV files are written either way.
+
+    Returns:
+    pd.DataFrame: Per-project row counts
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    store = open_store(store)
+
+    projects = get_project_names(smell_dir, cp_dir, fp_dir)
+    print(f"Found {len(projects)} projects to process")
+
+    summary = []
+    written = []
+
+    for project in projects:
+        try:
+            smell_df = load_source(store, 'smell_summary', project,
+                                   os.path.join(smell_dir, f'{project}_csv', 'Summary', 'smell_summary.csv'), 'smell_summary')
+            cp_df = load_source(store, 'cp_transformed', project,
+                                os.path.join(cp_dir, f'{project}_transformed.csv'), 'cp_transformed')
+            fp_df = load_source(store, 'fault_proneness', project,
+                                os.path.join(fp_dir, f'{project}_fault_proneness.csv'), 'fault_proneness')
+
+            szz_df = None
+            szz_file = os.path.join(szz_dir, f'{project}_szz.csv') if szz_dir else None
+            if szz_file and os.path.exists(szz_file):
+                szz_df = load_source(store, 'szz', project, szz_file, 'szz')
+            elif szz_file:
+                print(f"{project}: no SZZ results, pair fault columns come from fault proneness")
+
+            # Paths interned here end up in the written rows, so the dictionary stays locked until then
+            output_path = os.path.join(output_dir, f'_{project}_final.csv')
+            with project_dictionary(project, index_dir) as dictionary:
+                project_df = build_project_dataset(smell_df, cp_df, fp_df, dictionary, include_production_fp, szz_df)
+                project_df.to_csv(output_path, index=False)
+            if store is not None:
+                store.put('final', project, project_df, output_path, 'final')
+            print(f"{project}: {len(project_df)} rows -> {output_path}")
+
+            written.append((output_path, f'_{project}_final'))
+
+            summary.append({'Project': project, 'Smell Rows': len(smell_df), 'CP Rows': len(cp_df),
+                            'FP Rows': len(fp_df), 'Final Rows': len(project_df)})
+
+        except Exception as e:
+            print(f"Error processing {project}: {str(e)}")
+
+    if combined_file and written:
+        files, rows = stream_combine(written, combined_file, 'Source_File')
+        print(f"\nCombined dataset saved as: {combined_file} ({files} files, {rows} rows)")
+
+    return pd.DataFrame(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the final smell + CP + FP dataset in one pass')
+    parser.add_argument('--smell_dir', help='Directory with per-project smell summaries',
+                        default='/home/siam/Desktop/volume1/MS_Papers_Arif/Data/TestSmells/SmellsCleanAggregatedData')
+    parser.add_argument('--cp_dir', help='Directory with transformed CP summaries',
+                        default='/home/siam/Desktop/volume1/MS_Papers_Arif/Data/CP/CP_Summary')
+    parser.add_argument('--fp_dir', help='Directory with fault proneness CSVs',
+                        default='/home/iit/Downloads/Thesis/Data/SM_CP_FP/Fault_proneness')
+    parser.add_argument('--output_dir', help='Directory for the per-project datasets',
+                        default='/home/iit/Downloads/Thesis/Data/SM_CP_FP/Final')
+    parser.add_argument('--combined_file', help='Path of the combined dataset',
+                        default='/home/iit/Downloads/Thesis/Data/SM_CP_FP/Allcombined.csv')
+    parser.add_argument('--index_dir', help='Directory with the per-project path dictionaries',
+                        default=PATH_INDEX_DIR)
+    parser.add_argument('--no_production_fp', action='store_true',
+                        help='Do not attach fault proneness of the production files')
+    parser.add_argument('--szz_dir', help='Directory with <project>_szz.csv files for the pair fault columns')
+    parser.add_argument('--store_dir', help='Keep intermediate data in a columnar store at this directory')
+    parser.add_argument('--store_backend', choices=['parquet', 'feather', 'csv'], default='parquet',
+                        help='File format of the intermediate store')
+
+    args = parser.parse_args()
+
+    store = open_store(args.store_dir, args.store_backend)
+    summary = build_all_projects(args.smell_dir, args.cp_dir, args.fp_dir, args.output_dir,
+                                 args.combined_file, args.index_dir, not args.no_production_fp, store, args.szz_dir)
+
+    print("\nProcessing Summary:")
+    print(summary.to_string(index=False) if not summary.empty else "No projects processed")
+
+
+if __name__ == "__main__":
+    main()
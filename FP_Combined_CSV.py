@@ -1,5 +1,5 @@
-import pandas as pd
 import os
+from StreamingCombine import stream_combine
 
 def find_result_csvs(root_dir):
     """Find all CSV files containing 'result' in their names in the given directory and its subdirectories"""
@@ -15,35 +15,21 @@ def find_result_csvs(root_dir):
     return result_files
 
 def combine_csv_files(file_paths, output_path):
-    """Combine multiple CSV files into a single CSV file"""
-    # List to store all dataframes
-    dfs = []
+    """Combine multiple CSV files into a single CSV file, streaming one chunk at a time"""
+    # The parent folder of each result file is its project
+    sources = [(file_path, os.path.basename(os.path.dirname(file_path))) for file_path in file_paths]
     
-    # Read each CSV file
-    for file_path in file_paths:
-        try:
-            df = pd.read_csv(file_path)
-            # Add a column for the source project
-            project_name = os.path.basename(os.path.dirname(file_path))
-            df['Project'] = project_name
-            dfs.append(df)
-            print(f"Successfully read: {file_path}")
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
+    # Stream all files into the combined CSV
+    output_file = os.path.join(output_path, 'combined_results.csv')
+    files, rows = stream_combine(sources, output_file, 'Project')
     
-    if not dfs:
+    if files == 0:
         print("No CSV files were successfully read!")
         return
     
-    # Combine all dataframes
-    combined_df = pd.concat(dfs, ignore_index=True)
-    
-    # Save the combined dataframe
-    output_file = os.path.join(output_path, 'combined_results.csv')
-    combined_df.to_csv(output_file, index=False)
     print(f"\nCombined CSV saved to: {output_file}")
-    print(f"Total number of rows: {len(combined_df)}")
-    print(f"Total number of files combined: {len(dfs)}")
+    print(f"Total number of rows: {rows}")
+    print(f"Total number of files combined: {files}")
 
 def main():
     # Input and output paths
@@ -77,6 +77,7 @@
 import pandas as pd
 import os
 import glob
+from Schemas import load_csv
 
 def is_test_file(file_path: str) -> bool:
     """Determine if a file is a test file based on common naming conventions."""
@@ -92,14 +93,14 @@ def is_test_file(file_path: str) -> bool:
 
 def split_csv_by_file_type(input_file, output_folder):
     """Split a single CSV file into production and test files, and store them in a structured folder."""
-    df = pd.read_csv(input_file)
+    df = load_csv(input_file, 'fault_proneness')
 
     if "File" not in df.columns:
         print(f"Skipping {input_file} (No 'File' column found).")
         return
 
     # Apply test file detection logic
-    df["Is_Test"] = df["File"].apply(is_test_file)
+    df["Is_Test"] = df["File"].astype(str).apply(is_test_file)
     
     # Separate into production and test files
     prod_files = df[~df["Is_Test"]].drop(columns=["Is_Test", "Repository"])  # Drop "Repository"
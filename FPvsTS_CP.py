@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+from Schemas import load_csv
 
 def combine_test_metrics(csv1_path, csv2_path, output_path):
     """
@@ -7,8 +8,8 @@ def combine_test_metrics(csv1_path, csv2_path, output_path):
     ensuring one-to-one mapping between test files
     """
     # Read both CSVs
-    df1 = pd.read_csv(csv1_path)
-    df2 = pd.read_csv(csv2_path)
+    df1 = load_csv(csv1_path, 'final')
+    df2 = load_csv(csv2_path, 'final')
     
     # Check for duplicate TestFiles in both dataframes
     duplicates_df1 = df1[df1['TestFile'].duplicated(keep=False)]
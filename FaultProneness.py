@@ -176,30 +176,93 @@
 import os
 import git
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterator, Iterable, Callable
 import argparse
 import csv
 import re
 import subprocess
+from PathIndex import PATH_INDEX_DIR, project_dictionary, save_project_dictionary
+from Checkpoint import RunJournal, CheckpointedCSV, repo_head
+from Sharding import PLAN_FILE, shard_projects, shard_dir
+from WorkQueue import WorkQueue
+from FileLineage import FileLineage
+from CatFilePool import CatFilePool, parse_commit
+from HistoryTable import HistoryTable
+from CommitRecords import CommitRecord, CommitTable, is_bug_fix_message
+
+FP_HEADER = ['Repository', 'File', 'Is_Faulty', 'TotalCommits', 'Insertions', 'Deletions', 'FaultCount', 'FileID']
+JOURNAL_FILE = 'fault_proneness_journal.jsonl'
 
 class LocalFaultDetector:
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, follow_renames: bool = False, history_table: bool = False):
         self.repo_path = Path(repo_path)
         try:
             self.repo = git.Repo(self.repo_path)
             self.remote_url = self.repo.remotes.origin.url if self.repo.remotes else str(self.repo_path)
         except git.exc.InvalidGitRepositoryError:
             raise ValueError(f"'{repo_path}' is not a valid Git repository")
-
-    def is_bug_fix_commit(self, commit) -> bool:
-        bug_keywords = {'bug', 'fix', 'defect', 'fault', 'issue', 'error'}
-        return any(keyword in commit.message.lower() for keyword in bug_keywords)
+        # With history_table, all per-file metrics are group reductions over one mined numstat table
+        self.table = HistoryTable.build(str(self.repo_path), follow_renames) if history_table else None
+        self.table_metrics = self.table.file_metrics() if history_table else None
+        # With follow_renames, metrics cover each file's history under all its names (one git log pass)
+        self.lineage = FileLineage.build(str(self.repo_path)) if follow_renames and not history_table else None
+        # The per-file git path below is the only user of the commit table and the object pool;
+        # both are created on first use, so table and lineage runs never start them
+        self._commits = None
+        self._objects = None
+        self._history = (None, [])
+
+    @property
+    def commits(self) -> CommitTable:
+        """Compact records of every commit from one git log; the metric code never touches GitPython commits."""
+        if self._commits is None:
+            self._commits = CommitTable.load(str(self.repo_path))
+        return self._commits
+
+    @property
+    def objects(self) -> CatFilePool:
+        """Object pool for commits missing from the table (e.g. behind a graft)."""
+        if self._objects is None:
+            self._objects = CatFilePool(str(self.repo_path), processes=1)
+        return self._objects
+
+    def close(self):
+        if self._objects is not None:
+            self._objects.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def is_bug_fix_commit(self, commit: CommitRecord) -> bool:
+        return commit.is_fix
+
+    def commit_record(self, sha: str) -> CommitRecord:
+        record = self.commits.get(sha)
+        if record is None:
+            commit = parse_commit(self.objects.read(sha)[2])
+            # 'Name <email> <timestamp> <timezone>'
+            record = CommitRecord(sha, tuple(commit['parents']), commit['author'].rsplit(' <', 1)[0],
+                                  int(commit['committer'].split()[-2]), is_bug_fix_message(commit['message']))
+            self.commits.add(record)
+        return record
+
+    def file_commits(self, file_path: str) -> List[CommitRecord]:
+        """Commits that changed a file, newest first (one 'git rev-list' per file, shared by all metrics)."""
+        if self._history[0] != file_path:
+            output = subprocess.check_output(['git', '-C', str(self.repo_path), 'rev-list', 'HEAD', '--', file_path],
+                                             universal_newlines=True)
+            self._history = (file_path, [self.commit_record(sha) for sha in output.split()])
+        return self._history[1]
 
     def calculate_file_changes(self, file_path: str) -> Dict[str, int]:
         try:
             total_insertions = 0
             total_deletions = 0
-            commits = list(self.repo.iter_commits(paths=file_path))
+            commits = self.file_commits(file_path)
             total_commits = len(commits)
 
             for i in range(len(commits) - 1):
@@ -213,8 +276,8 @@ class LocalFaultDetector:
                         str(self.repo_path), 
                         'diff', 
                         '--numstat', 
-                        parent_commit.hexsha, 
-                        current_commit.hexsha, 
+                        parent_commit.sha, 
+                        current_commit.sha, 
                         '--', 
                         file_path
                     ]
@@ -240,9 +303,9 @@ class LocalFaultDetector:
             print(f"Error calculating changes for {file_path}: {e}")
             return {'TotalCommits': 0, 'Insertions': 0, 'Deletions': 0}
 
-    def get_file_versions(self, file_path: str) -> List[Tuple[git.Commit, bool]]:
+    def get_file_versions(self, file_path: str) -> List[Tuple[CommitRecord, bool, int]]:
         try:
-            commits = list(self.repo.iter_commits(paths=file_path))
+            commits = self.file_commits(file_path)
             versions = []
             fault_count = 0
             
@@ -254,10 +317,19 @@ class LocalFaultDetector:
                 
             return versions
             
-        except git.exc.GitCommandError:
+        except subprocess.CalledProcessError:
             return []
 
     def analyze_file_history(self, file_path: str) -> Tuple[bool, Dict[str, int], int]:
+        if self.table is not None:
+            file_id = self.table.file_id(file_path)
+            if file_id is None:
+                return False, {'TotalCommits': 0, 'Insertions': 0, 'Deletions': 0}, 0
+            metrics = self.table_metrics.loc[file_id]
+            return bool(metrics['Is_Faulty']), metrics.to_dict(), int(metrics['FaultCount'])
+        if self.lineage is not None:
+            metrics = self.lineage.file_metrics(file_path, is_fix=is_bug_fix_message)
+            return metrics['FaultCount'] > 0, metrics, metrics['FaultCount']
         versions = self.get_file_versions(file_path)
         is_faulty = any(is_faulty for _, is_faulty, _ in versions)
         fault_count = versions[-1][2] if versions else 0
@@ -273,44 +345,107 @@ class LocalFaultDetector:
                     python_files.append(rel_path)
         return python_files
 
-    def analyze_repository(self) -> List[Tuple[str, str, int, int, int, int, int]]:
-        results = []
+    def analyze_file(self, file_path: str) -> Tuple[str, str, int, int, int, int, int]:
+        is_faulty, changes, fault_count = self.analyze_file_history(file_path)
+        return (
+            self.remote_url, 
+            file_path, 
+            int(is_faulty),
+            changes['TotalCommits'],
+            changes['Insertions'],
+            changes['Deletions'],
+            fault_count
+        )
+
+    def analyze_repository(self, skip: Iterable[str] = ()) -> Iterator[Tuple[str, str, int, int, int, int, int]]:
+        """Yield one result row per Python file as soon as it is analyzed, skipping the given files."""
+        skip = set(skip)
         python_files = self.get_python_files()
         
         for file_path in python_files:
-            is_faulty, changes, fault_count = self.analyze_file_history(file_path)
-            results.append((
-                self.remote_url, 
-                file_path, 
-                int(is_faulty),
-                changes['TotalCommits'],
-                changes['Insertions'],
-                changes['Deletions'],
-                fault_count
-            ))
-            
-        return results
-
-def process_project(project_path: str, output_dir: str):
+            if file_path in skip:
+                continue
+            yield self.analyze_file(file_path)
+
+def run_params(follow_renames: bool = False, history_table: bool = False) -> Dict[str, bool]:
+    """Parameters that change the output of a run, recorded with it in the journal."""
+    return {'follow_renames': follow_renames, 'history_table': history_table}
+
+def process_project(project_path: str, output_dir: str, index_dir: str = PATH_INDEX_DIR, batch_size: int = 100,
+                    flush_interval: float = 60.0, follow_renames: bool = False, history_table: bool = False,
+                    cancelled: Callable[[], bool] = None):
+    """
+    Analyze one repository into '<project>_fault_proneness.csv'.
+
+    Rows are streamed from analyze_repository to a '.partial' file that is flushed
+    every batch_size files or flush_interval seconds (so it can be tailed), and
+    renamed into place when the repository is complete. A leftover partial file
+    from an interrupted run is resumed, skipping the files it already holds, if
+    it was written at the same HEAD with the same parameters.
+    With follow_renames, each file's history includes its commits under earlier names.
+    With history_table, the metrics of all files come from one vectorized pass over the history.
+    Once cancelled() returns True the run stops before its next flush, leaving the
+    partial file as it was (e.g. to the worker that took over its lease).
+
+    Returns:
+    int: Number of files in the output, or None if the analysis failed
+    """
     os.makedirs(output_dir, exist_ok=True)
     project_name = os.path.basename(project_path)
     output_file = os.path.join(output_dir, f'{project_name}_fault_proneness.csv')
     
     try:
-        detector = LocalFaultDetector(project_path)
-        results = detector.analyze_repository()
+        # The dictionary stays locked until the output is written, so no other stage can hand out the same IDs
+        with LocalFaultDetector(project_path, follow_renames, history_table) as detector, \
+                project_dictionary(project_name, index_dir) as dictionary:
+            # File IDs in flushed rows must survive a crash, so the dictionary is saved with every flush
+            output = CheckpointedCSV(output_file, FP_HEADER, 'File', batch_size,
+                                     on_flush=lambda: save_project_dictionary(dictionary, index_dir),
+                                     flush_interval=flush_interval,
+                                     run_key={'head': repo_head(project_path),
+                                              'params': run_params(follow_renames, history_table)},
+                                     cancelled=cancelled)
+            with output:
+                for repo_url, file_path, is_faulty, total_commits, insertions, deletions, fault_count in \
+                        detector.analyze_repository(skip=output.done):
+                    output.write([repo_url, file_path, is_faulty, total_commits, insertions, deletions, fault_count,
+                                  dictionary.intern(file_path)])
+                output.commit()
         
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Repository', 'File', 'Is_Faulty', 'TotalCommits', 'Insertions', 'Deletions', 'FaultCount'])
-            for repo_url, file_path, is_faulty, total_commits, insertions, deletions, fault_count in results:
-                writer.writerow([repo_url, file_path, is_faulty, total_commits, insertions, deletions, fault_count])
-        
-        print(f"Analysis complete for {project_name}. Processed {len(results)} files.")
+        print(f"Analysis complete for {project_name}. Processed {output.rows} files.")
         print(f"Results written to: {output_file}")
+        return output.rows
     
     except Exception as e:
         print(f"Error analyzing project {project_name}: {str(e)}")
+        return None
+
+def run_queue_worker(args):
+    """Analyze repositories claimed from a work queue shared by workers on any number of hosts."""
+    os.makedirs(args.output_dir, exist_ok=True)
+    queue = WorkQueue(args.queue_dir, args.lease_timeout)
+    
+    # Every worker enqueues the corpus; tasks that already exist are left alone
+    for project_name in sorted(os.listdir(args.input_dir)):
+        if os.path.isdir(os.path.join(args.input_dir, project_name)):
+            queue.enqueue(project_name)
+    
+    for lease in queue.work():
+        with lease:
+            print(f"[{queue.worker_id}] Claimed {lease.name}")
+            rows = process_project(os.path.join(args.input_dir, lease.name), args.output_dir,
+                                   batch_size=args.batch_size, flush_interval=args.flush_interval,
+                                   follow_renames=args.follow_renames, history_table=args.history_table,
+                                   cancelled=lambda: not lease.held())
+            if lease.lost:
+                # Another worker owns the task now: give it up without marking it done
+                lease.release()
+            elif rows is None:
+                lease.fail('analysis failed')
+            else:
+                lease.complete(rows=rows)
+    
+    print(f"Queue drained: {queue.counts()}")
 
 def main():
     default_input = '/home/siam/Desktop/volume1/MS_Papers_Arif/PynoseProjects'
@@ -323,18 +458,74 @@ def main():
     parser.add_argument('--output_dir', 
                       help='Output directory path',
                       default=default_output)
+    parser.add_argument('--batch_size', type=int, default=100,
+                      help='Number of files analyzed between flushes of the partial output')
+    parser.add_argument('--flush_interval', type=float, default=60.0,
+                      help='Maximum number of seconds between flushes of the partial output')
+    parser.add_argument('--follow_renames', action='store_true',
+                      help='Compute each file\'s metrics over its whole history, across renames')
+    parser.add_argument('--history_table', action='store_true',
+                      help='Compute all per-file metrics from one columnar numstat table instead of per-file git calls')
+    parser.add_argument('--restart', action='store_true',
+                      help='Ignore the run journal and analyze every repository again')
+    parser.add_argument('--shard',
+                      help='Only analyze shard i/N of the repositories, writing to <output_dir>/shard-i-of-N')
+    parser.add_argument('--plan_file',
+                      help='Shard plan shared by all nodes (default: <output_dir>/shard_plan.csv)')
+    parser.add_argument('--project',
+                      help='Analyze only this repository (used by RepoScheduler); exits non-zero on failure')
+    parser.add_argument('--queue_dir',
+                      help='Pull repositories from a shared work queue instead of a fixed list')
+    parser.add_argument('--lease_timeout', type=float, default=600.0,
+                      help='Seconds without a heartbeat after which a queued repository is reclaimed')
     
     args = parser.parse_args()
     
-    os.makedirs(args.output_dir, exist_ok=True)
+    if args.project:
+        rows = process_project(args.project, args.output_dir, batch_size=args.batch_size,
+                               flush_interval=args.flush_interval, follow_renames=args.follow_renames,
+                               history_table=args.history_table)
+        raise SystemExit(0 if rows is not None else 1)
+    
+    if args.queue_dir:
+        run_queue_worker(args)
+        return
+    
+    output_dir = args.output_dir
+    project_names = os.listdir(args.input_dir)
+    if args.shard:
+        # Size-balanced subset of the repositories; merge with 'Sharding.py merge'
+        plan_file = args.plan_file or os.path.join(args.output_dir, PLAN_FILE)
+        project_names = shard_projects(args.input_dir, args.shard, plan_file)
+        output_dir = shard_dir(args.output_dir, args.shard)
+        print(f"Shard {args.shard}: {len(project_names)} repositories")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Repositories completed by earlier (possibly interrupted) runs are skipped
+    journal = RunJournal(os.path.join(output_dir, JOURNAL_FILE))
+    if args.restart:
+        journal.reset(partial_dir=output_dir)
+    params = run_params(args.follow_renames, args.history_table)
     
-    for project_name in os.listdir(args.input_dir):
+    for project_name in project_names:
         project_path = os.path.join(args.input_dir, project_name)
         
         if not os.path.isdir(project_path):
             continue
         
-        process_project(project_path, args.output_dir)
+        output_file = os.path.join(output_dir, f'{project_name}_fault_proneness.csv')
+        # A repository whose HEAD moved (e.g. after a fresh clone) is analyzed again
+        head = repo_head(project_path)
+        if journal.is_done(project_name, output_file, head=head, params=params):
+            print(f"Skipping {project_name} - completed in an earlier run")
+            continue
+        
+        rows = process_project(project_path, output_dir, batch_size=args.batch_size,
+                               flush_interval=args.flush_interval, follow_renames=args.follow_renames,
+                               history_table=args.history_table)
+        if rows is not None:
+            journal.record(project_name, rows=rows, head=head, params=params)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,297 @@
+import os
+import re
+import csv
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+HEADER_MARKER = '\x01'
+FIELD_SEPARATOR = '\x1f'
+NUMSTAT_PATTERN = re.compile(r'^(\d+|-)\t(\d+|-)\t(.*)$', re.S)
+
+CP_HEADER = ['Filename', 'Changes', 'TotalCommits', 'Insertions', 'Deletions']
+INDEX_HEADER = ['LineageID', 'Path', 'CurrentPath']
+
+
+def iter_history(repo_path: str, ref: str = 'HEAD'):
+    """
+    Stream the history of a repository once with rename detection, newest first.
+
+    Yields (sha, parents, message, changes) per commit, where changes is a list of
+    (status, old_path, new_path, insertions, deletions). old_path is None unless
+    the file was renamed or copied; insertions/deletions are 0 for binary files.
+    Merge commits are yielded without changes, as in a plain 'git log'.
+    """
+    command = [
+        'git', '-C', str(repo_path), '-c', 'core.quotepath=off',
+        'log', '-M', '--topo-order', '--raw', '--numstat', '-z',
+        f'--format={HEADER_MARKER}%H{FIELD_SEPARATOR}%P{FIELD_SEPARATOR}%B', ref
+    ]
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    tokens = iter(output.decode('utf-8', errors='replace').split('\0'))
+
+    commit = None
+    entries = []
+    numstat = {}
+
+    def finish():
+        changes = []
+        for status, old_path, new_path in entries:
+            insertions, deletions = numstat.get(new_path, (0, 0))
+            changes.append((status, old_path, new_path, insertions, deletions))
+        return commit[0], commit[1], commit[2], changes
+
+    for token in tokens:
+        token = token.lstrip('\n')
+        if not token:
+            continue
+        if token.startswith(HEADER_MARKER):
+            if commit is not None:
+                yield finish()
+            sha, parents, message = token[1:].split(FIELD_SEPARATOR, 2)
+            commit = (sha, parents.split(), message)
+            entries = []
+            numstat = {}
+        elif token.startswith(':'):
+            # ':<old mode> <new mode> <old blob> <new blob> <status><score>' then one or two paths
+            status = token.split()[-1][0]
+            if status in 'RC':
+                entries.append((status, next(tokens), next(tokens)))
+            else:
+                entries.append((status, None, next(tokens)))
+        else:
+            match = NUMSTAT_PATTERN.match(token)
+            if match is None:
+                continue
+            path = match.group(3)
+            if not path:
+                # Renamed or copied: the old and new path follow as separate tokens
+                next(tokens)
+                path = next(tokens)
+            numstat[path] = (int(match.group(1)) if match.group(1) != '-' else 0,
+                             int(match.group(2)) if match.group(2) != '-' else 0)
+
+    if commit is not None:
+        yield finish()
+
+
+class FileLineage:
+    """
+    Stable identities of files across renames, built from one history pass.
+
+    Every historical path is mapped to a lineage ID; a lineage collects the
+    changes of a file under all the names it had, which is what 'git log --follow'
+    finds for one file at a time. Commits are numbered by their position in the
+    log (0 = newest).
+
+    A path deleted and later added again continues its lineage, as path-based
+    history does. A path that was renamed away and later added again starts a
+    new one.
+    """
+
+    def __init__(self):
+        self.shas: List[str] = []
+        self.messages: List[str] = []
+        # Lineage ID -> list of (commit ordinal, path, status, insertions, deletions), newest first
+        self.events: List[List[Tuple[int, str, str, int, int]]] = []
+        self.path_ids: Dict[str, int] = {}
+        self.current: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, repo_path: str, ref: str = 'HEAD') -> 'FileLineage':
+        return cls.from_commits(list(iter_history(repo_path, ref)))
+
+    @classmethod
+    def from_commits(cls, commits) -> 'FileLineage':
+        """Build the index from the records of iter_history, newest first."""
+        lineage = cls()
+        for sha, _, message, _ in commits:
+            lineage.shas.append(sha)
+            lineage.messages.append(message)
+
+        live: Dict[str, int] = {}
+        deleted: Dict[str, int] = {}
+        renamed: Dict[str, int] = {}
+        events = defaultdict(list)
+
+        def new_lineage():
+            lineage.events.append([])
+            return len(lineage.events) - 1
+
+        # Oldest first, so a rename always maps onto the lineage its source already has
+        for ordinal in range(len(commits) - 1, -1, -1):
+            for status, old_path, path, insertions, deletions in commits[ordinal][3]:
+                if status == 'A':
+                    renamed.pop(path, None)
+                    file_id = live.get(path)
+                    if file_id is None:
+                        file_id = deleted.pop(path, None)
+                    if file_id is None:
+                        file_id = new_lineage()
+                    live[path] = file_id
+                elif status == 'D':
+                    file_id = live.pop(path, None)
+                    if file_id is None:
+                        file_id = renamed.get(path)
+                    if file_id is None:
+                        file_id = new_lineage()
+                    deleted[path] = file_id
+                elif status == 'R':
+                    file_id = live.pop(old_path, None)
+                    if file_id is None:
+                        file_id = renamed.get(old_path, deleted.get(old_path))
+                    if file_id is None:
+                        file_id = new_lineage()
+                    # Side branches may still modify the old path before they are merged
+                    renamed[old_path] = file_id
+                    deleted.pop(path, None)
+                    live[path] = file_id
+                elif status == 'C':
+                    file_id = new_lineage()
+                    live[path] = file_id
+                else:
+                    file_id = live.get(path)
+                    if file_id is None:
+                        file_id = renamed.get(path)
+                    if file_id is None:
+                        file_id = new_lineage()
+                        live[path] = file_id
+                events[file_id].append((ordinal, path, status, insertions, deletions))
+                lineage.path_ids[path] = file_id
+                if old_path is not None and status == 'R':
+                    lineage.path_ids.setdefault(old_path, file_id)
+
+        for file_id, file_events in events.items():
+            file_events.reverse()
+            lineage.events[file_id] = file_events
+        lineage.current = live
+        return lineage
+
+    def __len__(self):
+        return len(self.events)
+
+    def lineage_id(self, path: str) -> Optional[int]:
+        """Lineage of a file at HEAD, or of the last file that had this path."""
+        file_id = self.current.get(path)
+        return file_id if file_id is not None else self.path_ids.get(path)
+
+    def paths(self, file_id: int) -> List[str]:
+        """All names of a lineage, newest first."""
+        seen = []
+        for _, path, _, _, _ in self.events[file_id]:
+            if path not in seen:
+                seen.append(path)
+        return seen
+
+    def commits(self, file_id: int) -> List[int]:
+        """Ordinals of the commits that changed a lineage, newest first."""
+        ordinals = []
+        for ordinal, _, _, _, _ in self.events[file_id]:
+            if not ordinals or ordinals[-1] != ordinal:
+                ordinals.append(ordinal)
+        return ordinals
+
+    def file_metrics(self, path: str, is_fix: Callable[[str], bool] = None) -> Dict[str, int]:
+        """
+        History metrics of a file over its whole lineage.
+
+        As in FaultProneness, the oldest commit (the file's creation) is not
+        counted in Insertions, Deletions and FaultCount.
+
+        Returns:
+        dict: TotalCommits, Insertions, Deletions, FaultCount and CommitsSinceCreation
+        """
+        file_id = self.lineage_id(path)
+        if file_id is None:
+            return {'TotalCommits': 0, 'Insertions': 0, 'Deletions': 0, 'FaultCount': 0, 'CommitsSinceCreation': 0}
+
+        file_events = self.events[file_id]
+        oldest = file_events[-1][0]
+        insertions = sum(event[3] for event in file_events if event[0] != oldest)
+        deletions = sum(event[4] for event in file_events if event[0] != oldest)
+        commits = self.commits(file_id)
+        fault_count = sum(1 for ordinal in commits[:-1] if is_fix(self.messages[ordinal])) if is_fix else 0
+        return {
+            'TotalCommits': len(commits),
+            'Insertions': insertions,
+            'Deletions': deletions,
+            'FaultCount': fault_count,
+            'CommitsSinceCreation': oldest,
+        }
+
+    def write_index(self, output_file: str):
+        """Write every historical path with its lineage and the lineage's name at HEAD."""
+        current_names = {file_id: path for path, file_id in self.current.items()}
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(INDEX_HEADER)
+            for path, file_id in sorted(self.path_ids.items(), key=lambda item: (item[1], item[0])):
+                writer.writerow([file_id, path, current_names.get(file_id, '')])
+
+
+def change_metrics(lineage: FileLineage, extension: str = '.py') -> List[Tuple[str, int, int, int, int]]:
+    """
+    Rename-aware version of head_analyze_full_file_name.sh, from a single history pass.
+
+    For every file at HEAD: Changes is the number of commits over its lineage
+    (what 'git log --follow' counts), TotalCommits the number of commits after
+    its creation and Insertions/Deletions the lines changed after its creation.
+
+    Returns:
+    list: (Filename, Changes, TotalCommits, Insertions, Deletions) sorted by file name
+    """
+    rows = []
+    for path in sorted(lineage.current):
+        if not path.endswith(extension):
+            continue
+        metrics = lineage.file_metrics(path)
+        rows.append((path, metrics['TotalCommits'], metrics['CommitsSinceCreation'],
+                     metrics['Insertions'], metrics['Deletions']))
+    return rows
+
+
+def process_project(project_path: str, output_dir: str, write_index: bool = False):
+    os.makedirs(output_dir, exist_ok=True)
+    project_name = os.path.basename(project_path)
+    output_file = os.path.join(output_dir, f'{project_name}_lineage_changes.csv')
+
+    try:
+        lineage = FileLineage.build(project_path)
+        rows = change_metrics(lineage)
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CP_HEADER)
+            writer.writerows(rows)
+        if write_index:
+            lineage.write_index(os.path.join(output_dir, f'{project_name}_lineage.csv'))
+
+        print(f"Lineage analysis complete for {project_name}. Processed {len(rows)} files.")
+        print(f"Results written to: {output_file}")
+
+    except Exception as e:
+        print(f"Error analyzing project {project_name}: {str(e)}")
+
+
+def main():
+    default_input = '/home/siam/Desktop/volume1/MS_Papers_Arif/PynoseProjects'
+    default_output = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/Lineage'
+
+    parser = argparse.ArgumentParser(description='Rename-aware per-file change metrics from one git log pass')
+    parser.add_argument('--input_dir', help='Directory containing Git repositories', default=default_input)
+    parser.add_argument('--output_dir', help='Output directory path', default=default_output)
+    parser.add_argument('--write_index', action='store_true',
+                        help='Also write <project>_lineage.csv mapping every historical path to its lineage')
+    args = parser.parse_args()
+
+    for project_name in sorted(os.listdir(args.input_dir)):
+        project_path = os.path.join(args.input_dir, project_name)
+
+        if not os.path.isdir(project_path):
+            continue
+
+        process_project(project_path, args.output_dir, args.write_index)
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,8 @@
 import pandas as pd
 import os
 from pathlib import Path
+from PathIndex import PATH_INDEX_DIR, project_dictionary, ensure_ids
+from Schemas import load_csv
 
 def get_project_names(smells_dir, fp_dir):
     """
@@ -53,13 +55,14 @@ def get_project_names(smells_dir, fp_dir):
     common_projects = smell_files.intersection(fp_files)
     return sorted(list(common_projects))
 
-def merge_project_data(base_path, project_name):
+def merge_project_data(base_path, project_name, dictionary):
     """
     Merge smell and fault proneness data for a specific project.
     
     Parameters:
     base_path (str): Base path to the data directory
     project_name (str): Name of the project to process
+    dictionary (PathDictionary): The project's locked path dictionary
     
     Returns:
     pd.DataFrame: Merged dataframe
@@ -70,19 +73,26 @@ def merge_project_data(base_path, project_name):
     
     # Read the CSV files
     try:
-        smells_cp_df = pd.read_csv(smells_path)
-        fault_proneness_df = pd.read_csv(fp_path)
+        smells_cp_df = load_csv(smells_path, 'smells_cp')
+        fault_proneness_df = load_csv(fp_path, 'fault_proneness')
         
         print(f"\nProcessing {project_name}:")
         print(f"Columns in smells CSV: {smells_cp_df.columns.tolist()}")
         print(f"Columns in fault proneness CSV: {fault_proneness_df.columns.tolist()}")
         
-        # Merge the dataframes
+        # Intern paths of files written before the path index existed
+        smells_cp_df = ensure_ids(smells_cp_df, 'TestFile', 'TestFileID', dictionary)
+        fault_proneness_df = ensure_ids(fault_proneness_df, 'File', 'FileID', dictionary)
+        
+        # The smell FileID equals TestFileID after the revision step
+        smells_cp_df = smells_cp_df.drop(columns=['FileID'], errors='ignore')
+        
+        # Merge the dataframes on the file IDs
         merged_df = pd.merge(
-            smells_cp_df,
-            fault_proneness_df,
-            left_on='TestFile',
-            right_on='File',
+            smells_cp_df.dropna(subset=['TestFileID']),
+            fault_proneness_df.dropna(subset=['FileID']),
+            left_on='TestFileID',
+            right_on='FileID',
             how='inner'
         )
         
@@ -121,16 +131,18 @@ def process_all_projects(base_path):
     failed = 0
     
     for project in projects:
-        merged_df = merge_project_data(base_path, project)
-        
-        if merged_df is not None:
-            # Save the merged dataframe
-            output_path = os.path.join(output_dir, f'_{project}_final.csv')
-            merged_df.to_csv(output_path, index=False)
-            print(f"Saved merged data to: {output_path}\n")
-            successful += 1
-        else:
-            failed += 1
+        # The merged rows carry the interned IDs, so keep the dictionary locked until they are saved
+        with project_dictionary(project, PATH_INDEX_DIR) as dictionary:
+            merged_df = merge_project_data(base_path, project, dictionary)
+            
+            if merged_df is not None:
+                # Save the merged dataframe
+                output_path = os.path.join(output_dir, f'_{project}_final.csv')
+                merged_df.to_csv(output_path, index=False)
+                print(f"Saved merged data to: {output_path}\n")
+                successful += 1
+            else:
+                failed += 1
     
     # Print summary
     print("\nProcessing Summary:")
@@ -138,8 +150,9 @@ def process_all_projects(base_path):
     print(f"Successfully processed: {successful}")
     print(f"Failed to process: {failed}")
 
-# Base path to your data directory
-base_path = '/home/iit/Downloads/Thesis/Data'
-
-# Process all projects
-process_all_projects(base_path)
\ No newline at end of file
+if __name__ == "__main__":
+    # Base path to your data directory
+    base_path = '/home/iit/Downloads/Thesis/Data'
+    
+    # Process all projects
+    process_all_projects(base_path)
@@ -0,0 +1,434 @@
+import os
+import array
+import argparse
+import subprocess
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from CommitRecords import is_bug_fix_message
+from FileLineage import FileLineage
+from PathIndex import PathDictionary
+
+HEADER_MARKER = '\x01'
+FIELD_SEPARATOR = '\x1f'
+
+METRIC_COLUMNS = ['TotalCommits', 'Insertions', 'Deletions', 'FaultCount', 'Is_Faulty']
+# Per-version change files, as written by head_analyze_change_with_checkout.sh
+CLASS_CHANGES_HEADER = ['ClassName', 'Changes', 'TotalCommits', 'Insertions', 'Deletions']
+
+
+def commit_times(repo_path: str, ref: str = 'HEAD') -> dict:
+    """Committer timestamp of every commit reachable from ref."""
+    command = ['git', '-C', str(repo_path), 'log', '--format=%H %ct', ref]
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    return {sha: int(timestamp) for sha, timestamp in (line.split() for line in output.decode('ascii').splitlines())}
+
+
+def merged_tags(repo_path: str, ref: str = 'HEAD') -> list:
+    """Tags in the history of ref, oldest first."""
+    command = ['git', '-C', str(repo_path), 'tag', '--merged', ref, '--sort=creatordate']
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    return output.decode('utf-8', errors='replace').split()
+
+
+class HistoryTable:
+    """
+    The mined history of a repository as a columnar table.
+
+    One row per (commit, file) change with integer IDs:
+    commit (ordinal in the log, 0 = newest), file, added, deleted.
+    Per-commit columns: sha, time (committer timestamp) and is_fix.
+
+    File IDs come from a PathDictionary (one ID per path) or, with
+    follow_renames, from a FileLineage (one ID per file across renames).
+    Per-file metrics are group reductions over the rows, e.g. faulty churn is
+
+        table.aggregate(table.added, mask=table.is_fix)
+
+    Windowed metrics (between two tags, dates or ordinals) are differences of
+    per-file cumulative sums over the commit ordinals, so a window costs a few
+    binary searches per file once the sums exist, however many windows there are.
+    """
+
+    def __init__(self, commit, file, added, deleted, shas, commit_time, commit_is_fix, paths,
+                 dictionary: PathDictionary = None, lineage: FileLineage = None):
+        self.commit = np.asarray(commit, dtype=np.int32)
+        self.file = np.asarray(file, dtype=np.int32)
+        self.added = np.asarray(added, dtype=np.int32)
+        self.deleted = np.asarray(deleted, dtype=np.int32)
+        self.shas = shas
+        self.commit_time = np.asarray(commit_time, dtype=np.int64)
+        self.commit_is_fix = np.asarray(commit_is_fix, dtype=bool)
+        self.paths = paths
+        self.dictionary = dictionary
+        self.lineage = lineage
+        self.num_files = len(paths)
+        self.repo_path = None
+        self._oldest = None
+        self._creation = None
+        self._first = None
+        self._cumulative = None
+        self._ordinals = None
+
+    @classmethod
+    def build(cls, repo_path: str, follow_renames: bool = False, dictionary: PathDictionary = None,
+              ref: str = 'HEAD') -> 'HistoryTable':
+        if follow_renames:
+            table = cls.from_lineage(FileLineage.build(repo_path, ref))
+            times = commit_times(repo_path, ref)
+            table.commit_time = np.array([times.get(sha, 0) for sha in table.shas], dtype=np.int64)
+            table.repo_path = str(repo_path)
+            return table
+        return cls.from_log(repo_path, dictionary, ref)
+
+    @classmethod
+    def from_log(cls, repo_path: str, dictionary: PathDictionary = None, ref: str = 'HEAD') -> 'HistoryTable':
+        """Build from one 'git log --numstat' pass; file IDs are path IDs of the dictionary."""
+        dictionary = dictionary or PathDictionary(os.path.basename(os.path.normpath(repo_path)))
+        command = ['git', '-C', str(repo_path), '-c', 'core.quotepath=off', 'log', '--no-renames', '--numstat',
+                   '-z', f'--format={HEADER_MARKER}%H{FIELD_SEPARATOR}%ct{FIELD_SEPARATOR}%B', ref]
+        output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+
+        commit, file, added, deleted = (array.array('i') for _ in range(4))
+        shas, commit_time, commit_is_fix = [], [], []
+        for token in output.decode('utf-8', errors='replace').split('\0'):
+            token = token.lstrip('\n')
+            if not token:
+                continue
+            if token.startswith(HEADER_MARKER):
+                sha, timestamp, message = token[1:].split(FIELD_SEPARATOR, 2)
+                shas.append(sha)
+                commit_time.append(int(timestamp))
+                commit_is_fix.append(is_bug_fix_message(message))
+                continue
+            fields = token.split('\t', 2)
+            if len(fields) != 3 or not shas:
+                continue
+            commit.append(len(shas) - 1)
+            file.append(dictionary.intern(fields[2]))
+            added.append(int(fields[0]) if fields[0] != '-' else 0)
+            deleted.append(int(fields[1]) if fields[1] != '-' else 0)
+
+        table = cls(commit, file, added, deleted, shas, commit_time, commit_is_fix, dictionary.paths,
+                    dictionary=dictionary)
+        table.repo_path = str(repo_path)
+        return table
+
+    @classmethod
+    def from_lineage(cls, lineage: FileLineage) -> 'HistoryTable':
+        """Build from a FileLineage; file IDs are lineage IDs."""
+        commit, file, added, deleted = (array.array('i') for _ in range(4))
+        for file_id, file_events in enumerate(lineage.events):
+            for ordinal, _, _, insertions, deletions in file_events:
+                commit.append(ordinal)
+                file.append(file_id)
+                added.append(insertions)
+                deleted.append(deletions)
+        paths = [lineage.paths(file_id)[0] if lineage.events[file_id] else '' for file_id in range(len(lineage))]
+        # FileLineage keeps messages; the committer time is not part of its log format (build() adds it)
+        return cls(commit, file, added, deleted, lineage.shas, np.zeros(len(lineage.shas), dtype=np.int64),
+                   [is_bug_fix_message(message) for message in lineage.messages], paths, lineage=lineage)
+
+    def __len__(self):
+        return len(self.commit)
+
+    @property
+    def is_fix(self) -> np.ndarray:
+        """Per-row bug-fix flag of the row's commit."""
+        return self.commit_is_fix[self.commit]
+
+    def file_id(self, path: str) -> Optional[int]:
+        if self.lineage is not None:
+            return self.lineage.lineage_id(path)
+        return self.dictionary.lookup(path)
+
+    @property
+    def creation(self) -> np.ndarray:
+        """Ordinal of the oldest commit of every file (-1 for IDs without changes)."""
+        if self._creation is None:
+            self._creation = np.full(self.num_files, -1, dtype=np.int32)
+            np.maximum.at(self._creation, self.file, self.commit)
+        return self._creation
+
+    @property
+    def oldest(self) -> np.ndarray:
+        """Rows of the oldest commit of their file (its creation, in a path-limited log)."""
+        if self._oldest is None:
+            self._oldest = self.commit == self.creation[self.file]
+        return self._oldest
+
+    @property
+    def first_in_commit(self) -> np.ndarray:
+        """One row per (file, commit), for counting commits when a commit changed a file twice."""
+        if self._first is None:
+            order = np.lexsort((self.commit, self.file))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = (self.file[order][1:] != self.file[order][:-1]) | (self.commit[order][1:] != self.commit[order][:-1])
+            self._first = np.empty(len(order), dtype=bool)
+            self._first[order] = first
+        return self._first
+
+    def aggregate(self, values, mask=None, exclude_oldest: bool = True) -> np.ndarray:
+        """
+        Sum values (a per-row array or scalar) per file over the rows selected by mask.
+
+        As in FaultProneness, the oldest commit of a file is excluded unless exclude_oldest is False.
+        """
+        selected = np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if exclude_oldest:
+            selected = selected & ~self.oldest
+        weights = np.broadcast_to(np.asarray(values, dtype=np.float64), (len(self),))
+        return np.bincount(self.file[selected], weights=weights[selected], minlength=self.num_files).astype(np.int64)
+
+    def file_metrics(self) -> pd.DataFrame:
+        """TotalCommits, Insertions, Deletions, FaultCount and Is_Faulty of every file, indexed by file ID."""
+        fault_count = self.aggregate(1, mask=self.is_fix & self.first_in_commit)
+        metrics = pd.DataFrame({
+            'File': self.paths,
+            'TotalCommits': self.aggregate(1, mask=self.first_in_commit, exclude_oldest=False),
+            'Insertions': self.aggregate(self.added),
+            'Deletions': self.aggregate(self.deleted),
+            'FaultCount': fault_count,
+            'Is_Faulty': (fault_count > 0).astype(np.int64),
+        })
+        metrics.index.name = 'FileID'
+        return metrics
+
+    def ordinal(self, revision) -> int:
+        """
+        Ordinal of a revision (tag, branch, SHA) in the table's history.
+
+        Integers are taken as ordinals. Raises ValueError for revisions that do
+        not resolve to a commit of the history.
+        """
+        if isinstance(revision, (int, np.integer)):
+            return int(revision)
+        if self._ordinals is None:
+            self._ordinals = {sha: ordinal for ordinal, sha in enumerate(self.shas)}
+        ordinal = self._ordinals.get(revision)
+        if ordinal is None and self.repo_path is not None:
+            result = subprocess.run(['git', '-C', self.repo_path, 'rev-parse', '--verify', '-q', f'{revision}^{{commit}}'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            ordinal = self._ordinals.get(result.stdout.decode('ascii').strip())
+        if ordinal is None:
+            raise ValueError(f"Revision '{revision}' is not in the history of the table")
+        return ordinal
+
+    def ordinal_at(self, timestamp) -> np.ndarray:
+        """
+        Ordinal of the newest commit at or before a committer timestamp (or array of them).
+
+        Committer times are not strictly ordered in the log, so the running minimum
+        from the newest commit is searched; times before the first commit give
+        len(shas), i.e. the end of the history.
+        """
+        running_min = np.minimum.accumulate(self.commit_time)
+        return np.searchsorted(-running_min, -np.asarray(timestamp, dtype=np.int64), side='left')
+
+    def resolve(self, bound) -> int:
+        """Ordinal of a window bound given as an ordinal, a revision or a date ('2021-06-30')."""
+        try:
+            return self.ordinal(bound)
+        except ValueError:
+            try:
+                timestamp = pd.Timestamp(bound)
+            except ValueError:
+                raise ValueError(f"'{bound}' is neither a revision in the history nor a date")
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.tz_localize('UTC')
+            return int(self.ordinal_at(int(timestamp.timestamp())))
+
+    def _cumulative_sums(self):
+        """
+        Rows sorted by (file, commit) with a combined search key, and the running
+        sums of every metric along that order (with a leading 0).
+        """
+        if self._cumulative is None:
+            order = np.lexsort((self.commit, self.file))
+            stride = len(self.shas) + 1
+            key = self.file[order].astype(np.int64) * stride + self.commit[order]
+            counted = ~self.oldest[order]
+            first = self.first_in_commit[order]
+            values = {
+                'TotalCommits': first,
+                'Insertions': np.where(counted, self.added[order], 0),
+                'Deletions': np.where(counted, self.deleted[order], 0),
+                'FaultCount': first & counted & self.is_fix[order],
+            }
+            sums = {name: np.concatenate(([0], np.cumsum(column, dtype=np.int64))) for name, column in values.items()}
+            self._cumulative = (key, stride, sums)
+        return self._cumulative
+
+    def window_sums(self, starts, ends):
+        """
+        Metrics of every file in many windows at once.
+
+        Window i holds the commits with ends[i] <= ordinal < starts[i], i.e. the
+        commits after starts[i] up to and including ends[i], like 'git log start..end'
+        on a linear history. As in file_metrics, the oldest commit of a file is
+        counted in TotalCommits only.
+
+        Returns:
+        dict: metric name -> int64 array of shape (windows, files)
+        """
+        key, stride, sums = self._cumulative_sums()
+        base = np.arange(self.num_files, dtype=np.int64) * stride
+        starts = np.atleast_1d(np.asarray(starts, dtype=np.int64))[:, None]
+        ends = np.atleast_1d(np.asarray(ends, dtype=np.int64))[:, None]
+        upper = np.searchsorted(key, base + np.clip(starts, 0, stride - 1))
+        lower = np.searchsorted(key, base + np.clip(ends, 0, stride - 1))
+        return {name: total[upper] - total[lower] for name, total in sums.items()}
+
+    def window_metrics(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Per-file metrics of the commits after start up to and including end.
+
+        Parameters:
+        start: Ordinal, revision or date the window starts after (default: before the first commit)
+        end: Ordinal, revision or date the window ends at (default: the newest commit)
+
+        Returns:
+        pd.DataFrame: File and METRIC_COLUMNS indexed by FileID, as file_metrics
+        """
+        start = len(self.shas) if start is None else self.resolve(start)
+        end = 0 if end is None else self.resolve(end)
+        sums = self.window_sums([start], [end])
+        metrics = pd.DataFrame({'File': self.paths, **{name: sums[name][0] for name in sums}})
+        metrics['Is_Faulty'] = (metrics['FaultCount'] > 0).astype(np.int64)
+        metrics.index.name = 'FileID'
+        return metrics
+
+    def sliding_windows(self, days: int, step_days: int = None):
+        """
+        (start, end, label) ordinals of windows of the given length in days, one
+        every step_days (default: non-overlapping), from the first commit on.
+        """
+        step = (step_days or days) * 86400
+        if not len(self.shas):
+            return []
+        first, last = int(self.commit_time.min()), int(self.commit_time.max())
+        # Window k covers the committer times (first - 1 + k*step, first - 1 + k*step + days]
+        window_starts = np.arange(first - 1, last, step, dtype=np.int64)
+        window_ends = window_starts + days * 86400
+        starts, ends = self.ordinal_at(window_starts), self.ordinal_at(window_ends)
+        labels = pd.to_datetime(window_ends, unit='s').strftime('%Y-%m-%d')
+        return list(zip(starts.tolist(), ends.tolist(), labels))
+
+    def windowed_frame(self, windows) -> pd.DataFrame:
+        """
+        Long-format metrics of many (start, end, label) windows, one row per file
+        changed in a window, computed in one pass over the cumulative sums.
+        """
+        windows = list(windows)
+        if not windows:
+            return pd.DataFrame(columns=['Window', 'FileID', 'File'] + METRIC_COLUMNS)
+        starts = [self.resolve(start) for start, _, _ in windows]
+        ends = [self.resolve(end) for _, end, _ in windows]
+        sums = self.window_sums(starts, ends)
+        window_index, file_index = np.nonzero(sums['TotalCommits'])
+        paths = np.asarray(self.paths, dtype=object)
+        frame = pd.DataFrame({
+            'Window': np.asarray([label for _, _, label in windows], dtype=object)[window_index],
+            'FileID': file_index,
+            'File': paths[file_index],
+            **{name: sums[name][window_index, file_index] for name in sums},
+        })
+        frame['Is_Faulty'] = (frame['FaultCount'] > 0).astype(np.int64)
+        return frame
+
+    def version_changes(self, versions, extension: str = '.py') -> list:
+        """
+        Per-version change tables in the format of head_analyze_change_with_checkout.sh,
+        for many versions from one history pass instead of a checkout and a
+        shell run per version.
+
+        For a version at commit V, Changes is the number of commits after the
+        first commit up to V that changed the file, TotalCommits the number of
+        commits (of any file) from its creation to V and Insertions/Deletions
+        the lines changed after its creation up to V. Creation is the oldest
+        commit of the file ID: the shell script restarts a path that was deleted
+        and added again at its re-addition.
+
+        Returns:
+        list: one DataFrame with CLASS_CHANGES_HEADER columns per version, in order
+        """
+        ends = np.array([self.resolve(version) for version in versions], dtype=np.int64)
+        sums = self.window_sums(np.full(len(ends), len(self.shas) - 1), ends)
+        selected = np.array([path.endswith(extension) for path in self.paths], dtype=bool)
+        class_names = pd.Series(self.paths, dtype=object).map(lambda path: os.path.basename(path)[:-len(extension)])
+        tables = []
+        for index, end in enumerate(ends):
+            rows = selected & (sums['TotalCommits'][index] > 0)
+            tables.append(pd.DataFrame({
+                'ClassName': class_names[rows].to_numpy(),
+                'Changes': sums['TotalCommits'][index][rows],
+                'TotalCommits': self.creation[rows] - end,
+                'Insertions': sums['Insertions'][index][rows],
+                'Deletions': sums['Deletions'][index][rows],
+            }))
+        return tables
+
+    def to_frame(self) -> pd.DataFrame:
+        """The rows as a DataFrame (commit, file, added, deleted, is_fix)."""
+        return pd.DataFrame({'commit': self.commit, 'file': self.file, 'added': self.added,
+                             'deleted': self.deleted, 'is_fix': self.is_fix})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-file churn and fault metrics from a columnar history table')
+    parser.add_argument('repo_path', help='Path to the Git repository')
+    parser.add_argument('--output_file', help='CSV for the per-file metrics (default: print a summary)')
+    parser.add_argument('--follow_renames', action='store_true', help='One file ID per file across renames')
+    parser.add_argument('--since', help='Only count commits after this revision or date')
+    parser.add_argument('--until', help='Only count commits up to this revision or date')
+    parser.add_argument('--window_days', type=int, help='Metrics of sliding windows of this many days (long format)')
+    parser.add_argument('--step_days', type=int, help='Days between sliding windows (default: --window_days)')
+    parser.add_argument('--versions', nargs='*',
+                        help='Write per-version change files for these revisions (no value: every tag) to --output_dir')
+    parser.add_argument('--output_dir', help='Directory for the per-version change files, <project>/<n>.csv')
+    parser.add_argument('--extension', default='.py', help='Source file extension of the per-version change files')
+    args = parser.parse_args()
+
+    table = HistoryTable.build(args.repo_path, follow_renames=args.follow_renames)
+    print(f"{len(table)} changes, {len(table.shas)} commits, {table.num_files} files")
+
+    if args.versions is not None:
+        if not args.output_dir:
+            parser.error('--versions needs --output_dir')
+        versions = args.versions or merged_tags(args.repo_path)
+        project_name = os.path.basename(os.path.normpath(args.repo_path))
+        os.makedirs(os.path.join(args.output_dir, project_name), exist_ok=True)
+        with open(os.path.join(args.output_dir, f'{project_name}_versions.csv'), 'w') as f:
+            f.write('Version,Revision,Commit\n')
+            for number, (version, changes) in enumerate(zip(versions, table.version_changes(versions, args.extension)), 1):
+                changes.to_csv(os.path.join(args.output_dir, project_name, f'{number}.csv'), index=False)
+                f.write(f'{number},{version},{table.shas[table.resolve(version)]}\n')
+        print(f"{len(versions)} versions written to: {os.path.join(args.output_dir, project_name)}")
+        return
+
+    if args.window_days:
+        metrics = table.windowed_frame(table.sliding_windows(args.window_days, args.step_days))
+        print(f"{metrics['Window'].nunique()} windows with changes")
+        if args.output_file:
+            metrics.to_csv(args.output_file, index=False)
+            print(f"Results written to: {args.output_file}")
+        else:
+            print(metrics.groupby('Window')[['TotalCommits', 'FaultCount']].sum().to_string())
+        return
+
+    if args.since or args.until:
+        metrics = table.window_metrics(args.since, args.until)
+        metrics = metrics[metrics['TotalCommits'] > 0]
+    else:
+        metrics = table.file_metrics()
+    if args.output_file:
+        metrics.to_csv(args.output_file)
+        print(f"Results written to: {args.output_file}")
+    else:
+        print(metrics.sort_values('TotalCommits', ascending=False).head(20).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+import json
+import argparse
+import operator
+import tempfile
+
+import pandas as pd
+from Schemas import load_csv, apply_schema, schema_fingerprint
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+EXTENSIONS = {'parquet': '.parquet', 'feather': '.feather', 'csv': '.csv'}
+# Bump when the way stored outputs are written changes, to invalidate every stored file
+STORE_VERSION = 1
+
+OPERATORS = {
+    '==': operator.eq, '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+
+def apply_filters(df, filters):
+    """
+    Apply pyarrow-style filters, a list of (column, op, value) tuples combined
+    with AND, to a DataFrame. Supported ops: ==, !=, <, <=, >, >=, in, not in.
+    """
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if op == 'in':
+            mask &= df[column].isin(value)
+        elif op == 'not in':
+            mask &= ~df[column].isin(value)
+        else:
+            mask &= OPERATORS[op](df[column], value).fillna(False).astype(bool)
+    return df[mask]
+
+
+class IntermediateStore:
+    """
+    Stage outputs stored as one columnar file per (stage, project).
+
+    Layout: <root>/<stage>/<project>.<parquet|feather|csv>
+
+    Parquet supports projection and predicate pushdown; Feather supports
+    projection; CSV (the fallback when pyarrow is not installed) is read
+    through the typed loaders of Schemas with the filters applied afterwards.
+
+    An output stored as a copy of a CSV has a '<file>.key' next to it with the
+    store version, the schema fingerprint and the size and mtime of the CSV;
+    it is current only while all of them match.
+
+    Parameters:
+    root (str): Root directory of the store
+    backend (str): 'parquet', 'feather' or 'csv'
+    """
+
+    def __init__(self, root, backend='parquet'):
+        if backend not in EXTENSIONS:
+            raise ValueError(f"Unknown store backend: {backend}")
+        if backend != 'csv' and not HAS_PYARROW:
+            print(f"pyarrow is not installed, falling back to CSV instead of {backend}")
+            backend = 'csv'
+        self.root = root
+        self.backend = backend
+
+    def path(self, stage, project, backend=None):
+        return os.path.join(self.root, stage, f'{project}{EXTENSIONS[backend or self.backend]}')
+
+    def exists(self, stage, project):
+        return any(os.path.exists(self.path(stage, project, backend)) for backend in EXTENSIONS)
+
+    def source_key(self, source_file, kind=None):
+        """Identity of the data a stored copy of source_file holds."""
+        stat = os.stat(source_file)
+        return {'version': STORE_VERSION, 'schema': schema_fingerprint(kind) if kind else None,
+                'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+    def is_current(self, stage, project, source_file, kind=None):
+        """Whether a stored output is a copy of source_file as it is now, typed with the current schema."""
+        if not self.exists(stage, project) or not os.path.exists(source_file):
+            return False
+        stored_file = self.path(stage, project, self._stored_backend(stage, project))
+        try:
+            with open(stored_file + '.key') as f:
+                return json.load(f) == self.source_key(source_file, kind)
+        except (OSError, json.JSONDecodeError):
+            return False
+
+    def projects(self, stage):
+        """List the projects stored for a stage."""
+        stage_dir = os.path.join(self.root, stage)
+        if not os.path.isdir(stage_dir):
+            return []
+        names = set()
+        for file_name in os.listdir(stage_dir):
+            name, extension = os.path.splitext(file_name)
+            if extension in EXTENSIONS.values():
+                names.add(name)
+        return sorted(names)
+
+    def write(self, stage, project, df, source_file=None, kind=None):
+        """
+        Write a stage output atomically and return its path.
+
+        With source_file, the output is recorded as the typed copy of that CSV
+        (see is_current).
+        """
+        output_file = self.path(stage, project)
+        output_dir = os.path.dirname(output_file)
+        os.makedirs(output_dir, exist_ok=True)
+        # Files of the same output in other formats would shadow or outlive this one
+        for backend in EXTENSIONS:
+            for stale_file in (self.path(stage, project, backend) + '.key', self.path(stage, project, backend)):
+                if stale_file != output_file and os.path.exists(stale_file):
+                    os.remove(stale_file)
+
+        fd, temp_file = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+        os.close(fd)
+        df = df.reset_index(drop=True)
+        if self.backend == 'parquet':
+            df.to_parquet(temp_file, index=False)
+        elif self.backend == 'feather':
+            df.to_feather(temp_file)
+        else:
+            df.to_csv(temp_file, index=False)
+        os.replace(temp_file, output_file)
+        if source_file is not None:
+            with open(output_file + '.key', 'w') as f:
+                json.dump(self.source_key(source_file, kind), f)
+        return output_file
+
+    def put(self, stage, project, df, source_file, kind):
+        """Store the output a stage just wrote to source_file, typed as load_csv would read it back."""
+        return self.write(stage, project, apply_schema(df, kind), source_file, kind)
+
+    def load(self, stage, project, source_file, kind, columns=None):
+        """Read a stage output from the store when it is current, else parse its CSV and store it."""
+        if self.is_current(stage, project, source_file, kind):
+            return self.read(stage, project, columns=columns, kind=kind)
+        df = load_csv(source_file, kind)
+        self.write(stage, project, df, source_file, kind)
+        return df if columns is None else df[list(columns)]
+
+    def _stored_backend(self, stage, project):
+        # Prefer the configured backend, but read whatever format a stage was written in
+        for backend in [self.backend] + [b for b in EXTENSIONS if b != self.backend]:
+            if os.path.exists(self.path(stage, project, backend)):
+                return backend
+        raise FileNotFoundError(f"No '{stage}' output stored for {project} in {self.root}")
+
+    def read(self, stage, project, columns=None, filters=None, kind=None):
+        """
+        Read a stage output.
+
+        Parameters:
+        stage (str): Stage name
+        project (str): Project name
+        columns (list): Columns to load (projection)
+        filters (list): (column, op, value) predicates combined with AND
+        kind (str): Schema of the stage, used for typed CSV reads
+
+        Returns:
+        pd.DataFrame: Stored data restricted to the columns and rows requested
+        """
+        backend = self._stored_backend(stage, project)
+        input_file = self.path(stage, project, backend)
+
+        # Filter columns must be loaded even if not projected
+        load_columns = columns
+        if columns is not None and filters:
+            load_columns = list(columns) + [c for c, _, _ in filters if c not in columns]
+
+        if backend == 'parquet':
+            df = pd.read_parquet(input_file, columns=load_columns, filters=filters or None)
+            # Pushdown works on row groups; apply the predicates exactly as well
+            df = apply_filters(df, filters)
+        elif backend == 'feather':
+            df = apply_filters(pd.read_feather(input_file, columns=load_columns), filters)
+        elif kind is not None:
+            df = apply_filters(load_csv(input_file, kind, columns=load_columns), filters)
+        else:
+            df = apply_filters(pd.read_csv(input_file, usecols=load_columns), filters)
+
+        if columns is not None:
+            df = df[list(columns)]
+        return df.reset_index(drop=True)
+
+    def read_all(self, stage, columns=None, filters=None, kind=None, label_column='Project'):
+        """Read a stage output of every project into one frame with a project column."""
+        frames = []
+        for project in self.projects(stage):
+            frames.append(self.read(stage, project, columns, filters, kind).assign(**{label_column: project}))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def export_csv(self, stage, project, output_file):
+        """Export a stored stage output as CSV for human-facing tables."""
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        self.read(stage, project).to_csv(output_file, index=False)
+        return output_file
+
+
+def open_store(store, backend='parquet'):
+    """An IntermediateStore from a store, its root directory (e.g. a pipeline parameter) or None."""
+    if store is None or isinstance(store, IntermediateStore):
+        return store
+    return IntermediateStore(store, backend)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export stage outputs of the intermediate store as CSV')
+    parser.add_argument('root', help='Root directory of the store')
+    parser.add_argument('stage', help='Stage to export')
+    parser.add_argument('output_dir', help='Directory for the exported CSV files')
+    parser.add_argument('--project', action='append', help='Project to export (default: all)')
+    args = parser.parse_args()
+
+    store = IntermediateStore(args.root)
+    for project in args.project or store.projects(args.stage):
+        output_file = store.export_csv(args.stage, project, os.path.join(args.output_dir, f'{project}.csv'))
+        print(f"Exported {args.stage}/{project} to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
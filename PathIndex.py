@@ -0,0 +1,229 @@
+import os
+import fcntl
+import posixpath
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+import pandas as pd
+
+# Default location of the per-project path dictionaries shared by all stages
+PATH_INDEX_DIR = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/PathIndex'
+
+# (index dir, project) locks the current thread holds
+_held_locks = threading.local()
+
+# Prefixes added by the smell detector / IDE exports
+PATH_PREFIXES = ('file://$PROJECT_DIR$/',)
+
+
+def normalize_path(path, case_policy: str = 'preserve'):
+    """
+    Bring a file path into the canonical form used for joins.
+
+    Strips known prefixes, converts separators to '/', removes './' and
+    duplicate separators and optionally lower-cases the path.
+    Missing values are returned as None.
+    """
+    if path is None or (not isinstance(path, str) and pd.isna(path)):
+        return None
+    path = str(path).strip()
+    for prefix in PATH_PREFIXES:
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+    path = path.replace('\\', '/')
+    if not path:
+        return None
+    path = posixpath.normpath(path)
+    if path.startswith('./'):
+        path = path[2:]
+    if case_policy == 'lower':
+        path = path.lower()
+    return path
+
+
+class PathDictionary:
+    """
+    Per-project mapping between canonical file paths and compact integer IDs.
+
+    Every pipeline stage interns its path columns through the same dictionary
+    so that joins between stages are integer joins on identically normalized
+    paths.
+    """
+
+    def __init__(self, project: str, case_policy: str = 'preserve'):
+        if case_policy not in ('preserve', 'lower'):
+            raise ValueError(f"Unknown case policy: {case_policy}")
+        self.project = project
+        self.case_policy = case_policy
+        self.ids: Dict[str, int] = {}
+        self.paths: List[str] = []
+
+    def __len__(self):
+        return len(self.paths)
+
+    def intern(self, path):
+        """Return the ID of a path, assigning a new one if it is unseen."""
+        canonical = normalize_path(path, self.case_policy)
+        if canonical is None:
+            return None
+        file_id = self.ids.get(canonical)
+        if file_id is None:
+            file_id = len(self.paths)
+            self.ids[canonical] = file_id
+            self.paths.append(canonical)
+        return file_id
+
+    def lookup(self, path):
+        """Return the ID of a path without assigning a new one."""
+        canonical = normalize_path(path, self.case_policy)
+        return self.ids.get(canonical) if canonical is not None else None
+
+    def path(self, file_id: int) -> str:
+        return self.paths[file_id]
+
+    def intern_series(self, series: pd.Series) -> pd.Series:
+        """
+        Intern a column of paths. Each distinct raw value is normalized only
+        once; the result is a nullable Int32 column of file IDs.
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        unique_ids = pd.array([self.intern(value) for value in uniques], dtype='Int32')
+        result = pd.Series(pd.array([pd.NA] * len(series), dtype='Int32'), index=series.index)
+        valid = codes >= 0
+        if valid.any():
+            result[valid] = unique_ids[codes[valid]]
+        return result
+
+    def paths_for(self, ids: pd.Series) -> pd.Series:
+        """Map a column of file IDs back to canonical paths."""
+        lookup = pd.Series(self.paths, dtype=object)
+        return ids.map(lambda file_id: lookup[file_id] if pd.notna(file_id) else None)
+
+    def merge(self, other: 'PathDictionary') -> List[str]:
+        """
+        Adopt the IDs of another copy of the dictionary (the one on disk) and
+        re-append the paths only this copy knows.
+
+        Returns:
+        list: Paths whose ID changed, because the other copy assigned theirs first
+        """
+        moved = []
+        own_paths = self.paths
+        self.paths = list(other.paths)
+        self.ids = dict(other.ids)
+        for file_id, path in enumerate(own_paths):
+            if path not in self.ids:
+                self.ids[path] = len(self.paths)
+                self.paths.append(path)
+            if self.ids[path] != file_id:
+                moved.append(path)
+        return moved
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({'FileID': pd.array(range(len(self.paths)), dtype='int32'),
+                             'Path': self.paths})
+
+    def save(self, output_file: str):
+        """Write the dictionary atomically so concurrent readers never see a partial file."""
+        output_dir = os.path.dirname(output_file) or '.'
+        os.makedirs(output_dir, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+        os.close(fd)
+        self.to_frame().to_csv(temp_file, index=False)
+        os.replace(temp_file, output_file)
+
+    @classmethod
+    def load(cls, input_file: str, project: str = None, case_policy: str = 'preserve'):
+        dictionary = cls(project or os.path.basename(input_file).replace('_paths.csv', ''), case_policy)
+        df = pd.read_csv(input_file, dtype={'FileID': 'int32', 'Path': str}, keep_default_na=False)
+        df = df.sort_values('FileID')
+        dictionary.paths = df['Path'].tolist()
+        dictionary.ids = {path: file_id for file_id, path in enumerate(dictionary.paths)}
+        return dictionary
+
+
+def dictionary_file(index_dir: str, project: str) -> str:
+    return os.path.join(index_dir, f'{project}_paths.csv')
+
+
+def load_project_dictionary(project: str, index_dir: str = PATH_INDEX_DIR,
+                            case_policy: str = 'preserve') -> PathDictionary:
+    """Load the path dictionary of a project, or start an empty one."""
+    input_file = dictionary_file(index_dir, project)
+    if os.path.exists(input_file):
+        return PathDictionary.load(input_file, project, case_policy)
+    return PathDictionary(project, case_policy)
+
+
+@contextmanager
+def _dictionary_lock(index_dir: str, project: str):
+    """
+    Exclusive lock on a project's dictionary file, held across processes.
+    Re-entrant within a thread, so a stage holding it can save on every flush.
+    """
+    key = (os.path.abspath(index_dir), project)
+    held = _held_locks.__dict__.setdefault('keys', set())
+    if key in held:
+        yield
+        return
+    os.makedirs(index_dir, exist_ok=True)
+    with open(dictionary_file(index_dir, project) + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _merge_and_save(dictionary: PathDictionary, index_dir: str):
+    output_file = dictionary_file(index_dir, dictionary.project)
+    if os.path.exists(output_file):
+        moved = dictionary.merge(PathDictionary.load(output_file, dictionary.project, dictionary.case_policy))
+        if moved:
+            raise RuntimeError(f"{len(moved)} paths of {dictionary.project} were interned by another process "
+                               f"while this one held unsaved IDs (e.g. {moved[0]}); intern and write "
+                               f"under project_dictionary() so IDs cannot collide")
+    dictionary.save(output_file)
+
+
+def save_project_dictionary(dictionary: PathDictionary, index_dir: str = PATH_INDEX_DIR):
+    """
+    Save a project's dictionary under the cross-process lock, merged with the
+    copy on disk. Inside project_dictionary() this is a checkpoint of the held
+    dictionary; outside it, paths another process interned since this one loaded
+    raise a RuntimeError, because rows written with the clashing IDs are wrong.
+    """
+    with _dictionary_lock(index_dir, dictionary.project):
+        _merge_and_save(dictionary, index_dir)
+
+
+@contextmanager
+def project_dictionary(project: str, index_dir: str = PATH_INDEX_DIR, case_policy: str = 'preserve'):
+    """
+    Load, use and save a project's dictionary while holding its lock, so no other
+    process can assign the same new IDs in between. Every stage interns paths
+    and writes the rows carrying their IDs inside this block; the dictionary is
+    saved on the way out even if the block fails, since flushed rows may use it.
+    """
+    with _dictionary_lock(index_dir, project):
+        dictionary = load_project_dictionary(project, index_dir, case_policy)
+        try:
+            yield dictionary
+        finally:
+            _merge_and_save(dictionary, index_dir)
+
+
+def ensure_ids(df: pd.DataFrame, path_column: str, id_column: str, dictionary: PathDictionary) -> pd.DataFrame:
+    """
+    Make sure a frame carries the file ID column for one of its path columns.
+    Older CSVs written before the path index existed are interned on load.
+    """
+    if id_column not in df.columns:
+        df[id_column] = dictionary.intern_series(df[path_column])
+    else:
+        df[id_column] = df[id_column].astype('Int32')
+    return df
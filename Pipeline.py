@@ -0,0 +1,435 @@
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import inspect
+import argparse
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Study layout
+PROJECTS_DIR = '/home/iit/Downloads/Thesis/Pynose_Projects'
+DATA_DIR = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data'
+CACHE_DIR = os.path.join(DATA_DIR, '.pipeline_cache')
+
+
+def run_script(script, args=()):
+    """Run one of the repository scripts as a stage."""
+    subprocess.run([sys.executable, os.path.join(REPO_DIR, script)] + [str(a) for a in args],
+                   check=True, cwd=REPO_DIR)
+
+
+class Stage:
+    """
+    One step of the study pipeline.
+
+    Parameters:
+    name (str): Unique stage name
+    func (callable): Module-level function called as func(**params)
+    inputs (list): Files or directories the stage reads
+    outputs (list): Files or directories the stage writes
+    params (dict): Keyword arguments of func, part of the cache key
+    deps (list): Names of the stages that must run first
+    code (list): Source files whose changes invalidate the stage (default: func's module)
+    exclude (list): Glob patterns of input files to ignore, e.g. outputs written inside an input directory
+    locks (list): Shared resources; stages holding the same lock never run concurrently
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, deps=(), code=None, exclude=(), locks=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.deps = list(deps)
+        self.code = list(code) if code is not None else [inspect.getsourcefile(func)]
+        self.exclude = list(exclude)
+        self.locks = set(locks)
+
+
+def script_stage(name, script, args=(), **kwargs):
+    """Stage that runs a repository script; the script itself is its code dependency."""
+    return Stage(name, run_script, params={'script': script, 'args': [str(a) for a in args]},
+                 code=[os.path.join(REPO_DIR, script)], **kwargs)
+
+
+class Fingerprinter:
+    """
+    Content fingerprints of files and directories.
+
+    File hashes are memoized on (size, mtime) so unchanged files are not re-read.
+    Git working copies are fingerprinted by their HEAD commit.
+    """
+
+    def __init__(self, memo_file=None):
+        self.memo_file = memo_file
+        self.memo = {}
+        if memo_file and os.path.exists(memo_file):
+            with open(memo_file) as f:
+                self.memo = json.load(f)
+
+    def save(self):
+        if not self.memo_file:
+            return
+        os.makedirs(os.path.dirname(self.memo_file), exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(self.memo_file), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.memo, f)
+        os.replace(temp_file, self.memo_file)
+
+    def file(self, path):
+        stat = os.stat(path)
+        cached = self.memo.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.memo[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def git_head(self, path):
+        result = subprocess.run(['git', '-C', path, 'rev-parse', 'HEAD'], capture_output=True, text=True)
+        return 'git:' + (result.stdout.strip() if result.returncode == 0 else 'none')
+
+    def directory(self, path, exclude=()):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            # Repositories are identified by their HEAD instead of their files
+            for name in [d for d in dirs if os.path.isdir(os.path.join(root, d, '.git'))]:
+                sub = os.path.join(root, name)
+                digest.update(f'{os.path.relpath(sub, path)}\0{self.git_head(sub)}\n'.encode())
+                dirs.remove(name)
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                relative = os.path.relpath(file_path, path)
+                if any(fnmatch.fnmatch(relative, pattern) for pattern in exclude):
+                    continue
+                digest.update(f'{relative}\0{self.file(file_path)}\n'.encode())
+        return digest.hexdigest()
+
+    def path(self, path, exclude=()):
+        if os.path.isdir(os.path.join(path, '.git')):
+            return self.git_head(path)
+        if os.path.isdir(path):
+            return self.directory(path, exclude)
+        if os.path.isfile(path):
+            return self.file(path)
+        return 'missing'
+
+
+class Pipeline:
+    """
+    DAG of stages with content-addressed caching.
+
+    A stage's cache key hashes its code, parameters and the fingerprints of its
+    inputs and of its dependencies' outputs. A stage is skipped when a manifest
+    for that key exists and its outputs still match the manifest, so a change
+    only re-runs the stages whose inputs actually changed. Independent stages
+    run in parallel worker processes.
+
+    Parameters:
+    stages (list): Stage objects
+    cache_dir (str): Directory for manifests and the fingerprint memo
+    workers (int): Number of stages run concurrently
+    """
+
+    def __init__(self, stages, cache_dir=CACHE_DIR, workers=1):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.fingerprints = Fingerprinter(os.path.join(cache_dir, 'fingerprints.json'))
+        self.order()
+
+    def order(self):
+        """Stage names in dependency order; raises ValueError on unknown deps or cycles."""
+        ordered = []
+        state = {}
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}' required by {path[-1] if path else 'target'}")
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            ordered.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return ordered
+
+    def upstream(self, names):
+        """The given stages and everything they depend on."""
+        selected = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name].deps)
+        return selected
+
+    def downstream(self, names):
+        """The given stages and everything that depends on them."""
+        selected = set(names)
+        for name in self.order():
+            if any(dep in selected for dep in self.stages[name].deps):
+                selected.add(name)
+        return selected
+
+    def cache_key(self, stage):
+        entries = {
+            'stage': stage.name,
+            'func': stage.func.__qualname__,
+            'params': stage.params,
+            'code': {path: self.fingerprints.path(path) for path in stage.code},
+            'inputs': {path: self.fingerprints.path(path, stage.exclude) for path in stage.inputs},
+            'deps': {dep: self.output_fingerprints(self.stages[dep]) for dep in stage.deps},
+        }
+        return hashlib.sha256(json.dumps(entries, sort_keys=True, default=str).encode()).hexdigest()
+
+    def output_fingerprints(self, stage):
+        return {path: self.fingerprints.path(path) for path in stage.outputs}
+
+    def manifest_file(self, stage, key):
+        return os.path.join(self.cache_dir, 'stages', stage.name, f'{key}.json')
+
+    def is_cached(self, stage, key):
+        manifest_file = self.manifest_file(stage, key)
+        if not os.path.exists(manifest_file):
+            return False
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        return manifest['outputs'] == self.output_fingerprints(stage)
+
+    def record(self, stage, key, seconds):
+        manifest_file = self.manifest_file(stage, key)
+        os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+        manifest = {'stage': stage.name, 'key': key, 'seconds': seconds, 'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'outputs': self.output_fingerprints(stage)}
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(manifest_file), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_file, manifest_file)
+
+    def run(self, targets=None, force=(), dry_run=False):
+        """
+        Run the stages needed for the targets (default: all), skipping cached ones.
+
+        Parameters:
+        targets (list): Stages to bring up to date, together with their dependencies
+        force (list): Stages to re-run even when cached
+        dry_run (bool): Only report which stages would run
+
+        Returns:
+        pd.DataFrame: Stage, Status (cached, ran, failed, blocked, would run) and Seconds
+        """
+        selected = self.upstream(targets) if targets else set(self.stages)
+        order = [name for name in self.order() if name in selected]
+        force = set(force)
+
+        status = {}
+        seconds = {}
+        running = {}
+        held_locks = set()
+
+        def ready(name):
+            return all(status.get(dep) in ('cached', 'ran') for dep in self.stages[name].deps)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while len(status) < len(order):
+                # Stages behind a failed dependency cannot run; in a dry run,
+                # stages behind a stage that would run would run as well
+                for name in order:
+                    deps = self.stages[name].deps
+                    if name in status or not all(dep in status for dep in deps) or ready(name):
+                        continue
+                    if any(status[dep] in ('failed', 'blocked') for dep in deps):
+                        status[name] = 'blocked'
+                        print(f"[{name}] blocked by a failed dependency")
+                    else:
+                        status[name] = 'would run'
+                        print(f"[{name}] would run (upstream changes)")
+
+                for name in order:
+                    if name in status or name in running or not ready(name):
+                        continue
+                    stage = self.stages[name]
+                    if len(running) >= self.workers or stage.locks & held_locks:
+                        continue
+
+                    key = self.cache_key(stage)
+                    if name not in force and self.is_cached(stage, key):
+                        status[name] = 'cached'
+                        print(f"[{name}] up to date")
+                        continue
+                    if dry_run:
+                        status[name] = 'would run'
+                        print(f"[{name}] would run")
+                        continue
+
+                    print(f"[{name}] running")
+                    held_locks |= stage.locks
+                    running[name] = (executor.submit(stage.func, **stage.params), key, time.time())
+
+                if not running:
+                    continue
+
+                done, _ = wait([future for future, _, _ in running.values()], return_when=FIRST_COMPLETED)
+                for name in [n for n, (future, _, _) in running.items() if future in done]:
+                    future, key, start = running.pop(name)
+                    stage = self.stages[name]
+                    held_locks -= stage.locks
+                    seconds[name] = round(time.time() - start, 1)
+                    try:
+                        future.result()
+                        self.record(stage, key, seconds[name])
+                        status[name] = 'ran'
+                        print(f"[{name}] finished in {seconds[name]}s")
+                    except Exception as e:
+                        status[name] = 'failed'
+                        print(f"[{name}] failed: {str(e)}")
+
+        self.fingerprints.save()
+        return pd.DataFrame([{'Stage': name, 'Status': status[name], 'Seconds': seconds.get(name, 0.0)}
+                             for name in order])
+
+
+def study_stages(projects_dir=PROJECTS_DIR, data_dir=DATA_DIR, workers=os.cpu_count() or 1):
+    """
+    The study from cloning to the final dataset.
+
+    The hand-cleaned smell data (TestSmells/SmellsCleanAggregatedData) is a
+    source input; everything else is produced by the stages below.
+    """
+    from PathIndex import PATH_INDEX_DIR
+    import Clone
+    import Change_proneness
+    import CP_Production_TestFile
+    import XMLtoCSV
+    import SmellsSummary
+    import DatasetBuilder
+    import AnalyticsStore
+    import RepoPrep
+
+    cp_dir = os.path.join(data_dir, 'ChangeProneness_analysis_results')
+    cp_summary_dir = os.path.join(data_dir, 'CP_Summary')
+    fp_dir = os.path.join(data_dir, 'Fault_proneness', 'All_Faults')
+    szz_dir = os.path.join(data_dir, 'Fault_proneness', 'SZZ')
+    cochange_dir = os.path.join(data_dir, 'CoChange')
+    smell_xml_dir = os.path.join(data_dir, 'Extracted_Smells_dataset')
+    smell_csv_dir = os.path.join(data_dir, 'XMLtoCSV')
+    smell_dir = os.path.join(data_dir, 'TestSmells', 'SmellsCleanAggregatedData')
+    final_dir = os.path.join(data_dir, 'SM_CP_FP', 'Final')
+    combined_file = os.path.join(data_dir, 'SM_CP_FP', 'Allcombined.csv')
+    analytics_db = os.path.join(data_dir, 'SM_CP_FP', 'analytics.sqlite')
+    # Typed copies of the CSV hops; a copy is used only while it matches its CSV and schema
+    store_dir = os.path.join(data_dir, 'IntermediateStore')
+    # Kept out of projects_dir, whose fingerprint covers its top-level files
+    repo_prep_report = os.path.join(data_dir, 'repo_prep_report.csv')
+    clone_status = os.path.join(data_dir, 'clone_status.csv')
+    clone_list = inspect.getsourcefile(Clone)
+
+    # Stages that add paths to the shared path dictionaries must not overlap
+    path_index = ['path_index']
+
+    return [
+        # The project list in Clone.py is the input: adding a project clones it, and
+        # 'Pipeline.py clone --force clone' fetches updates into the existing clones
+        Stage('clone', Clone.clone_projects,
+              params={'clone_dir': projects_dir, 'jobs': workers, 'status_file': clone_status},
+              inputs=[clone_list], outputs=[projects_dir]),
+        # Commit-graphs with Bloom filters make the path-limited logs of the mining stages cheap
+        Stage('repo_prep', RepoPrep.prepare_all,
+              params={'input_dir': projects_dir, 'jobs': workers, 'report_file': repo_prep_report},
+              inputs=[projects_dir], outputs=[repo_prep_report], deps=['clone']),
+        # When the pipeline re-runs a mining stage, its inputs or code changed: --restart makes the
+        # script mine every repository again instead of skipping those in its run journal
+        script_stage('fault_proneness', 'FaultProneness.py',
+                     ['--input_dir', projects_dir, '--output_dir', fp_dir, '--restart'],
+                     inputs=[projects_dir], outputs=[fp_dir], deps=['repo_prep'], locks=path_index),
+        script_stage('szz', 'SZZ.py',
+                     ['--input_dir', projects_dir, '--output_dir', szz_dir, '--workers', workers, '--restart'],
+                     inputs=[projects_dir], outputs=[szz_dir], deps=['repo_prep'], locks=path_index),
+        Stage('change_proneness', Change_proneness.analyze_projects,
+              params={'projects_dir': projects_dir, 'output_dir': cp_dir},
+              inputs=[projects_dir], outputs=[cp_dir], deps=['repo_prep'],
+              code=[inspect.getsourcefile(Change_proneness), os.path.join(REPO_DIR, 'CP.sh')]),
+        script_stage('cochange', 'CoChange.py', ['--input_dir', projects_dir, '--output_dir', cochange_dir],
+                     inputs=[projects_dir], outputs=[cochange_dir], deps=['repo_prep']),
+        Stage('cp_summary', CP_Production_TestFile.transform_all,
+              params={'input_dir': cp_dir, 'output_dir': cp_summary_dir, 'index_dir': PATH_INDEX_DIR,
+                      'store': store_dir},
+              inputs=[cp_dir], outputs=[cp_summary_dir], deps=['change_proneness'], locks=path_index),
+        Stage('smells_csv', XMLtoCSV.convert_xml_to_csv,
+              params={'input_dir': smell_xml_dir, 'output_dir': smell_csv_dir},
+              inputs=[smell_xml_dir], outputs=[smell_csv_dir]),
+        Stage('smell_summary', SmellsSummary.process_all_projects,
+              params={'base_dir': smell_dir, 'index_dir': PATH_INDEX_DIR, 'workers': workers,
+                      'store_dir': store_dir},
+              inputs=[smell_dir], outputs=[smell_dir], exclude=['*/Summary/*'], locks=path_index),
+        Stage('dataset', DatasetBuilder.build_all_projects,
+              params={'smell_dir': smell_dir, 'cp_dir': cp_summary_dir, 'fp_dir': fp_dir,
+                      'output_dir': final_dir, 'combined_file': combined_file, 'index_dir': PATH_INDEX_DIR,
+                      'store': store_dir, 'szz_dir': szz_dir},
+              outputs=[final_dir, combined_file], deps=['smell_summary', 'cp_summary', 'fault_proneness', 'szz'],
+              locks=path_index),
+        Stage('analytics', AnalyticsStore.ingest_dataset,
+              params={'db_path': analytics_db, 'table': 'combined', 'csv_file': combined_file},
+              outputs=[analytics_db], deps=['dataset']),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the study pipeline, re-running only stages whose inputs changed')
+    parser.add_argument('targets', nargs='*', help='Stages to bring up to date (default: all)')
+    parser.add_argument('--projects_dir', help='Directory with the cloned projects', default=PROJECTS_DIR)
+    parser.add_argument('--data_dir', help='Root directory of the study data', default=DATA_DIR)
+    parser.add_argument('--cache_dir', help='Directory for stage manifests (default: <data_dir>/.pipeline_cache)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of stages run concurrently')
+    parser.add_argument('--force', action='append', default=[], help='Re-run this stage even if cached (repeatable)')
+    parser.add_argument('--force_downstream', action='append', default=[],
+                        help='Re-run this stage and everything that depends on it (repeatable)')
+    parser.add_argument('--dry_run', action='store_true', help='Only show which stages would run')
+    parser.add_argument('--list', action='store_true', help='List the stages in dependency order')
+    args = parser.parse_args()
+
+    pipeline = Pipeline(study_stages(args.projects_dir, args.data_dir, args.workers),
+                        args.cache_dir or os.path.join(args.data_dir, '.pipeline_cache'), args.workers)
+
+    if args.list:
+        for name in pipeline.order():
+            deps = pipeline.stages[name].deps
+            print(f"{name}" + (f" <- {', '.join(deps)}" if deps else ""))
+        return
+
+    force = set(args.force) | pipeline.downstream(args.force_downstream)
+    summary = pipeline.run(args.targets or None, force, args.dry_run)
+
+    print("\nPipeline Summary:")
+    print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
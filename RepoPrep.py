@@ -0,0 +1,176 @@
+import os
+import glob
+import time
+import struct
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+SAMPLE_PATHS = 5
+
+REPORT_COLUMNS = ['Project', 'Commits', 'GraphCommits', 'BloomFilters', 'Bitmap', 'State', 'Action',
+                  'LogSecondsBefore', 'LogSecondsAfter', 'Speedup', 'Error']
+
+
+def git(repo_path, *args):
+    return subprocess.check_output(['git', '-C', repo_path] + list(args),
+                                   universal_newlines=True, stderr=subprocess.DEVNULL)
+
+
+def objects_dir(repo_path):
+    return os.path.join(repo_path, git(repo_path, 'rev-parse', '--git-path', 'objects').strip())
+
+
+def read_commit_graph(graph_file):
+    """
+    Number of commits in a commit-graph file and whether it has changed-path Bloom filters.
+
+    Reads the chunk table of the file: the last OID fanout entry is the commit
+    count, and BIDX/BDAT chunks hold the Bloom filters.
+    """
+    with open(graph_file, 'rb') as f:
+        header = f.read(8)
+        if header[:4] != b'CGPH':
+            raise ValueError(f"{graph_file} is not a commit-graph file")
+        num_chunks = header[6]
+        chunks = {}
+        for _ in range(num_chunks + 1):
+            chunk_id, offset = struct.unpack('>4sQ', f.read(12))
+            chunks[chunk_id] = offset
+        f.seek(chunks[b'OIDF'] + 255 * 4)
+        commits = struct.unpack('>I', f.read(4))[0]
+    return commits, b'BIDX' in chunks and b'BDAT' in chunks
+
+
+def commit_graph_info(repo_path):
+    """
+    Commits covered by the repository's commit-graph (single file or split chain)
+    and whether every layer has Bloom filters. (0, False) when there is none.
+    """
+    info_dir = os.path.join(objects_dir(repo_path), 'info')
+    graph_files = [os.path.join(info_dir, 'commit-graph')]
+    chain_file = os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain')
+    if os.path.exists(chain_file):
+        with open(chain_file) as f:
+            graph_files = [os.path.join(info_dir, 'commit-graphs', f'graph-{line.strip()}.graph') for line in f if line.strip()]
+
+    commits, bloom = 0, True
+    found = False
+    for graph_file in graph_files:
+        if not os.path.exists(graph_file):
+            continue
+        found = True
+        layer_commits, layer_bloom = read_commit_graph(graph_file)
+        commits += layer_commits
+        bloom = bloom and layer_bloom
+    return (commits, bloom) if found else (0, False)
+
+
+def has_bitmap(repo_path):
+    return bool(glob.glob(os.path.join(objects_dir(repo_path), 'pack', '*.bitmap')))
+
+
+def sample_paths(repo_path, count=SAMPLE_PATHS):
+    """A fixed sample of tracked .py files (evenly spaced in path order) for the log benchmark."""
+    paths = sorted(git(repo_path, 'ls-tree', '-r', '--name-only', 'HEAD').splitlines())
+    paths = [path for path in paths if path.endswith('.py')] or paths
+    if len(paths) <= count:
+        return paths
+    step = len(paths) / count
+    return [paths[int(i * step)] for i in range(count)]
+
+
+def time_path_log(repo_path, paths):
+    """Seconds taken by 'git log -- <path>' over the sample paths, as the mining stages run it."""
+    start = time.time()
+    for path in paths:
+        subprocess.run(['git', '-C', repo_path, 'log', '--format=%H', 'HEAD', '--', path],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return time.time() - start
+
+
+def prepare_repository(repo_path, repack=False, force=False):
+    """
+    Write a commit-graph with changed-path Bloom filters where it is missing or stale,
+    optionally repack with a reachability bitmap, and time a path-limited log before and after.
+
+    Returns:
+    dict: Report row
+    """
+    row = {'Project': os.path.basename(os.path.normpath(repo_path)), 'Error': ''}
+    try:
+        commits = int(git(repo_path, 'rev-list', '--all', '--count').strip())
+        graph_commits, bloom = commit_graph_info(repo_path)
+        bitmap = has_bitmap(repo_path)
+
+        if graph_commits == 0:
+            state = 'missing'
+        elif graph_commits < commits or not bloom:
+            state = 'stale'
+        else:
+            state = 'ok'
+
+        paths = sample_paths(repo_path)
+        row['LogSecondsBefore'] = round(time_path_log(repo_path, paths), 3)
+
+        actions = []
+        if repack and (force or not bitmap):
+            git(repo_path, 'repack', '-a', '-d', '--write-bitmap-index')
+            actions.append('repack')
+        if force or state != 'ok':
+            git(repo_path, 'commit-graph', 'write', '--reachable', '--changed-paths')
+            actions.append('commit-graph')
+        # Keep the graph current on later fetches (CloneManager updates)
+        git(repo_path, 'config', 'fetch.writeCommitGraph', 'true')
+
+        graph_commits, bloom = commit_graph_info(repo_path)
+        row['LogSecondsAfter'] = round(time_path_log(repo_path, paths), 3)
+        row.update(Commits=commits, GraphCommits=graph_commits, BloomFilters=bloom, Bitmap=has_bitmap(repo_path),
+                   State=state, Action='+'.join(actions) or 'none',
+                   Speedup=round(row['LogSecondsBefore'] / row['LogSecondsAfter'], 2) if row['LogSecondsAfter'] else None)
+    except (subprocess.CalledProcessError, OSError, ValueError, KeyError) as e:
+        row.update(State='error', Action='none', Error=str(e))
+    return row
+
+
+def prepare_all(input_dir, jobs=4, repack=False, force=False, report_file=None):
+    """Prepare every repository of input_dir; returns the report."""
+    projects = [os.path.join(input_dir, name) for name in sorted(os.listdir(input_dir))
+                if os.path.isdir(os.path.join(input_dir, name))]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        rows = list(executor.map(lambda path: prepare_repository(path, repack, force), projects))
+    for row in rows:
+        print(f"{row['Project']}: {row['State']} -> {row['Action']}"
+              + (f" ({row['LogSecondsBefore']}s -> {row['LogSecondsAfter']}s)" if 'LogSecondsAfter' in row else '')
+              + (f" - {row['Error']}" if row['Error'] else ''))
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    if report_file:
+        report.to_csv(report_file, index=False)
+        print(f"Report written to: {report_file}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write commit-graphs (with Bloom filters) and bitmaps before mining')
+    parser.add_argument('--input_dir', help='Directory containing Git repositories',
+                        default='/home/siam/Desktop/volume1/MS_Papers_Arif/PynoseProjects')
+    parser.add_argument('--jobs', type=int, default=4, help='Repositories prepared concurrently')
+    parser.add_argument('--repack', action='store_true', help='Also repack with a reachability bitmap where missing')
+    parser.add_argument('--force', action='store_true', help='Rewrite even if the commit-graph is current')
+    # Outside input_dir: every stage lists that directory as its projects
+    parser.add_argument('--report', default='repo_prep_report.csv',
+                        help='Report CSV (default: repo_prep_report.csv in the current directory)')
+    args = parser.parse_args()
+
+    report = prepare_all(args.input_dir, args.jobs, args.repack, args.force, args.report)
+    timed = report.dropna(subset=['LogSecondsAfter'])
+    if not timed.empty:
+        print(f"\nPath-limited log over {len(timed)} repositories: "
+              f"{timed['LogSecondsBefore'].sum():.2f}s before, {timed['LogSecondsAfter'].sum():.2f}s after")
+
+
+if __name__ == "__main__":
+    main()
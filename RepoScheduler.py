@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+
+import numpy as np
+import pandas as pd
+from Checkpoint import RunJournal, repo_head
+from FaultProneness import run_params
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds per unit of each cost feature; refit from a run report with --fit
+DEFAULT_WEIGHTS = {
+    'Commits': 0.01,
+    'Objects': 0.0001,
+    'PyFiles': 0.05,
+    # FaultProneness walks the history of every file, so files x commits dominates
+    'PyFileCommits': 0.0005,
+}
+
+REPORT_COLUMNS = ['Project', 'Commits', 'Objects', 'PyFiles', 'EstimatedSeconds', 'ActualSeconds',
+                  'PeakRSSMB', 'Status', 'ExitCode']
+
+
+def git_output(repo_path, *args):
+    return subprocess.check_output(['git', '-C', repo_path] + list(args),
+                                   universal_newlines=True, stderr=subprocess.DEVNULL)
+
+
+def repo_stats(repo_path):
+    """Commit count, object count and number of tracked .py files of a repository."""
+    try:
+        commits = int(git_output(repo_path, 'rev-list', '--count', 'HEAD').strip())
+    except (subprocess.CalledProcessError, ValueError):
+        commits = 0
+    try:
+        stats = dict(line.split(': ') for line in git_output(repo_path, 'count-objects', '-v').strip().splitlines())
+        objects = int(stats.get('count', 0)) + int(stats.get('in-pack', 0))
+    except (subprocess.CalledProcessError, ValueError):
+        objects = 0
+    try:
+        py_files = len(git_output(repo_path, 'ls-files', '--', '*.py').splitlines())
+    except subprocess.CalledProcessError:
+        py_files = 0
+    return {'Commits': commits, 'Objects': objects, 'PyFiles': py_files}
+
+
+def estimate_seconds(stats, weights=DEFAULT_WEIGHTS):
+    features = dict(stats, PyFileCommits=stats['PyFiles'] * stats['Commits'])
+    return sum(weights[name] * features[name] for name in weights)
+
+
+def fit_weights(report):
+    """Least-squares weights from the finished repos of a run report."""
+    finished = report[report['Status'] == 'ok']
+    if len(finished) < len(DEFAULT_WEIGHTS):
+        raise ValueError(f"Need at least {len(DEFAULT_WEIGHTS)} finished repositories to fit the weights")
+    features = finished[['Commits', 'Objects', 'PyFiles']].astype(float).assign(
+        PyFileCommits=finished['PyFiles'] * finished['Commits'])
+    coefficients, *_ = np.linalg.lstsq(features[list(DEFAULT_WEIGHTS)].to_numpy(),
+                                       finished['ActualSeconds'].to_numpy(dtype=float), rcond=None)
+    return {name: max(float(value), 0.0) for name, value in zip(DEFAULT_WEIGHTS, coefficients)}
+
+
+def process_group_rss(pgid):
+    """Resident memory in bytes of all processes in a process group (Linux /proc), or None."""
+    if not os.path.isdir('/proc'):
+        return None
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                # Fields after the command name: state ppid pgrp ... rss is field 24
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[2]) == pgid:
+                total += int(fields[21]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class RepoRun:
+    """One repository being analyzed in its own process group."""
+
+    def __init__(self, project, command, estimate):
+        self.project = project
+        self.estimate = estimate
+        self.start = time.time()
+        self.peak_rss = 0
+        self.status = None
+        self.process = subprocess.Popen(command, cwd=REPO_DIR, start_new_session=True)
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def kill(self, status):
+        self.status = status
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+
+def schedule(input_dir, output_dir, jobs=1, timeout=None, max_rss_mb=None, weights=DEFAULT_WEIGHTS,
+             report_file=None, poll_interval=1.0, batch_size=100, flush_interval=60.0,
+             follow_renames=False, history_table=False):
+    """
+    Run FaultProneness on every repository, longest estimated job first.
+
+    Each repository runs in its own process group; a repository exceeding the
+    wall-clock timeout or the RSS limit is killed and recorded as 'timeout' or
+    'memory'. Repositories recorded in the run journal with the same HEAD and
+    analysis options are skipped. batch_size, flush_interval, follow_renames and
+    history_table are passed on to every FaultProneness run.
+
+    Returns:
+    pd.DataFrame: Report with estimated vs actual cost per repository
+    """
+    # Workers run from the repository directory
+    input_dir, output_dir = os.path.abspath(input_dir), os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    journal = RunJournal(os.path.join(output_dir, 'fault_proneness_journal.jsonl'))
+    params = run_params(follow_renames, history_table)
+    options = ['--batch_size', str(batch_size), '--flush_interval', str(flush_interval)]
+    if follow_renames:
+        options.append('--follow_renames')
+    if history_table:
+        options.append('--history_table')
+    heads = {}
+
+    queue = []
+    for project in sorted(os.listdir(input_dir)):
+        project_path = os.path.join(input_dir, project)
+        if not os.path.isdir(project_path):
+            continue
+        heads[project] = repo_head(project_path)
+        if journal.is_done(project, os.path.join(output_dir, f'{project}_fault_proneness.csv'),
+                           head=heads[project], params=params):
+            print(f"Skipping {project} - completed in an earlier run")
+            continue
+        stats = repo_stats(project_path)
+        queue.append((project, stats, estimate_seconds(stats, weights)))
+
+    # Longest job first keeps the giant repositories from finishing last
+    queue.sort(key=lambda item: (-item[2], item[0]))
+    stats_by_project = {project: stats for project, stats, _ in queue}
+    print(f"Scheduling {len(queue)} repositories on {jobs} workers")
+
+    running = []
+    report = []
+    while queue or running:
+        while queue and len(running) < jobs:
+            project, stats, estimate = queue.pop(0)
+            command = [sys.executable, os.path.join(REPO_DIR, 'FaultProneness.py'),
+                       '--project', os.path.join(input_dir, project), '--output_dir', output_dir, *options]
+            print(f"Starting {project} (estimated {estimate:.0f}s)")
+            running.append(RepoRun(project, command, estimate))
+
+        time.sleep(poll_interval)
+
+        for run in list(running):
+            rss = process_group_rss(run.process.pid)
+            if rss is not None:
+                run.peak_rss = max(run.peak_rss, rss)
+
+            if run.process.poll() is None:
+                if timeout is not None and run.elapsed() > timeout:
+                    run.kill('timeout')
+                elif max_rss_mb is not None and run.peak_rss > max_rss_mb * 2**20:
+                    run.kill('memory')
+                else:
+                    continue
+
+            running.remove(run)
+            exit_code = run.process.returncode
+            status = run.status or ('ok' if exit_code == 0 else 'failed')
+            if status == 'ok':
+                journal.record(run.project, seconds=round(run.elapsed(), 1), head=heads[run.project], params=params)
+            else:
+                print(f"{run.project}: {status} after {run.elapsed():.0f}s")
+
+            report.append({'Project': run.project, **stats_by_project[run.project],
+                           'EstimatedSeconds': round(run.estimate, 1), 'ActualSeconds': round(run.elapsed(), 1),
+                           'PeakRSSMB': round(run.peak_rss / 2**20, 1), 'Status': status, 'ExitCode': exit_code})
+
+    report = pd.DataFrame(report, columns=REPORT_COLUMNS)
+    if report_file:
+        # Keep the rows of repositories run by earlier invocations
+        if os.path.exists(report_file):
+            previous = pd.read_csv(report_file)
+            previous = previous[~previous['Project'].isin(report['Project'])]
+            report = pd.concat([previous, report], ignore_index=True) if not previous.empty else report
+        report.to_csv(report_file, index=False)
+        print(f"Run report written to: {report_file}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run FaultProneness per repository, longest job first, with limits')
+    parser.add_argument('--input_dir', help='Directory containing Git repositories',
+                        default='/home/siam/Desktop/volume1/MS_Papers_Arif/PynoseProjects')
+    parser.add_argument('--output_dir', help='Output directory path',
+                        default='/home/siam/Desktop/volume1/MS_Papers_Arif/Data/Fault_proneness/All_Faults')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Repositories analyzed concurrently')
+    parser.add_argument('--timeout', type=float, help='Wall-clock limit per repository in seconds')
+    parser.add_argument('--max_rss_mb', type=float, help='Resident memory limit per repository in MiB')
+    parser.add_argument('--weights', help='JSON file with cost weights (as written by --fit)')
+    parser.add_argument('--report', help='Run report CSV (default: <output_dir>/schedule_report.csv)')
+    parser.add_argument('--batch_size', type=int, default=100,
+                        help='Number of files analyzed between flushes of the partial output')
+    parser.add_argument('--flush_interval', type=float, default=60.0,
+                        help='Maximum number of seconds between flushes of the partial output')
+    parser.add_argument('--follow_renames', action='store_true',
+                        help='Compute each file\'s metrics over its whole history, across renames')
+    parser.add_argument('--history_table', action='store_true',
+                        help='Compute all per-file metrics from one columnar numstat table instead of per-file git calls')
+    parser.add_argument('--fit', metavar='REPORT', help='Fit cost weights from a run report, write them as JSON and exit')
+    args = parser.parse_args()
+
+    if args.fit:
+        weights = fit_weights(pd.read_csv(args.fit))
+        print(json.dumps(weights, indent=2))
+        if args.weights:
+            with open(args.weights, 'w') as f:
+                json.dump(weights, f, indent=2)
+        return
+
+    weights = DEFAULT_WEIGHTS
+    if args.weights:
+        with open(args.weights) as f:
+            weights = json.load(f)
+
+    report = schedule(args.input_dir, args.output_dir, args.jobs, args.timeout, args.max_rss_mb, weights,
+                      args.report or os.path.join(args.output_dir, 'schedule_report.csv'),
+                      batch_size=args.batch_size, flush_interval=args.flush_interval,
+                      follow_renames=args.follow_renames, history_table=args.history_table)
+    print("\nEstimated vs actual cost:")
+    print(report.to_string(index=False) if not report.empty else "No repositories run")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
 import pandas as pd
 import os
 from pathlib import Path
+from PathIndex import PATH_INDEX_DIR, project_dictionary, ensure_ids
+from Schemas import load_csv
 
-def process_csv_files(input_folder, output_folder):
+def process_csv_files(input_folder, output_folder, index_dir=PATH_INDEX_DIR):
     """
     Process CSV files to keep only rows where TestFile and File Path match exactly.
     Saves filtered results to new CSV files.
     
+    Paths are compared through their project-wide file IDs, so both columns
+    share the same normalization.
+    
     Args:
         input_folder (str): Path to the folder containing input CSV files
         output_folder (str): Path to save the filtered CSV files
+        index_dir (str): Directory holding the per-project path dictionaries
     """
     # Create output folder if it doesn't exist
     os.makedirs(output_folder, exist_ok=True)
@@ -22,28 +28,28 @@ def process_csv_files(input_folder, output_folder):
         
         try:
             # Read the CSV file
-            df = pd.read_csv(csv_file)
+            df = load_csv(csv_file, 'smells_cp')
             
             # Check if required columns exist
             if 'TestFile' not in df.columns or 'File Path' not in df.columns:
                 print(f"Warning: Required columns not found in {csv_file.name}")
                 continue
             
-            # Store original column order
-            original_columns = df.columns.tolist()
-            
-            # Convert paths to standard format for comparison
-            df['TestFile'] = df['TestFile'].apply(lambda x: str(Path(x)).replace('\\', '/'))
-            df['File Path'] = df['File Path'].apply(lambda x: str(Path(x)).replace('\\', '/'))
+            # Intern paths of files written before the path index existed, holding the
+            # dictionary until the rows carrying the IDs are saved
+            with project_dictionary(csv_file.stem, index_dir) as dictionary:
+                df = ensure_ids(df, 'TestFile', 'TestFileID', dictionary)
+                df = ensure_ids(df, 'File Path', 'FileID', dictionary)
             
-            # Keep only rows where paths match exactly
-            df_filtered = df[df['TestFile'] == df['File Path']]
+                # Keep only rows where paths match exactly
+                same_file = (df['TestFileID'] == df['FileID']).fillna(False).astype(bool)
+                df_filtered = df[same_file]
             
-            # Create output filename
-            output_file = Path(output_folder) / f"_{csv_file.name}"
+                # Create output filename
+                output_file = Path(output_folder) / f"_{csv_file.name}"
             
-            # Save the filtered CSV
-            df_filtered.to_csv(output_file, index=False)
+                # Save the filtered CSV
+                df_filtered.to_csv(output_file, index=False)
             
             # Print summary statistics
             total_rows = len(df)
@@ -58,7 +64,7 @@ def process_csv_files(input_folder, output_folder):
             # Print examples of removed rows (up to 3 examples)
             if removed_rows > 0:
                 print("\nExamples of removed rows (non-matching paths):")
-                removed_df = df[df['TestFile'] != df['File Path']].head(3)
+                removed_df = df[~same_file].head(3)
                 for _, row in removed_df.iterrows():
                     print("\nTestFile:")
                     print(row['TestFile'])
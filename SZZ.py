@@ -0,0 +1,389 @@
+import io
+import os
+import re
+import csv
+import tokenize
+import sqlite3
+import argparse
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from FileLineage import FileLineage, iter_history
+from CommitRecords import is_bug_fix_message
+from PathIndex import PATH_INDEX_DIR, project_dictionary
+from Checkpoint import RunJournal, repo_head
+from CatFilePool import CatFilePool
+
+SZZ_HEADER = ['Repository', 'File', 'Is_Faulty', 'TotalFaultyCommit', 'TotalCommits',
+              'FaultyInsertions', 'FaultyDeletions', 'FileID']
+PAIRS_HEADER = ['FixCommit', 'InducingCommit', 'File', 'Lines']
+JOURNAL_FILE = 'szz_journal.jsonl'
+
+HUNK_PATTERN = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+')
+BLAME_PATTERN = re.compile(r'^([0-9a-f]{40}) (\d+) (\d+)( \d+)?$')
+
+
+def deleted_lines(repo_path: str, fix: str, parent: str, extension: str = '.py') -> List[Tuple[str, str, List[int]]]:
+    """
+    Lines of the parent that a fix commit deletes or modifies.
+
+    Blank and comment-only lines are skipped: changing them cannot fix a fault.
+
+    Returns:
+    list: (path in the parent, blob in the parent, line numbers) per file
+    """
+    command = ['git', '-C', str(repo_path), '-c', 'core.quotepath=off', 'diff', '-U0', '-M',
+               '--full-index', '--no-color', '--no-ext-diff', parent, fix]
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    files = []
+    old_blob = old_path = None
+    lines = []
+    line_number = 0
+    in_hunk = False
+
+    def flush():
+        if old_path and old_path.endswith(extension) and lines:
+            files.append((old_path, old_blob, lines))
+
+    for line in output.decode('utf-8', errors='replace').split('\n'):
+        if line.startswith('diff --git '):
+            flush()
+            old_blob = old_path = None
+            lines = []
+            in_hunk = False
+        elif in_hunk:
+            if line.startswith('@@'):
+                line_number = int(HUNK_PATTERN.match(line).group(1))
+            elif line.startswith('-'):
+                text = line[1:].strip()
+                if text and not text.startswith('#'):
+                    lines.append(line_number)
+                line_number += 1
+        elif line.startswith('index '):
+            old_blob = line.split()[1].split('..')[0]
+        elif line.startswith('--- '):
+            old_path = line[len('--- a/'):] if line.startswith('--- a/') else None
+        elif line.startswith('@@'):
+            in_hunk = True
+            line_number = int(HUNK_PATTERN.match(line).group(1))
+    flush()
+    return files
+
+
+def code_lines(source: str):
+    """
+    Line numbers of a Python file that hold code, i.e. are not blank, comment or
+    docstring lines. None if the file does not tokenize (e.g. Python 2 syntax).
+    """
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(source).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    layout = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT,
+              tokenize.ENDMARKER}
+    lines = set()
+    statement_start = True
+    for i, token in enumerate(tokens):
+        if token.type in layout:
+            if token.type in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT):
+                statement_start = True
+            continue
+        if token.type == tokenize.STRING and statement_start:
+            following = next((t for t in tokens[i + 1:] if t.type != tokenize.COMMENT), None)
+            # A string that makes up a whole statement is a docstring
+            if following is None or following.type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                statement_start = False
+                continue
+        lines.update(range(token.start[0], token.end[0] + 1))
+        statement_start = False
+    return lines
+
+
+def line_ranges(lines: List[int]) -> List[Tuple[int, int]]:
+    """Collapse sorted line numbers into (start, end) ranges for 'git blame -L'."""
+    ranges = []
+    for line in sorted(lines):
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], line)
+        else:
+            ranges.append((line, line))
+    return ranges
+
+
+def blame_lines(repo_path: str, commit: str, path: str, lines: List[int],
+                ignore_whitespace: bool = True) -> Dict[int, Tuple[str, str]]:
+    """
+    Blame some lines of a file at a commit in one 'git blame' call.
+
+    Returns:
+    dict: Line number -> (commit that introduced the line, file path in that commit)
+    """
+    command = ['git', '-C', str(repo_path), 'blame', '--porcelain']
+    if ignore_whitespace:
+        command.append('-w')
+    for start, end in line_ranges(lines):
+        command += ['-L', f'{start},{end}']
+    command += [commit, '--', path]
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+
+    blamed = {}
+    # 'filename' is printed after a group header, but only once per commit and file
+    origins = {}
+    sha = None
+    for line in output.decode('utf-8', errors='replace').split('\n'):
+        if line.startswith('\t'):
+            continue
+        match = BLAME_PATTERN.match(line)
+        if match:
+            sha, final_line = match.group(1), int(match.group(3))
+            blamed[final_line] = (sha, origins.get(sha, path))
+        elif line.startswith('filename '):
+            origins[sha] = line[len('filename '):]
+            blamed[final_line] = (sha, origins[sha])
+    return blamed
+
+
+class BlameCache:
+    """
+    Blame results keyed by (blob, commit, whitespace mode), shared by the workers
+    of a repository and kept across runs. Blaming a blob at a commit in one mode
+    always gives the same answer, so a line is never blamed twice; 'blame -w'
+    can attribute a line to another commit, so the modes are kept apart.
+    """
+
+    def __init__(self, cache_file: str, ignore_whitespace: bool = True):
+        self.ignore_whitespace = int(ignore_whitespace)
+        self.connection = sqlite3.connect(cache_file, timeout=60)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # Caches written before the mode was part of the key cannot tell which mode they hold
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(blame)')]
+        if columns and 'ignore_whitespace' not in columns:
+            self.connection.execute('DROP TABLE blame')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS blame (blob TEXT, commit_sha TEXT, '
+                                'ignore_whitespace INTEGER, line INTEGER, inducing TEXT, path TEXT, '
+                                'PRIMARY KEY (blob, commit_sha, ignore_whitespace, line))')
+        self.connection.commit()
+
+    def get(self, blob: str, commit: str) -> Dict[int, Tuple[str, str]]:
+        rows = self.connection.execute('SELECT line, inducing, path FROM blame '
+                                       'WHERE blob = ? AND commit_sha = ? AND ignore_whitespace = ?',
+                                       (blob, commit, self.ignore_whitespace))
+        return {line: (inducing, path) for line, inducing, path in rows}
+
+    def put(self, blob: str, commit: str, blamed: Dict[int, Tuple[str, str]]):
+        self.connection.executemany('INSERT OR REPLACE INTO blame VALUES (?, ?, ?, ?, ?, ?)',
+                                    [(blob, commit, self.ignore_whitespace, line, inducing, path)
+                                     for line, (inducing, path) in blamed.items()])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def blame_fix_batch(repo_path: str, fixes: List[Tuple[str, str]], cache_file: str = None,
+                    ignore_whitespace: bool = True, extension: str = '.py') -> Counter:
+    """
+    Find the commits that introduced the lines a batch of fix commits removed.
+
+    Docstring lines are dropped using the parent's version of each file, read
+    through a cat-file pool so a blob touched by several fixes is read once.
+
+    Returns:
+    Counter: (fix commit, inducing commit, file path in the inducing commit) -> number of lines
+    """
+    cache = BlameCache(cache_file, ignore_whitespace) if cache_file else None
+    objects = CatFilePool(repo_path, processes=1)
+    memory = {}
+    code = {}
+    inducing = Counter()
+    for fix, parent in fixes:
+        try:
+            for path, blob, lines in deleted_lines(repo_path, fix, parent, extension):
+                if path.endswith('.py'):
+                    if blob not in code:
+                        source = objects.text(blob)
+                        code[blob] = code_lines(source) if source is not None else None
+                    if code[blob] is not None:
+                        lines = [line for line in lines if line in code[blob]]
+                        if not lines:
+                            continue
+                key = (blob, parent)
+                if key not in memory:
+                    memory[key] = cache.get(blob, parent) if cache else {}
+                known = memory[key]
+                missing = [line for line in lines if line not in known]
+                if missing:
+                    blamed = blame_lines(repo_path, parent, path, missing, ignore_whitespace)
+                    known.update(blamed)
+                    if cache:
+                        cache.put(blob, parent, blamed)
+                for line in lines:
+                    if line in known:
+                        inducing[(fix, known[line][0], known[line][1])] += 1
+        except (subprocess.CalledProcessError, sqlite3.Error) as e:
+            print(f"Error blaming fix commit {fix}: {str(e)}")
+    objects.close()
+    if cache:
+        cache.close()
+    return inducing
+
+
+def analyze_szz(repo_path: str, workers: int = 1, batch_size: int = 20, cache_file: str = None,
+                ignore_whitespace: bool = True, extension: str = '.py'):
+    """
+    SZZ fault-inducing commit identification for one repository.
+
+    Bug-fix commits (keyword messages, as in FaultProneness) are split into
+    batches that are blamed in parallel. A commit is fault-inducing for a file
+    if it introduced a line that a later fix removed or modified. Files are
+    identified across renames with FileLineage.
+
+    Returns:
+    tuple: (rows of (File, Is_Faulty, TotalFaultyCommit, TotalCommits, FaultyInsertions,
+           FaultyDeletions) per file at HEAD, rows of (FixCommit, InducingCommit, File, Lines))
+    """
+    commits = list(iter_history(repo_path))
+    lineage = FileLineage.from_commits(commits)
+    ordinals = {sha: ordinal for ordinal, (sha, _, _, _) in enumerate(commits)}
+
+    fixes = [(sha, parents[0]) for sha, parents, message, changes in commits
+             if len(parents) == 1 and is_bug_fix_message(message)
+             and any(status in 'MR' and path.endswith(extension) for status, _, path, _, _ in changes)]
+    batches = [fixes[i:i + batch_size] for i in range(0, len(fixes), batch_size)]
+    print(f"Blaming {len(fixes)} fix commits in {len(batches)} batches")
+
+    inducing = Counter()
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(blame_fix_batch, repo_path, batch, cache_file, ignore_whitespace, extension)
+                       for batch in batches]
+            for future in futures:
+                inducing.update(future.result())
+    else:
+        for batch in batches:
+            inducing.update(blame_fix_batch(repo_path, batch, cache_file, ignore_whitespace, extension))
+
+    # Lineage and churn of each file as changed by a commit
+    lineage_at = {}
+    for file_id, file_events in enumerate(lineage.events):
+        for ordinal, path, _, _, _ in file_events:
+            lineage_at[(ordinal, path)] = file_id
+    churn = {}
+    for ordinal, (sha, _, _, changes) in enumerate(commits):
+        for _, _, path, insertions, deletions in changes:
+            churn[(sha, path)] = (insertions, deletions)
+
+    faulty = defaultdict(set)
+    pair_lines = Counter()
+    for (fix, inducing_sha, path), lines in sorted(inducing.items()):
+        file_id = lineage_at.get((ordinals.get(inducing_sha), path), lineage.path_ids.get(path))
+        if file_id is None:
+            continue
+        faulty[file_id].add((inducing_sha, path))
+        pair_lines[(fix, inducing_sha, lineage.paths(file_id)[0])] += lines
+    pairs = [(*pair, lines) for pair, lines in sorted(pair_lines.items())]
+
+    rows = []
+    for path in sorted(lineage.current):
+        if not path.endswith(extension):
+            continue
+        file_id = lineage.current[path]
+        inducing_changes = faulty.get(file_id, set())
+        faulty_insertions = sum(churn.get(change, (0, 0))[0] for change in inducing_changes)
+        faulty_deletions = sum(churn.get(change, (0, 0))[1] for change in inducing_changes)
+        total_faulty = len({sha for sha, _ in inducing_changes})
+        rows.append((path, int(total_faulty > 0), total_faulty, len(lineage.commits(file_id)),
+                     faulty_insertions, faulty_deletions))
+    return rows, pairs
+
+
+def remote_url(repo_path: str) -> str:
+    result = subprocess.run(['git', '-C', str(repo_path), 'config', '--get', 'remote.origin.url'],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    return result.stdout.strip() or str(repo_path)
+
+
+def process_project(project_path: str, output_dir: str, index_dir: str = PATH_INDEX_DIR, workers: int = 1,
+                    batch_size: int = 20, ignore_whitespace: bool = True):
+    """
+    Write '<project>_szz.csv' (per-file faulty churn) and '<project>_szz_pairs.csv'
+    (fix/inducing commit pairs). Blame results are cached in <output_dir>/blame_cache.
+
+    Returns:
+    int: Number of files in the output, or None if the analysis failed
+    """
+    os.makedirs(os.path.join(output_dir, 'blame_cache'), exist_ok=True)
+    project_name = os.path.basename(os.path.normpath(project_path))
+    output_file = os.path.join(output_dir, f'{project_name}_szz.csv')
+    pairs_file = os.path.join(output_dir, f'{project_name}_szz_pairs.csv')
+    cache_file = os.path.join(output_dir, 'blame_cache', f'{project_name}.sqlite')
+
+    try:
+        rows, pairs = analyze_szz(project_path, workers, batch_size, cache_file, ignore_whitespace)
+        repository = remote_url(project_path)
+
+        with project_dictionary(project_name, index_dir) as dictionary:
+            with open(output_file, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(SZZ_HEADER)
+                for row in rows:
+                    writer.writerow([repository, *row, dictionary.intern(row[0])])
+        with open(pairs_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(PAIRS_HEADER)
+            writer.writerows(pairs)
+
+        print(f"SZZ analysis complete for {project_name}. {sum(row[1] for row in rows)} of {len(rows)} files faulty.")
+        print(f"Results written to: {output_file}")
+        return len(rows)
+
+    except Exception as e:
+        print(f"Error analyzing project {project_name}: {str(e)}")
+        return None
+
+
+def main():
+    default_input = '/home/siam/Desktop/volume1/MS_Papers_Arif/PynoseProjects'
+    default_output = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/Fault_proneness/SZZ'
+
+    parser = argparse.ArgumentParser(description='Identify fault-inducing commits (SZZ) and faulty churn per file')
+    parser.add_argument('--input_dir', help='Directory containing Git repositories', default=default_input)
+    parser.add_argument('--output_dir', help='Output directory path', default=default_output)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes blaming fix commits of a repository in parallel')
+    parser.add_argument('--batch_size', type=int, default=20, help='Fix commits per worker task')
+    parser.add_argument('--keep_whitespace', action='store_true',
+                        help='Blame whitespace-only changes too (git blame without -w)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore the run journal and analyze every repository again')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    journal = RunJournal(os.path.join(args.output_dir, JOURNAL_FILE))
+    if args.restart:
+        journal.reset(partial_dir=args.output_dir)
+    params = {'ignore_whitespace': not args.keep_whitespace}
+
+    for project_name in sorted(os.listdir(args.input_dir)):
+        project_path = os.path.join(args.input_dir, project_name)
+
+        if not os.path.isdir(project_path):
+            continue
+
+        output_file = os.path.join(args.output_dir, f'{project_name}_szz.csv')
+        # A repository whose HEAD moved (e.g. after a fresh clone) is analyzed again
+        head = repo_head(project_path)
+        if journal.is_done(project_name, output_file, head=head, params=params):
+            print(f"Skipping {project_name} - completed in an earlier run")
+            continue
+
+        rows = process_project(project_path, args.output_dir, workers=args.workers, batch_size=args.batch_size,
+                               ignore_whitespace=not args.keep_whitespace)
+        if rows is not None:
+            journal.record(project_name, rows=rows, head=head, params=params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import json
+import hashlib
+
+import pandas as pd
+
+# Test smell columns produced by the smell detector
+SMELL_COLUMNS = [
+    'Assertion Roulette', 'Conditional Test Logic', 'Constructor Initialization',
+    'Default Test', 'Duplicate Assertion', 'Empty Test', 'Exception Handling',
+    'General Fixture', 'Ignored Test', 'Lack of Cohesion of Test Cases',
+    'Magic Number Test', 'Obscure In-Line Setup', 'Redundant Assertion',
+    'Redundant Print', 'Sleepy Test', 'Suboptimal Assert', 'Test Maverick',
+    'Unknown Test'
+]
+
+PATH = 'category'
+ID = 'Int32'
+COUNT = 'int32'
+FLAG = 'int8'
+
+
+class Schema:
+    """
+    Column types and NA rules of one intermediate file type.
+
+    Parameters:
+    name (str): Name of the file type
+    dtypes (dict): Column -> dtype. Counts are int32, 0/1 flags int8 (so written
+        CSVs keep their 0/1 encoding), paths categorical and file IDs nullable Int32
+    zero_fill (list): Numeric columns whose blank cells mean 0
+    default_dtype (str): dtype of columns not listed in dtypes; None (the default)
+        lets pandas infer it, so unknown text columns stay text
+    default_zero_fill (bool): Whether unlisted columns are zero-filled too
+
+    The dtypes only type columns; every column of a file is loaded unless the
+    caller asks for a projection.
+    """
+
+    def __init__(self, name, dtypes, zero_fill=(), default_dtype=None, default_zero_fill=False):
+        self.name = name
+        self.dtypes = dict(dtypes)
+        self.zero_fill = set(zero_fill)
+        self.default_dtype = default_dtype
+        self.default_zero_fill = default_zero_fill
+
+    def dtype_of(self, column):
+        return self.dtypes.get(column, self.default_dtype)
+
+    def fills_zero(self, column):
+        return column in self.zero_fill or (column not in self.dtypes and self.default_zero_fill)
+
+
+def _counts(*columns):
+    return {column: COUNT for column in columns}
+
+
+FP_DTYPES = {
+    'Repository': 'category', 'File': PATH, 'Is_Faulty': FLAG,
+    **_counts('TotalCommits', 'Insertions', 'Deletions', 'FaultCount'),
+    'FileID': ID,
+}
+SZZ_DTYPES = {
+    'Repository': 'category', 'File': PATH, 'Is_Faulty': FLAG,
+    **_counts('TotalFaultyCommit', 'TotalCommits', 'FaultyInsertions', 'FaultyDeletions'),
+    'FileID': ID,
+}
+CP_DTYPES = {
+    'Filename': PATH,
+    **_counts('Changes', 'TotalCommits', 'Insertions', 'Deletions'),
+}
+CP_TRANSFORMED_DTYPES = {
+    'ProductionFile': PATH, 'TestFile': PATH,
+    **_counts('Prod_Changes', 'Prod_TotalCommits', 'Prod_Insertions', 'Prod_Deletions',
+              'Test_Changes', 'Test_TotalCommits', 'Test_Insertions', 'Test_Deletions'),
+    'ProductionFileID': ID, 'TestFileID': ID,
+}
+SMELL_SUMMARY_DTYPES = {
+    'File Path': PATH, **_counts(*SMELL_COLUMNS), 'total_smells': COUNT, 'FileID': ID,
+}
+# SmellsPlusCP / RevisedSmellswithCP output: CP columns + smell summary columns
+SMELLS_CP_DTYPES = {
+    **CP_TRANSFORMED_DTYPES, 'test_filename': PATH, **SMELL_SUMMARY_DTYPES,
+}
+FINAL_DTYPES = {
+    **SMELLS_CP_DTYPES,
+    'Repository': 'category', 'File': PATH, 'Source_File': 'category', 'Project': 'category',
+    **_counts('Total Smells', 'TotalCommits', 'Insertions', 'Deletions', 'FaultCount'),
+    'Is_Faulty': FLAG,
+    # Pair columns of TS_FP_mapping; the production side is a left join and may be blank
+    'Test_Is_Faulty': FLAG, **_counts('Test_TotalFaultyCommit', 'Test_FaultyInsertions', 'Test_FaultyDeletions'),
+    'Prod_Is_Faulty': 'Int8',
+    'Prod_TotalFaultyCommit': 'Int32', 'Prod_FaultyInsertions': 'Int32', 'Prod_FaultyDeletions': 'Int32',
+}
+TS_FP_DTYPES = {
+    'ProductionFile': PATH, 'TestFile': PATH,
+    'Prod_Is_Faulty': FLAG, 'Test_Is_Faulty': FLAG,
+    **_counts('Prod_TotalFaultyCommit', 'Prod_TotalCommits', 'Prod_FaultyInsertions', 'Prod_FaultyDeletions',
+              'Test_TotalFaultyCommit', 'Test_TotalCommits', 'Test_FaultyInsertions', 'Test_FaultyDeletions',
+              *SMELL_COLUMNS, 'Total Smells'),
+}
+AGGREGATE_DTYPES = {**SMELLS_CP_DTYPES, 'Project': 'category'}
+CLASS_CHANGES_DTYPES = {
+    'ClassName': PATH,
+    **_counts('Changes', 'TotalCommits', 'Insertions', 'Deletions'),
+}
+
+
+# Columns a schema does not list are loaded with inferred types, so text stays text
+SCHEMAS = {
+    'fault_proneness': Schema('fault_proneness', FP_DTYPES, zero_fill=['FaultCount']),
+
+    # Per-file SZZ results (<project>_szz.csv)
+    'szz': Schema('szz', SZZ_DTYPES),
+
+    'cp_analysis': Schema('cp_analysis', CP_DTYPES, zero_fill=['Changes', 'TotalCommits', 'Insertions', 'Deletions']),
+
+    'cp_transformed': Schema('cp_transformed', CP_TRANSFORMED_DTYPES),
+
+    # Blank smell cells mean 0
+    'smell_summary': Schema('smell_summary', SMELL_SUMMARY_DTYPES, zero_fill=SMELL_COLUMNS),
+
+    'smells_cp': Schema('smells_cp', SMELLS_CP_DTYPES, zero_fill=SMELL_COLUMNS),
+
+    # FinalExtraction / DatasetBuilder output
+    'final': Schema('final', FINAL_DTYPES, zero_fill=SMELL_COLUMNS + ['Total Smells']),
+
+    # TS.csv / FP.csv / tsfp.csv of the TS-FP mapping stage
+    'ts_fp': Schema('ts_fp', TS_FP_DTYPES, zero_fill=SMELL_COLUMNS + ['Total Smells']),
+
+    # SmellsPlusCP aggregate across projects, whose blank smell cells mean 0
+    'aggregate_summary': Schema('aggregate_summary', AGGREGATE_DTYPES, zero_fill=SMELL_COLUMNS),
+
+    # Per-version change files of merge_analyzed_changes
+    'class_changes': Schema('class_changes', CLASS_CHANGES_DTYPES, zero_fill=['Insertions', 'Deletions']),
+}
+
+
+def get_schema(kind):
+    try:
+        return SCHEMAS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown file type '{kind}', expected one of {sorted(SCHEMAS)}")
+
+
+def schema_fingerprint(kind):
+    """Hash of a schema's dtypes and NA rules; changes whenever the loaded data would."""
+    schema = get_schema(kind)
+    definition = {'dtypes': schema.dtypes, 'zero_fill': sorted(schema.zero_fill), 'default_dtype': schema.default_dtype,
+                  'default_zero_fill': schema.default_zero_fill}
+    return hashlib.sha256(json.dumps(definition, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _is_numeric(dtype):
+    return dtype is not None and dtype not in (PATH, 'category', 'str', 'object')
+
+
+# Spellings of flags written by pandas/Excel exports instead of 0/1
+BOOLEAN_STRINGS = {'true': 1, 'false': 0}
+
+
+def _to_numeric(values):
+    """Coerce a column to numbers, reading 'True'/'False' as 1/0 instead of NA."""
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype('Int8')
+    if not pd.api.types.is_numeric_dtype(values):
+        text = values.astype('string').str.strip().str.lower()
+        values = values.where(~text.isin(list(BOOLEAN_STRINGS)), text.map(BOOLEAN_STRINGS))
+    return pd.to_numeric(values, errors='coerce')
+
+
+def _nullable(dtype):
+    """Nullable counterpart of a numpy integer dtype, used while parsing."""
+    return {'int8': 'Int8', 'int16': 'Int16', 'int32': 'Int32', 'int64': 'Int64'}.get(dtype, dtype)
+
+
+def read_header(file_path, **kwargs):
+    """Column names as pandas reads them (initial spaces skipped, duplicates renamed)."""
+    return pd.read_csv(file_path, nrows=0, skipinitialspace=True, **kwargs).columns.tolist()
+
+
+def load_csv(file_path, kind, columns=None, **kwargs):
+    """
+    Load an intermediate CSV with the typed schema of its file type.
+
+    Every column is loaded unless columns asks for a projection; columns the
+    schema does not list keep their inferred types. Blank cells of zero-filled
+    numeric columns become 0; other numeric columns are parsed as nullable
+    integers when they contain blanks. 'True'/'False' in numeric columns are read
+    as 1/0; other non-numeric junk is coerced to NA like the old
+    to_numeric(errors='coerce') code.
+
+    Parameters:
+    file_path (str): Path to the CSV file
+    kind (str): File type, one of SCHEMAS
+    columns (list): Columns to load; missing ones are ignored
+
+    Returns:
+    pd.DataFrame: Typed data
+    """
+    schema = get_schema(kind)
+    header = read_header(file_path)
+    usecols = header if columns is None else [column for column in header if column in set(columns)]
+
+    dtypes = {}
+    for column in usecols:
+        dtype = schema.dtype_of(column)
+        if dtype is None:
+            continue
+        dtypes[column] = _nullable(dtype) if _is_numeric(dtype) else dtype
+
+    try:
+        df = pd.read_csv(file_path, usecols=usecols, dtype=dtypes, skipinitialspace=True, **kwargs)
+    except (ValueError, TypeError):
+        # Junk in a numeric column: parse numerics as text and coerce them
+        text_dtypes = {column: (str if _is_numeric(dtype) else dtype) for column, dtype in dtypes.items()}
+        df = pd.read_csv(file_path, usecols=usecols, dtype=text_dtypes, skipinitialspace=True, **kwargs)
+        for column, dtype in dtypes.items():
+            if _is_numeric(dtype):
+                df[column] = _to_numeric(df[column]).round().astype(dtype)
+
+    # Apply NA rules and narrow to the final dtypes
+    for column in usecols:
+        dtype = schema.dtype_of(column)
+        if not _is_numeric(dtype):
+            continue
+        if schema.fills_zero(column):
+            df[column] = df[column].fillna(0)
+        if not df[column].hasnans:
+            df[column] = df[column].astype(dtype)
+
+    # Keep the caller's column order when an explicit projection was asked for
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]]
+    return df
+
+
+def apply_schema(df, kind):
+    """
+    Type an in-memory frame the way load_csv types a parsed file: same dtypes
+    and NA rules, so a stage can hand its output to the next one without a CSV
+    round-trip.
+    """
+    schema = get_schema(kind)
+    df = df.copy()
+    for column in df.columns:
+        dtype = schema.dtype_of(column)
+        if dtype is None:
+            continue
+        if not _is_numeric(dtype):
+            df[column] = df[column].astype(dtype)
+            continue
+        values = _to_numeric(df[column])
+        if schema.fills_zero(column):
+            values = values.fillna(0)
+        df[column] = values.round().astype(_nullable(dtype) if values.hasnans else dtype)
+    return df
@@ -0,0 +1,247 @@
+import os
+import csv
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+PLAN_FILE = 'shard_plan.csv'
+PLAN_HEADER = ['Project', 'SizeBytes', 'Shard', 'NumShards']
+
+
+def parse_shard(spec):
+    """
+    Parse a shard spec 'i/N' (1 <= i <= N).
+
+    Returns:
+    tuple: (i, N)
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N such as 1/4")
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', i must be between 1 and N")
+    return index, count
+
+
+def estimate_size(repo_path):
+    """Size of a repository in bytes, from its packed and loose objects (or its files if it is not a Git repo)."""
+    try:
+        output = subprocess.check_output(['git', '-C', repo_path, 'count-objects', '-v'],
+                                         universal_newlines=True, stderr=subprocess.DEVNULL)
+        stats = dict(line.split(': ') for line in output.strip().splitlines())
+        return (int(stats.get('size', 0)) + int(stats.get('size-pack', 0))) * 1024
+    except (subprocess.CalledProcessError, ValueError):
+        total = 0
+        for root, _, files in os.walk(repo_path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    continue
+        return total
+
+
+def list_projects(input_dir):
+    return sorted(name for name in os.listdir(input_dir) if os.path.isdir(os.path.join(input_dir, name)))
+
+
+def plan_shards(sizes, num_shards):
+    """
+    Assign projects to shards, largest first, each to the currently lightest shard
+    (longest-processing-time first). Ties are broken by project name and shard
+    index, so every node computes the same plan from the same sizes.
+
+    Parameters:
+    sizes (dict): Project -> size in bytes
+    num_shards (int): Number of shards
+
+    Returns:
+    dict: Project -> shard (1-based)
+    """
+    loads = [0] * num_shards
+    plan = {}
+    for project, size in sorted(sizes.items(), key=lambda item: (-item[1], item[0])):
+        shard = min(range(num_shards), key=lambda i: (loads[i], i))
+        loads[shard] += size
+        plan[project] = shard + 1
+    return plan
+
+
+def read_plan(plan_file):
+    """Read a shard plan; returns (project -> shard, project -> size)."""
+    plan, sizes = {}, {}
+    with open(plan_file, newline='') as f:
+        for row in csv.DictReader(f):
+            plan[row['Project']] = int(row['Shard'])
+            sizes[row['Project']] = int(row['SizeBytes'])
+    return plan, sizes
+
+
+def plan_shard_count(plan_file):
+    """Number of shards a plan was made for, or None for plans written without it."""
+    with open(plan_file, newline='') as f:
+        for row in csv.DictReader(f):
+            return int(row['NumShards']) if row.get('NumShards') else None
+    return None
+
+
+def check_shard_count(plan_file, num_shards):
+    """Fail (ValueError) when a stored plan was not made for num_shards shards."""
+    planned_shards = plan_shard_count(plan_file)
+    if planned_shards != num_shards:
+        raise ValueError(f"{plan_file} was made for {planned_shards or 'an unknown number of'} shards, "
+                         f"not {num_shards}; remove it (or run 'Sharding.py plan --replan') to re-plan")
+
+
+def check_plan(plan_file, plan, projects, num_shards):
+    """
+    Fail when a stored plan does not cover exactly the given projects with
+    num_shards shards: a node using it would skip new repositories, mine removed
+    ones or leave a shard without work.
+    """
+    check_shard_count(plan_file, num_shards)
+    added = sorted(set(projects) - set(plan))
+    removed = sorted(set(plan) - set(projects))
+    if added or removed:
+        raise ValueError(f"{plan_file} does not match the repositories: {len(added)} new "
+                         f"({', '.join(added[:5])}{', ...' if len(added) > 5 else ''}), {len(removed)} gone "
+                         f"({', '.join(removed[:5])}{', ...' if len(removed) > 5 else ''}); "
+                         f"remove it (or run 'Sharding.py plan --replan') to re-plan")
+
+
+def load_or_create_plan(plan_file, input_dir, num_shards):
+    """
+    Return the shard plan stored at plan_file, creating it from input_dir if absent.
+
+    The first node to get there publishes the plan with an atomic hard link, and
+    every other node reads that same file, so nodes agree on the assignment even
+    if repository sizes change while they start up. No coordinator is needed.
+
+    A stored plan made for another shard count or another set of repositories is
+    rejected (ValueError) rather than silently used.
+    """
+    projects = list_projects(input_dir)
+    if not os.path.exists(plan_file):
+        sizes = {project: estimate_size(os.path.join(input_dir, project)) for project in projects}
+        plan = plan_shards(sizes, num_shards)
+
+        plan_dir = os.path.dirname(plan_file) or '.'
+        os.makedirs(plan_dir, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(dir=plan_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(PLAN_HEADER)
+            for project in sorted(plan):
+                writer.writerow([project, sizes[project], plan[project], num_shards])
+        try:
+            os.link(temp_file, plan_file)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_file)
+
+    plan, _ = read_plan(plan_file)
+    check_plan(plan_file, plan, projects, num_shards)
+    return plan
+
+
+def shard_projects(input_dir, shard_spec, plan_file):
+    """Projects of input_dir assigned to shard 'i/N', in name order."""
+    index, count = parse_shard(shard_spec)
+    plan = load_or_create_plan(plan_file, input_dir, count)
+    return sorted(project for project, shard in plan.items() if shard == index)
+
+
+def shard_dir(output_dir, shard_spec):
+    """Directory holding the outputs of one shard."""
+    index, count = parse_shard(shard_spec)
+    return os.path.join(output_dir, f'shard-{index}-of-{count}')
+
+
+def merge_shards(output_dir, num_shards, suffix, plan_file=None, journal=None):
+    """
+    Combine per-shard outputs into output_dir, as a single-node run would have written them.
+
+    Parameters:
+    output_dir (str): Directory with the shard-i-of-N subdirectories
+    num_shards (int): Number of shards
+    suffix (str): Per-project output name suffix, e.g. '_fault_proneness.csv'
+    plan_file (str): Shard plan (default: <output_dir>/shard_plan.csv)
+    journal (str): Run journal file name to merge as well, if any
+
+    Returns:
+    list: Projects of the plan with no output in their shard
+    """
+    plan_file = plan_file or os.path.join(output_dir, PLAN_FILE)
+    # With another shard count, projects would be looked up in the wrong shard directories
+    check_shard_count(plan_file, num_shards)
+    plan, _ = read_plan(plan_file)
+    missing = []
+    journal_lines = []
+
+    for project in sorted(plan):
+        source_dir = shard_dir(output_dir, f'{plan[project]}/{num_shards}')
+        source_file = os.path.join(source_dir, f'{project}{suffix}')
+        if not os.path.exists(source_file):
+            missing.append(project)
+            continue
+        # Copy to a temp file first so a merged file is never partial
+        fd, temp_file = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(source_file, temp_file)
+        os.replace(temp_file, os.path.join(output_dir, f'{project}{suffix}'))
+
+    if journal:
+        for index in range(1, num_shards + 1):
+            journal_file = os.path.join(shard_dir(output_dir, f'{index}/{num_shards}'), journal)
+            if os.path.exists(journal_file):
+                with open(journal_file) as f:
+                    journal_lines.extend(line for line in f if line.strip())
+        with open(os.path.join(output_dir, journal), 'w') as f:
+            f.writelines(journal_lines)
+
+    print(f"Merged {len(plan) - len(missing)} of {len(plan)} projects into {output_dir}")
+    for project in missing:
+        print(f"Missing output for {project} (shard {plan[project]}/{num_shards})")
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plan, inspect and merge sharded mining runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help='Create (or show) the shard plan of a corpus')
+    plan_parser.add_argument('input_dir', help='Directory containing Git repositories')
+    plan_parser.add_argument('num_shards', type=int, help='Number of shards')
+    plan_parser.add_argument('--plan_file', required=True, help='Path of the shard plan')
+    plan_parser.add_argument('--replan', action='store_true',
+                             help='Replace an existing plan, e.g. after repositories were added')
+
+    merge_parser = subparsers.add_parser('merge', help='Combine per-shard outputs')
+    merge_parser.add_argument('output_dir', help='Output directory of the sharded runs')
+    merge_parser.add_argument('num_shards', type=int, help='Number of shards')
+    merge_parser.add_argument('--suffix', default='_fault_proneness.csv', help='Per-project output name suffix')
+    merge_parser.add_argument('--plan_file', help='Path of the shard plan (default: <output_dir>/shard_plan.csv)')
+    merge_parser.add_argument('--journal', help='Run journal file name to merge, e.g. fault_proneness_journal.jsonl')
+
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        if args.replan and os.path.exists(args.plan_file):
+            os.remove(args.plan_file)
+        plan = load_or_create_plan(args.plan_file, args.input_dir, args.num_shards)
+        _, sizes = read_plan(args.plan_file)
+        for index in range(1, args.num_shards + 1):
+            projects = [p for p in sorted(plan) if plan[p] == index]
+            total = sum(sizes[p] for p in projects)
+            print(f"Shard {index}/{args.num_shards}: {len(projects)} projects, {total / 2**20:.1f} MiB")
+    else:
+        missing = merge_shards(args.output_dir, args.num_shards, args.suffix, args.plan_file, args.journal)
+        if missing:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -42,7 +42,11 @@
 
 
 import os
+import argparse
 import pandas as pd
+from PathIndex import PATH_INDEX_DIR, project_dictionary, ensure_ids
+from Schemas import load_csv
+from IntermediateStore import open_store
 
 def extract_filename(path):
     """Safely extract filename."""
@@ -50,9 +54,44 @@ def extract_filename(path):
         return None
     return os.path.basename(str(path))
 
-def merge_project_csvs(cp_dir, smell_dir, output_dir):
+def merge_on_file_ids(cp_df, smell_df):
+    """Merge CP and smell rows that refer to the same normalized full path."""
+    return cp_df.dropna(subset=['TestFileID']).merge(
+        smell_df.dropna(subset=['FileID']),
+        left_on='TestFileID',
+        right_on='FileID',
+        how='inner'
+    )
+
+def merge_on_basenames(cp_df, smell_df):
+    """
+    Basename merge restricted to the test files that found no full-path partner.
+    Rows produced here are ambiguous and are reported separately.
+    """
+    cp_unmatched = cp_df[cp_df['TestFileID'].notna() & ~cp_df['TestFileID'].isin(smell_df['FileID'].dropna())]
+    smell_unmatched = smell_df[~smell_df['FileID'].isin(cp_df['TestFileID'].dropna())]
+    merged_df = cp_unmatched.merge(smell_unmatched, on='test_filename', how='inner')
+    return merged_df.dropna(subset=['test_filename'])
+
+def merge_project_csvs(cp_dir, smell_dir, output_dir, index_dir=PATH_INDEX_DIR, basename_fallback=False, store=None):
+    """
+    Merge the transformed CP data of every project with its smell summary.
+
+    Rows are joined on the project-wide file IDs of the full test file paths.
+    With basename_fallback, test files without a full-path partner are additionally
+    matched on their basename; those rows go to BasenameFallback/<project>.csv
+    and are counted separately in merge_log.csv.
+
+    With an IntermediateStore (or its directory), the inputs are read from the
+    store while they are current and the merged rows are also stored under the
+    'smells_cp' stage.
+    """
     # Create output directory if not exists
     os.makedirs(output_dir, exist_ok=True)
+    store = open_store(store)
+    fallback_dir = os.path.join(output_dir, 'BasenameFallback')
+    if basename_fallback:
+        os.makedirs(fallback_dir, exist_ok=True)
 
     # Logging for tracking
     merge_log = []
@@ -79,35 +118,64 @@ def merge_project_csvs(cp_dir, smell_dir, output_dir):
                     output_file = os.path.join(output_dir, f"{project_name}.csv")
 
                     # Read CSV files
-                    cp_df = pd.read_csv(cp_file)
-                    smell_df = pd.read_csv(smell_file)
+                    if store is not None:
+                        cp_df = store.load('cp_transformed', project_name, cp_file, 'cp_transformed')
+                        smell_df = store.load('smell_summary', project_name, smell_file, 'smell_summary')
+                    else:
+                        cp_df = load_csv(cp_file, 'cp_transformed')
+                        smell_df = load_csv(smell_file, 'smell_summary')
+
+                    # Carry the project-wide file IDs through the merge; they end up in the written
+                    # rows, so the dictionary stays locked until those are saved
+                    with project_dictionary(project_name, index_dir) as dictionary:
+                        cp_df = ensure_ids(cp_df, 'TestFile', 'TestFileID', dictionary)
+                        smell_df = ensure_ids(smell_df, 'File Path', 'FileID', dictionary)
+
+                        # Extract filenames for test files
+                        cp_df['test_filename'] = cp_df['TestFile'].apply(extract_filename)
+                        smell_df['test_filename'] = smell_df['File Path'].apply(extract_filename)
+
+                        # Merge on full test file paths
+                        merged_df = merge_on_file_ids(cp_df, smell_df)
+                        merged_df = merged_df.drop(columns=['test_filename_y']).rename(columns={'test_filename_x': 'test_filename'})
+
+                        # Save merged dataframe
+                        merged_df.to_csv(output_file, index=False)
+                        if store is not None:
+                            store.put('smells_cp', project_name, merged_df, output_file, 'smells_cp')
+
+                        # Optionally match the leftovers on basenames
+                        fallback_rows = 0
+                        if basename_fallback:
+                            fallback_df = merge_on_basenames(cp_df, smell_df)
+                            fallback_df.to_csv(os.path.join(fallback_dir, f"{project_name}.csv"), index=False)
+                            fallback_rows = len(fallback_df)
 
-                    # Extract filenames for test files
-                    cp_df['test_filename'] = cp_df['TestFile'].apply(extract_filename)
-                    smell_df['test_filename'] = smell_df['File Path'].apply(extract_filename)
-
-                    # Merge on test filenames
-                    merged_df = cp_df.merge(smell_df, on='test_filename', how='inner')
-                    merged_df = merged_df.dropna(subset=['test_filename'])
-
-                    # Save merged dataframe
-                    merged_df.to_csv(output_file, index=False)
-                    
                     # Log merge details
                     merge_log.append({
                         'Project': project_name,
-                        'Total Merged Rows': len(merged_df)
+                        'Total Merged Rows': len(merged_df),
+                        'Basename Fallback Rows': fallback_rows,
+                        'Unmatched CP Test Files': int((cp_df['TestFileID'].notna() & ~cp_df['TestFileID'].isin(merged_df['TestFileID'])).sum())
                     })
-                    print(f"{project_name}: Merged {len(merged_df)} rows")
+                    print(f"{project_name}: Merged {len(merged_df)} rows on full paths"
+                          + (f", {fallback_rows} basename fallback rows" if basename_fallback else ""))
 
     # Optional: Create a log file
     log_df = pd.DataFrame(merge_log)
     log_df.to_csv(os.path.join(output_dir, 'merge_log.csv'), index=False)
 
-# Directories
-cp_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/CP/CP_Summary"
-smell_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/TestSmells/SmellsCleanAggregatedData"
-output_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/SmellsPlusCPP"
+if __name__ == "__main__":
+    # Directories
+    cp_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/CP/CP_Summary"
+    smell_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/TestSmells/SmellsCleanAggregatedData"
+    output_dir = "/home/siam/Desktop/volume1/MS_Papers_Arif/Data/SmellsPlusCPP"
+
+    parser = argparse.ArgumentParser(description='Merge change proneness and smell summaries per project')
+    parser.add_argument('--basename_fallback', action='store_true',
+                        help='Also match test files without a full-path partner on their basename')
+    parser.add_argument('--store_dir', help='Read and keep intermediate data in the store at this directory')
+    args = parser.parse_args()
 
-# Merge files in bulk
-merge_project_csvs(cp_dir, smell_dir, output_dir)
\ No newline at end of file
+    # Merge files in bulk
+    merge_project_csvs(cp_dir, smell_dir, output_dir, basename_fallback=args.basename_fallback, store=args.store_dir)
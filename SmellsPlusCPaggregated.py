@@ -76,20 +76,12 @@
 
 
 
-import pandas as pd
-import numpy as np
+from Schemas import load_csv
 
-# Read CSV
-df = pd.read_csv('/home/iit/Downloads/Thesis/Data/aggregate_summary.csv')
-
-# Replace blank cells with 0
-df = df.replace(r'^\s*$', 0, regex=True)
-
-# Convert columns to numeric, coercing any remaining non-numeric values to 0
-numeric_columns = df.select_dtypes(include=[object]).columns
-df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+# Read CSV with the typed schema: blank smell cells are zero-filled while parsing
+df = load_csv('/home/iit/Downloads/Thesis/Data/aggregate_summary.csv', 'aggregate_summary')
 
 # Save updated CSV
 df.to_csv('/home/iit/Downloads/Thesis/Data/aggregate_summary_zero_filled.csv', index=False)
 
-print("CSV processed. Zero-filled values saved.")
\ No newline at end of file
+print("CSV processed. Zero-filled values saved.")
@@ -125,76 +125,195 @@
 
 
 import pandas as pd
+import numpy as np
 import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PathIndex import PATH_INDEX_DIR, project_dictionary
+from IntermediateStore import open_store
+
+PATH_PREFIX = "file://$PROJECT_DIR$/"
 
 def clean_file_path(path):
     """Remove the repetitive prefix from file paths"""
-    prefix = "file://$PROJECT_DIR$/"
+    prefix = PATH_PREFIX
     if isinstance(path, str) and path.startswith(prefix):
         return path[len(prefix):]
     return path
 
-def generate_smell_summary(input_csv, output_dir):
-    # Read the CSV file
-    df = pd.read_csv(input_csv)
+def encode_column(values, clean=None):
+    """
+    Encode a categorical column as (codes, sorted labels).
+    The optional clean function is applied to the distinct labels only;
+    labels that become equal after cleaning share one code. Missing values get -1.
+    """
+    categories = pd.Index(values.cat.categories.astype(str))
+    if clean is not None:
+        categories = clean(categories)
+    labels, inverse = np.unique(np.asarray(categories, dtype=object), return_inverse=True)
+    raw_codes = values.cat.codes.to_numpy()
+    codes = np.where(raw_codes >= 0, inverse[np.maximum(raw_codes, 0)], -1)
+    return codes, labels
+
+class SparseSmellCounts:
+    """Smell counts per (file, smell) pair, stored as coordinate triples."""
+
+    def __init__(self, files, smells, rows, cols, counts):
+        self.files = files
+        self.smells = smells
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+
+    @classmethod
+    def from_codes(cls, file_codes, file_labels, smell_codes, smell_labels):
+        valid = (file_codes >= 0) & (smell_codes >= 0)
+        n_smells = len(smell_labels)
+        linear = file_codes[valid].astype(np.int64) * n_smells + smell_codes[valid]
+        counts = np.bincount(linear)
+        nonzero = np.flatnonzero(counts)
+        rows, cols = np.divmod(nonzero, n_smells)
+
+        # Keep only files and smells that occur, like groupby/pivot_table did
+        used_files, rows = np.unique(rows, return_inverse=True)
+        used_smells, cols = np.unique(cols, return_inverse=True)
+        return cls(file_labels[used_files], smell_labels[used_smells], rows, cols, counts[nonzero])
+
+    def totals(self):
+        return np.bincount(self.rows, weights=self.counts, minlength=len(self.files)).astype(np.int64)
+
+    def to_frame(self, file_path_col):
+        """Materialize the dense integer table, sorted by total smells (descending)."""
+        dense = np.zeros((len(self.files), len(self.smells)), dtype=np.int32)
+        dense[self.rows, self.cols] = self.counts
+        totals = self.totals()
+        order = np.argsort(-totals, kind='stable')
+
+        frame = pd.DataFrame(dense[order], columns=list(self.smells))
+        frame.insert(0, file_path_col, self.files[order])
+        frame['total_smells'] = totals[order]
+        return frame
+
+def generate_smell_summary(input_csv, output_dir, dictionary=None):
+    # Identify columns from the header only
+    columns = pd.read_csv(input_csv, nrows=0).columns
+    file_path_col = [col for col in columns if 'path' in col.lower() or 'file' in col.lower()][0]
+    smell_name_col = [col for col in columns if 'smell' in col.lower()][0]
+
+    # Read only the two columns we need, directly as categoricals
+    df = pd.read_csv(input_csv, usecols=[file_path_col, smell_name_col], dtype='category')
+
+    # Clean file paths on the distinct values only
+    file_codes, file_labels = encode_column(df[file_path_col], lambda paths: paths.str.removeprefix(PATH_PREFIX))
+    smell_codes, smell_labels = encode_column(df[smell_name_col])
+
+    # Count occurrences of every (file path, smell name) pair
+    counts = SparseSmellCounts.from_codes(file_codes, file_labels, smell_codes, smell_labels)
+
+    # Dense table (sorted by total smells) is only built for the output
+    pivot_summary = counts.to_frame(file_path_col)
+
+    # Attach the project-wide file ID of each path
+    if dictionary is not None:
+        pivot_summary.insert(1, 'FileID', dictionary.intern_series(pivot_summary[file_path_col]))
+
+    # Save to CSV
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, 'smell_summary.csv')
+    pivot_summary.to_csv(output_path, index=False)
+
+    print(f"Summary for {input_csv}: {len(pivot_summary)} unique file paths")
+    return pivot_summary
+
+def summarize_project(project_path, index_dir=PATH_INDEX_DIR, store_dir=None):
+    """
+    Summarize every aggregated CSV of one project folder.
+    With store_dir, the summary is also stored typed under the 'smell_summary' stage.
+    Returns a row for the run index, or None if the folder has no aggregated CSV.
+    """
+    project_folder = os.path.basename(project_path)
     
-    # Identify columns
-    file_path_col = [col for col in df.columns if 'path' in col.lower() or 'file' in col.lower()][0]
-    smell_name_col = [col for col in df.columns if 'smell' in col.lower()][0]
+    # Find CSV files
+    csv_files = [f for f in os.listdir(project_path) if f.endswith('_aggregated.csv')]
     
-    # Clean file paths
-    df[file_path_col] = df[file_path_col].apply(clean_file_path)
+    if not csv_files:
+        print(f"\nNo aggregated CSV files found in: {project_folder}")
+        return None
     
-    # Group by unique file path and smell name, and count occurrences
-    smell_summary = df.groupby([file_path_col, smell_name_col]).size().reset_index(name='smell_count')
+    print(f"\nProcessing project: {project_folder}")
+    start = time.perf_counter()
+    rows = 0
     
-    # Pivot the table 
-    pivot_summary = smell_summary.pivot_table(
-        index=file_path_col, 
-        columns=smell_name_col, 
-        values='smell_count', 
-        fill_value=0
-    ).reset_index()
+    # Project folders are named '<project>_csv'; only the suffix is stripped, not '_csv' inside names
+    project = project_folder[:-len('_csv')] if project_folder.endswith('_csv') else project_folder
     
-    # Sort rows by total smells
-    pivot_summary['total_smells'] = pivot_summary.iloc[:, 1:].sum(axis=1)
-    pivot_summary = pivot_summary.sort_values('total_smells', ascending=False)
+    # Workers of other projects run concurrently; the lock keeps other processes off this dictionary
+    output_dir = os.path.join(project_path, 'Summary')
+    with project_dictionary(project, index_dir) as dictionary:
+        for csv_file in csv_files:
+            input_csv = os.path.join(project_path, csv_file)
+            
+            pivot_summary = generate_smell_summary(input_csv, output_dir, dictionary)
+            rows += len(pivot_summary)
     
-    # Save to CSV
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, 'smell_summary.csv')
-    pivot_summary.to_csv(output_path, index=False)
+    # Every CSV of the folder writes the same smell_summary.csv, so the last one is what is on disk
+    store = open_store(store_dir)
+    if store is not None:
+        store.put('smell_summary', project, pivot_summary,
+                  os.path.join(output_dir, 'smell_summary.csv'), 'smell_summary')
     
-    print(f"Summary for {input_csv}: {len(pivot_summary)} unique file paths")
-    return pivot_summary
+    return {
+        'Project': project_folder,
+        'Summary Rows': rows,
+        'Seconds': round(time.perf_counter() - start, 3)
+    }
 
-def process_all_projects(base_dir):
+def process_all_projects(base_dir, index_dir=PATH_INDEX_DIR, workers=1, store_dir=None):
+    """
+    Summarize all project folders, optionally on a pool of worker processes.
+    Projects are independent, so each worker writes its own Summary/smell_summary.csv.
+    
+    Returns a DataFrame with the summary row count and run time of every project.
+    """
     print("Processing all projects in:", base_dir)
     print("-" * 50)
     
-    for project_folder in os.listdir(base_dir):
-        project_path = os.path.join(base_dir, project_folder)
-        
-        # Skip if not a directory
-        if not os.path.isdir(project_path):
-            continue
-        
-        # Find CSV files
-        csv_files = [f for f in os.listdir(project_path) if f.endswith('_aggregated.csv')]
-        
-        if csv_files:
-            print(f"\nProcessing project: {project_folder}")
-            
-            for csv_file in csv_files:
-                input_csv = os.path.join(project_path, csv_file)
-                output_dir = os.path.join(project_path, 'Summary')
-                
-                generate_smell_summary(input_csv, output_dir)
-        else:
-            print(f"\nNo aggregated CSV files found in: {project_folder}")
-
-# Base directory
-base_dir = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/TestSmells/SmellsCleanAggregatedData'
-
-# Process all projects
-process_all_projects(base_dir)
\ No newline at end of file
+    # Skip entries that are not directories
+    project_paths = [os.path.join(base_dir, project_folder) for project_folder in sorted(os.listdir(base_dir))
+                     if os.path.isdir(os.path.join(base_dir, project_folder))]
+    
+    results = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(summarize_project, project_path, index_dir, store_dir): project_path
+                       for project_path in project_paths}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Error processing {futures[future]}: {e}")
+    else:
+        for project_path in project_paths:
+            try:
+                results.append(summarize_project(project_path, index_dir, store_dir))
+            except Exception as e:
+                print(f"Error processing {project_path}: {e}")
+    
+    run_index = pd.DataFrame([result for result in results if result is not None],
+                             columns=['Project', 'Summary Rows', 'Seconds'])
+    return run_index.sort_values('Project').reset_index(drop=True)
+
+if __name__ == "__main__":
+    # Base directory
+    base_dir = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/TestSmells/SmellsCleanAggregatedData'
+    
+    parser = argparse.ArgumentParser(description='Summarize test smells per project')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of projects summarized concurrently')
+    parser.add_argument('--store_dir', help='Also store the typed summaries in the intermediate store at this directory')
+    args = parser.parse_args()
+    
+    # Process all projects
+    run_index = process_all_projects(base_dir, workers=args.workers, store_dir=args.store_dir)
+    print(run_index.to_string(index=False))
@@ -0,0 +1,80 @@
+import os
+import csv
+from typing import List, Tuple
+
+import pandas as pd
+
+
+def read_header(file_path: str) -> List[str]:
+    """
+    Read only the header row of a CSV file, named the way pandas names the
+    columns of the chunks (duplicates become 'X.1', blank names 'Unnamed: 0').
+    """
+    try:
+        return pd.read_csv(file_path, nrows=0, dtype=str).columns.tolist()
+    except pd.errors.EmptyDataError:
+        return []
+
+
+def union_columns(file_paths: List[str], extra_columns: List[str] = ()) -> List[str]:
+    """
+    Union the column sets of several CSV files from their headers alone,
+    keeping the order of first appearance.
+
+    extra_columns are appended to every file's header, so they follow the
+    columns of the first file, as pd.concat placed a column added to each frame.
+    """
+    columns = []
+    seen = set()
+    for file_path in file_paths:
+        for column in read_header(file_path) + list(extra_columns):
+            if column not in seen:
+                seen.add(column)
+                columns.append(column)
+    for column in extra_columns:
+        if column not in seen:
+            seen.add(column)
+            columns.append(column)
+    return columns
+
+
+def stream_combine(sources: List[Tuple[str, str]], destination_file: str, label_column: str,
+                   chunksize: int = 100000) -> Tuple[int, int]:
+    """
+    Concatenate CSV files into one file in constant memory.
+
+    The output schema is the union of all source headers; columns missing from a
+    source are left empty. Values are copied as text, so no type inference happens.
+
+    Parameters:
+    sources (list): (file path, label) pairs; the label is written to label_column
+    destination_file (str): Path for the combined CSV file
+    label_column (str): Name of the column identifying the source of each row
+    chunksize (int): Number of rows read per chunk
+
+    Returns:
+    tuple: (files combined, rows written)
+    """
+    columns = union_columns([file_path for file_path, _ in sources], [label_column])
+
+    os.makedirs(os.path.dirname(destination_file) or '.', exist_ok=True)
+
+    files = 0
+    rows = 0
+    with open(destination_file, 'w', newline='', encoding='utf-8') as out:
+        csv.writer(out).writerow(columns)
+        for file_path, label in sources:
+            print(f"Processing: {file_path}")
+            try:
+                for chunk in pd.read_csv(file_path, dtype=str, keep_default_na=False,
+                                         na_filter=False, chunksize=chunksize):
+                    chunk[label_column] = label
+                    chunk = chunk.reindex(columns=columns, fill_value='')
+                    chunk.to_csv(out, header=False, index=False)
+                    rows += len(chunk)
+                files += 1
+            except pd.errors.EmptyDataError:
+                print(f"Skipping empty file: {file_path}")
+            except (pd.errors.ParserError, UnicodeDecodeError, OSError) as e:
+                print(f"Error reading {file_path}: {e}")
+    return files, rows
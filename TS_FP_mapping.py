@@ -93,6 +93,8 @@
 
 import pandas as pd
 import os
+from Schemas import load_csv
+from AnalyticsStore import ANALYTICS_DB, AnalyticsStore
 
 # Define input and output paths
 input_dir = '/home/iit/Downloads/Thesis/Data/SM_CP_FP/TS_FP'
@@ -102,9 +104,24 @@ output_file = '/home/iit/Downloads/Thesis/Data/SM_CP_FP/TS_FP/tsfp.csv'
 test_smells_path = os.path.join(input_dir, 'TS.csv')
 fault_proneness_path = os.path.join(input_dir, 'FP.csv')
 
-# Read CSVs
-test_smells_df = pd.read_csv(test_smells_path)
-fault_proneness_df = pd.read_csv(fault_proneness_path)
+# Columns used from each file
+fault_proneness_columns = ['ProductionFile', 'TestFile', 'Prod_Is_Faulty',
+                           'Prod_TotalFaultyCommit', 'Prod_TotalCommits',
+                           'Prod_FaultyInsertions', 'Prod_FaultyDeletions',
+                           'Test_Is_Faulty', 'Test_TotalFaultyCommit',
+                           'Test_TotalCommits', 'Test_FaultyInsertions',
+                           'Test_FaultyDeletions']
+test_smells_columns = ['TestFile', 'Assertion Roulette', 'Conditional Test Logic',
+                       'Constructor Initialization', 'Duplicate Assertion',
+                       'Empty Test', 'Exception Handling', 'General Fixture',
+                       'Lack of Cohesion of Test Cases', 'Magic Number Test',
+                       'Obscure In-Line Setup', 'Redundant Assertion ', 'Redundant Print', 
+                       'Sleepy Test', 'Suboptimal Assert', 'Test Maverick', 
+                       'Total Smells']
+
+# Read only the needed columns of each CSV, with typed schemas
+test_smells_df = load_csv(test_smells_path, 'ts_fp', columns=test_smells_columns)
+fault_proneness_df = load_csv(fault_proneness_path, 'ts_fp', columns=fault_proneness_columns)
 
 # Remove duplicates from both dataframes based on TestFile
 test_smells_df = test_smells_df.drop_duplicates(subset=['TestFile'])
@@ -120,19 +137,8 @@ print(f"Unique TestFiles in Fault Proneness: {len(fault_proneness_df)}")
 
 # Merge dataframes on TestFile column
 merged_df = pd.merge(
-    fault_proneness_df[['ProductionFile', 'TestFile', 'Prod_Is_Faulty',
-                        'Prod_TotalFaultyCommit', 'Prod_TotalCommits',
-                        'Prod_FaultyInsertions', 'Prod_FaultyDeletions',
-                        'Test_Is_Faulty', 'Test_TotalFaultyCommit',
-                        'Test_TotalCommits', 'Test_FaultyInsertions',
-                        'Test_FaultyDeletions']],
-    test_smells_df[['TestFile', 'Assertion Roulette', 'Conditional Test Logic',
-                    'Constructor Initialization', 'Duplicate Assertion',
-                    'Empty Test', 'Exception Handling', 'General Fixture',
-                    'Lack of Cohesion of Test Cases', 'Magic Number Test',
-                    'Obscure In-Line Setup', 'Redundant Assertion ', 'Redundant Print', 
-                    'Sleepy Test', 'Suboptimal Assert', 'Test Maverick', 
-                    'Total Smells']],
+    fault_proneness_df[fault_proneness_columns],
+    test_smells_df[test_smells_columns],
     on='TestFile',
     how='inner'
 )
@@ -166,6 +172,10 @@ os.makedirs(os.path.dirname(output_file), exist_ok=True)
 # Save the final merged dataframe
 final_df.to_csv(output_file, index=False)
 
+# Keep it queryable in the analytics database as table 'tsfp'
+with AnalyticsStore(ANALYTICS_DB) as store:
+    store.write_frame('tsfp', final_df, project_column=None, source_file=output_file)
+
 # Print summary statistics
 print(f"\nOriginal number of rows in test smells file: {len(test_smells_df)}")
 print(f"Original number of rows in fault proneness file: {len(fault_proneness_df)}")
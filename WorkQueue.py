@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+
+# Queue layout on a shared directory:
+#   tasks/<name>     one file per task, holding its priority
+#   leases/<name>    claimed tasks; the file's mtime is the last heartbeat
+#   attempts/<name>  failed attempts so far (worker and error of each)
+#   done/<name>      completed tasks and their result
+#   failed/<name>    tasks that failed max_attempts times
+QUEUE_DIRS = ['tasks', 'leases', 'attempts', 'done', 'failed']
+
+
+def _write_json(path, data):
+    temp_file = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_file, path)
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default
+
+
+def _create_exclusive(path, data):
+    """
+    Create path with the given JSON content unless it exists; True if we created it.
+
+    The content is written to a unique temp file and hard-linked into place,
+    which is atomic on local filesystems and NFS alike.
+    """
+    temp_file = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump(data, f)
+    try:
+        os.link(temp_file, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temp_file)
+
+
+class Lease:
+    """
+    A claimed task. A background thread renews the lease every heartbeat_interval
+    seconds until the task is completed, failed or released.
+
+    Used as a context manager, the task is completed on a normal exit and
+    failed when the block raises; the error is printed and the worker moves on.
+    A lease lost to another worker is only released: the task is neither
+    completed nor failed, since its new owner may still be working on it.
+    """
+
+    def __init__(self, queue, name, token):
+        self.queue = queue
+        self.name = name
+        self.token = token
+        self.lost = False
+        self.finished = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+
+    @property
+    def path(self):
+        return self.queue._path('leases', self.name)
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.queue.heartbeat_interval):
+            if not self.renew():
+                self.lost = True
+                print(f"Lease on {self.name} was lost to another worker")
+                return
+
+    def renew(self):
+        """Refresh the heartbeat; False if the lease now belongs to someone else."""
+        lease = _read_json(self.path)
+        if lease is None or lease.get('token') != self.token:
+            return False
+        try:
+            os.utime(self.path)
+        except OSError:
+            # Renamed away by reclaim_expired between the read and the touch
+            return False
+        return True
+
+    def held(self):
+        """
+        Whether this worker still owns the task, checked against the lease file now
+        rather than at the last heartbeat. Pass `lambda: not lease.held()` as the
+        cancellation check of long work, so it stops before its next write.
+        """
+        if not self.lost and not self.renew():
+            self.lost = True
+        return not self.lost
+
+    def _finish(self):
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.finished = True
+
+    def _drop_lease(self):
+        lease = _read_json(self.path)
+        if lease is not None and lease.get('token') == self.token:
+            os.remove(self.path)
+
+    def complete(self, **result):
+        """
+        Record the task as done; returns False, only releasing it, if the lease was
+        lost meanwhile or another worker completed the task first.
+        """
+        self._finish()
+        if not self.held():
+            print(f"Lease on {self.name} was lost before it completed; releasing it")
+            self._drop_lease()
+            return False
+        record = {'worker': self.queue.worker_id, 'finished': time.strftime('%Y-%m-%d %H:%M:%S'), **result}
+        completed = _create_exclusive(self.queue._path('done', self.name), record)
+        if not completed:
+            print(f"{self.name} was already completed by another worker")
+        self._drop_lease()
+        return completed
+
+    def fail(self, error=''):
+        """Record a failed attempt; the task goes back to the queue until max_attempts is reached."""
+        self._finish()
+        if not self.held():
+            # The new owner's attempt decides the task
+            self._drop_lease()
+            return
+        attempts_file = self.queue._path('attempts', self.name)
+        attempts = _read_json(attempts_file, []) + [{'worker': self.queue.worker_id, 'error': str(error)}]
+        _write_json(attempts_file, attempts)
+        if len(attempts) >= self.queue.max_attempts:
+            _write_json(self.queue._path('failed', self.name), {'attempts': attempts})
+        self._drop_lease()
+
+    def release(self):
+        """Give the task back without counting an attempt."""
+        self._finish()
+        self._drop_lease()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.finished:
+            if self.lost:
+                self.release()
+            elif exc_type is None:
+                self.complete()
+            else:
+                print(f"Error processing {self.name}: {str(exc)}")
+                self.fail(exc)
+        return exc_type is not None and issubclass(exc_type, Exception)
+
+
+class WorkQueue:
+    """
+    Lease-based work queue on a shared directory, for workers on any number of hosts.
+
+    Workers claim the highest-priority pending task by atomically creating its
+    lease file, renew the lease while working, and complete, fail or release it.
+    A lease whose heartbeat is older than lease_timeout is considered abandoned
+    and the task is claimed again by the next worker.
+
+    Parameters:
+    queue_dir (str): Shared queue directory
+    lease_timeout (float): Seconds without a heartbeat after which a lease expires
+    heartbeat_interval (float): Seconds between lease renewals (default: lease_timeout / 4)
+    max_attempts (int): Failed attempts after which a task is given up
+    worker_id (str): Name of this worker (default: host:pid)
+    """
+
+    def __init__(self, queue_dir, lease_timeout=600.0, heartbeat_interval=None, max_attempts=3, worker_id=None):
+        self.queue_dir = queue_dir
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval or lease_timeout / 4
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        for name in QUEUE_DIRS:
+            os.makedirs(os.path.join(queue_dir, name), exist_ok=True)
+
+    def _path(self, kind, name):
+        return os.path.join(self.queue_dir, kind, name)
+
+    def _names(self, kind):
+        return {name for name in os.listdir(os.path.join(self.queue_dir, kind)) if not name.endswith('.tmp')}
+
+    def enqueue(self, name, priority=0):
+        """Add a task unless it is already queued; returns True if it was added."""
+        if '/' in name or name.startswith('.'):
+            raise ValueError(f"Invalid task name: {name}")
+        return _create_exclusive(self._path('tasks', name), {'priority': priority})
+
+    def pending(self):
+        """Tasks not finished and not currently leased, highest priority first."""
+        names = self._names('tasks') - self._names('done') - self._names('failed') - self._names('leases')
+        priorities = {name: _read_json(self._path('tasks', name), {}).get('priority', 0) for name in names}
+        return sorted(names, key=lambda name: (-priorities[name], name))
+
+    def counts(self):
+        tasks = self._names('tasks')
+        done = self._names('done') & tasks
+        failed = self._names('failed') & tasks
+        leased = self._names('leases') & tasks
+        return {'tasks': len(tasks), 'pending': len(tasks - done - failed - leased),
+                'leased': len(leased), 'done': len(done), 'failed': len(failed)}
+
+    def _is_expired(self, path):
+        try:
+            return time.time() - os.path.getmtime(path) > self.lease_timeout
+        except FileNotFoundError:
+            return False
+
+    def reclaim_expired(self):
+        """Remove abandoned leases so their tasks become pending again; returns their names."""
+        reclaimed = []
+        for name in self._names('leases'):
+            path = self._path('leases', name)
+            if not self._is_expired(path):
+                continue
+            # Rename first: of several workers reclaiming at once only one rename succeeds
+            stale_file = f'{path}.{uuid.uuid4().hex}.tmp'
+            try:
+                os.rename(path, stale_file)
+            except FileNotFoundError:
+                continue
+            if self._is_expired(stale_file):
+                os.remove(stale_file)
+                reclaimed.append(name)
+                print(f"Reclaimed abandoned lease on {name}")
+            else:
+                # Renewed in the meantime: put it back, unless another worker has claimed
+                # the task since (a rename would silently replace that worker's lease)
+                try:
+                    os.link(stale_file, path)
+                except FileExistsError:
+                    pass
+                os.remove(stale_file)
+        return reclaimed
+
+    def claim(self):
+        """Claim the next pending task; returns a running Lease or None if nothing is claimable."""
+        self.reclaim_expired()
+        for name in self.pending():
+            token = uuid.uuid4().hex
+            lease = {'worker': self.worker_id, 'token': token, 'claimed': time.strftime('%Y-%m-%d %H:%M:%S')}
+            if not _create_exclusive(self._path('leases', name), lease):
+                continue
+            # Finished by another worker between listing and claiming
+            if os.path.exists(self._path('done', name)) or os.path.exists(self._path('failed', name)):
+                os.remove(self._path('leases', name))
+                continue
+            claimed = Lease(self, name, token)
+            claimed._thread.start()
+            return claimed
+        return None
+
+    def work(self, wait=True, poll_interval=None):
+        """
+        Yield leases until the queue is drained.
+
+        With wait=True a worker that finds nothing pending keeps polling while other
+        workers hold leases, so it can pick up tasks whose leases expire.
+        """
+        poll_interval = poll_interval or min(self.heartbeat_interval, 30)
+        while True:
+            lease = self.claim()
+            if lease is not None:
+                yield lease
+                continue
+            if not wait or not self._names('leases') & self._names('tasks'):
+                return
+            time.sleep(poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or fill a filesystem work queue')
+    parser.add_argument('queue_dir', help='Shared queue directory')
+    parser.add_argument('--enqueue', nargs='+', help='Task names to add')
+    parser.add_argument('--reclaim', action='store_true', help='Release expired leases now')
+    parser.add_argument('--lease_timeout', type=float, default=600.0, help='Lease expiry in seconds')
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.queue_dir, args.lease_timeout)
+    for name in args.enqueue or []:
+        queue.enqueue(name)
+    if args.reclaim:
+        queue.reclaim_expired()
+    print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
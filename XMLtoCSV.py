@@ -68,9 +68,10 @@ def convert_xml_to_csv(input_dir, output_dir):
                 except Exception as e:
                     print(f"Error processing {project_folder}/{filename}: {e}")
 
-# Paths
-input_dir = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/Extracted_Smells_dataset'
-output_dir = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/XMLtoCSV'
+if __name__ == "__main__":
+    # Paths
+    input_dir = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/Extracted_Smells_dataset'
+    output_dir = '/home/siam/Desktop/volume1/MS_Papers_Arif/Data/XMLtoCSV'
 
-# Run conversion
-convert_xml_to_csv(input_dir, output_dir)
\ No newline at end of file
+    # Run conversion
+    convert_xml_to_csv(input_dir, output_dir)
\ No newline at end of file
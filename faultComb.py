@@ -1,9 +1,10 @@
 import os
-import pandas as pd
+from StreamingCombine import stream_combine
 
 def combine_csv_files(source_folder, destination_file):
     """
     Combine all CSV files from source folder into a single destination file without spacing.
+    Files are streamed chunk by chunk, so memory use does not grow with the data.
     
     Parameters:
     source_folder (str): Path to the folder containing source CSV files
@@ -17,32 +18,13 @@ def combine_csv_files(source_folder, destination_file):
             print(f"No CSV files found in {source_folder}")
             return
             
-        # Create empty list to store dataframes
-        dfs = []
+        # Stream every CSV into the destination, adding the project name as a column
+        sources = [(os.path.join(source_folder, file), file.replace('.csv', '')) for file in csv_files]
+        files, rows = stream_combine(sources, destination_file, 'Source_File')
         
-        # Read each CSV file
-        for file in csv_files:
-            print(f"Processing: {file}")
-            # Read the current CSV
-            df = pd.read_csv(os.path.join(source_folder, file))
-            
-            # Add project name as a column 
-            df['Source_File'] = file.replace('.csv', '')
-            
-            # Append to list of dataframes
-            dfs.append(df)
-        
-        # Concatenate all dataframes
-        merged_df = pd.concat(dfs, ignore_index=True)
-        
-        # Create destination directory if it doesn't exist
-        os.makedirs(os.path.dirname(destination_file), exist_ok=True)
-        
-        # Save the merged dataframe
-        merged_df.to_csv(destination_file, index=False)
         print(f"\nSuccess! Combined file saved as: {destination_file}")
-        print(f"Total files processed: {len(csv_files)}")
-        print(f"Total rows in combined file: {len(merged_df)}")
+        print(f"Total files processed: {files}")
+        print(f"Total rows in combined file: {rows}")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -1,12 +1,16 @@
 import pandas as pd
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pandas.api.types import union_categoricals
+from Schemas import load_csv
+
+AGGREGATIONS = {'Changes': 'sum', 'TotalCommits': 'max', 'Insertions': 'sum', 'Deletions': 'sum'}
 
 def post_process(file_path, output_path):
-    df = pd.read_csv(file_path)
-    df['Changes'] = df['Changes'].astype(int)
-    df['TotalCommits'] = df['TotalCommits'].astype(int)
+    df = load_csv(file_path, 'class_changes')
     # sum the Changes for each ClassName and max the TotalCommits
-    df = df.groupby('ClassName').agg({'Changes': 'sum', 'TotalCommits': 'max', 'Insertions': 'sum', 'Deletions': 'sum'}).reset_index()
+    df = df.groupby('ClassName', observed=True).agg(AGGREGATIONS).reset_index()
 
     # if total commits is less than or equal to 5, remove the row
     # df = df[df['TotalCommits'] > 5]
@@ -15,15 +19,43 @@ def post_process(file_path, output_path):
     df = df[df['Changes'] > 0]
 
     # sort by Changes and TotalCommits ratio
+    # stable sort, so classes with the same ratio stay in ClassName order
     df['Ratio'] = df['Changes'] / df['TotalCommits']
-    df = df.sort_values(by='Ratio', ascending=False)
+    df = df.sort_values(by='Ratio', ascending=False, kind='mergesort')
     df.drop(columns=['Ratio'], inplace=True)
     df.to_csv(output_path, index=False)
 
-changes_dir = "changes_with_line_fixed_3"
-output_dir = f"accumulated_{changes_dir}"
+def load_versions(project_path, versions):
+    """
+    Load all version files of a project into one frame with a 'version' column.
+
+    ClassName stays categorical over the union of all versions' class names,
+    which mostly overlap.
+    """
+    frames = []
+    for version in versions:
+        df = load_csv(f"{project_path}/{version}.csv", 'class_changes')
+        df['version'] = version
+        frames.append(df)
+    # empty versions have no categories to contribute (and an object-typed empty category index)
+    class_names = [df['ClassName'].astype('category') for df in frames if len(df)]
+    categories = union_categoricals(class_names, sort_categories=True).categories if class_names else []
+    df = pd.concat(frames, ignore_index=True)
+    df['ClassName'] = pd.Categorical(df['ClassName'], categories=categories)
+    return df
+
+def post_process_versions(df):
+    """
+    post_process of every version at once: one groupby over (version, ClassName)
+    with the same aggregations, filter and ratio ordering within each version.
+    """
+    df = df.groupby(['version', 'ClassName'], observed=True).agg(AGGREGATIONS).reset_index()
+    df = df[df['Changes'] > 0]
+    df['Ratio'] = df['Changes'] / df['TotalCommits']
+    df = df.sort_values(by=['version', 'Ratio'], ascending=[True, False], kind='mergesort')
+    return df.drop(columns=['Ratio'])
 
-for project in os.listdir(changes_dir):
+def process_project(changes_dir, output_dir, project, batched=False):
     project_path = os.path.join(changes_dir, project)
     
     # get the versions from existing csv files, eg. 1.csv, 2.csv
@@ -34,8 +66,58 @@ for project in os.listdir(changes_dir):
     if not os.path.exists(f"{output_dir}/{project}"):
         os.makedirs(f"{output_dir}/{project}")
 
+    if not batched:
+        for version in versions:
+            print(f"Post processing {project} {version}...")
+            post_process(f"{project_path}/{version}.csv", f"{output_dir}/{project}/{version}.csv")
+        return len(versions)
+
+    print(f"Post processing {project} ({len(versions)} versions)...")
+    if not versions:
+        return 0
+    df = post_process_versions(load_versions(project_path, versions))
+    written = set()
+    for version, group in df.groupby('version', sort=False):
+        group.drop(columns=['version']).to_csv(f"{output_dir}/{project}/{version}.csv", index=False)
+        written.add(version)
+    # versions without any changed class still get a file with the header
+    empty = df.drop(columns=['version']).iloc[:0]
     for version in versions:
-        print(f"Post processing {project} {version}...")
-        post_process(f"{project_path}/{version}.csv", f"{output_dir}/{project}/{version}.csv")
+        if version not in written:
+            empty.to_csv(f"{output_dir}/{project}/{version}.csv", index=False)
+    return len(versions)
+
+def main():
+    parser = argparse.ArgumentParser(description='Accumulate the per-version class change files of every project')
+    parser.add_argument('--changes_dir', default="changes_with_line_fixed_3", help='Directory with <project>/<version>.csv')
+    parser.add_argument('--output_dir', help='Output directory (default: accumulated_<changes_dir>)')
+    parser.add_argument('--batched', action='store_true',
+                        help='Load all versions of a project into one frame and aggregate them in one groupby')
+    parser.add_argument('--workers', type=int, default=1, help='Number of projects processed concurrently')
+    args = parser.parse_args()
+
+    changes_dir = args.changes_dir
+    output_dir = args.output_dir or f"accumulated_{os.path.basename(os.path.normpath(changes_dir))}"
+    # skip files next to the project folders, e.g. the <project>_versions.csv of HistoryTable.py
+    projects = [project for project in sorted(os.listdir(changes_dir)) if os.path.isdir(os.path.join(changes_dir, project))]
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(process_project, changes_dir, output_dir, project, args.batched): project
+                       for project in projects}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error processing {futures[future]}: {e}")
+    else:
+        for project in projects:
+            try:
+                process_project(changes_dir, output_dir, project, args.batched)
+            except Exception as e:
+                print(f"Error processing {project}: {e}")
+
+if __name__ == "__main__":
+    main()
 
 # post_process('commons-csv/2.csv', "commons-csv/2.csv")
\ No newline at end of file
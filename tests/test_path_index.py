@@ -0,0 +1,48 @@
+import os
+import sys
+from multiprocessing import get_context
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PathIndex import project_dictionary, load_project_dictionary, save_project_dictionary
+
+
+def intern_and_write(index_dir, output_file, paths):
+    with project_dictionary('demo', index_dir) as dictionary:
+        ids = [dictionary.intern(path) for path in paths]
+        pd.DataFrame({'Path': paths, 'FileID': ids}).to_csv(output_file, index=False)
+
+
+def test_concurrent_stages_never_share_an_id(tmp_path):
+    index_dir = str(tmp_path / 'index')
+    context = get_context('fork')
+    workers = []
+    for worker in range(4):
+        paths = ['shared.py'] + [f'w{worker}/f{n}.py' for n in range(50)]
+        workers.append(context.Process(target=intern_and_write,
+                                       args=(index_dir, str(tmp_path / f'out{worker}.csv'), paths)))
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    dictionary = load_project_dictionary('demo', index_dir)
+    for worker in range(4):
+        written = pd.read_csv(tmp_path / f'out{worker}.csv')
+        assert [dictionary.ids[path] for path in written['Path']] == written['FileID'].tolist()
+    assert len(dictionary.paths) == 1 + 4 * 50
+
+
+def test_unlocked_save_of_clashing_ids_raises(tmp_path):
+    index_dir = str(tmp_path / 'index')
+    stale = load_project_dictionary('demo', index_dir)
+    stale.intern('a.py')
+    with project_dictionary('demo', index_dir) as dictionary:
+        dictionary.intern('b.py')
+
+    with pytest.raises(RuntimeError):
+        save_project_dictionary(stale, index_dir)
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Schemas import load_csv, apply_schema
+
+
+def write_csv(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_columns_outside_the_schema_survive(tmp_path):
+    csv_file = write_csv(tmp_path / 'final.csv',
+                         'TestFile,Assertion Roulette,Is_Faulty,ProdIs_Faulty,ProdTotalCommits,TestFaultCount,'
+                         'Eager Test,Note\n'
+                         'a/test_x.py,2,1,0,7,3,4,flaky\n')
+
+    df = load_csv(csv_file, 'final')
+
+    assert df.columns.tolist() == ['TestFile', 'Assertion Roulette', 'Is_Faulty', 'ProdIs_Faulty',
+                                   'ProdTotalCommits', 'TestFaultCount', 'Eager Test', 'Note']
+    row = df.iloc[0]
+    assert (row['ProdIs_Faulty'], row['ProdTotalCommits'], row['TestFaultCount'], row['Eager Test']) == (0, 7, 3, 4)
+    assert row['Note'] == 'flaky'
+    # Typed columns still follow the schema
+    assert str(df['Is_Faulty'].dtype) == 'int8'
+    assert str(df['Assertion Roulette'].dtype) == 'int32'
+
+
+def test_boolean_strings_are_parsed_not_dropped(tmp_path):
+    csv_file = write_csv(tmp_path / 'final.csv', 'TestFile,Is_Faulty\na.py,True\nb.py,false\nc.py,1\n')
+
+    df = load_csv(csv_file, 'final')
+
+    assert df['Is_Faulty'].tolist() == [1, 0, 1]
+    assert not df['Is_Faulty'].hasnans
+
+
+def test_apply_schema_keeps_extra_columns_and_reads_booleans():
+    import pandas as pd
+    frame = pd.DataFrame({'TestFile': ['a.py', 'b.py'], 'Is_Faulty': ['True', False], 'Note': ['x', 'y']})
+
+    df = apply_schema(frame, 'final')
+
+    assert df.columns.tolist() == ['TestFile', 'Is_Faulty', 'Note']
+    assert df['Is_Faulty'].tolist() == [1, 0]
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import signal
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from WorkQueue import WorkQueue, _read_json
+
+
+def expire(queue, name):
+    """Age a lease's heartbeat past the queue's timeout."""
+    past = time.time() - queue.lease_timeout - 60
+    os.utime(queue._path('leases', name), (past, past))
+
+
+def test_lease_reclaimed_mid_run_is_released_not_completed(tmp_path):
+    # Heartbeats far apart, so the test decides when the first worker renews
+    first = WorkQueue(str(tmp_path), lease_timeout=5, heartbeat_interval=3600, worker_id='first')
+    second = WorkQueue(str(tmp_path), lease_timeout=5, heartbeat_interval=3600, worker_id='second')
+    first.enqueue('repo')
+
+    lease = first.claim()
+    assert lease.name == 'repo'
+
+    # The first worker stalls past the timeout and the second takes the task over
+    expire(first, 'repo')
+    taken_over = second.claim()
+    assert taken_over is not None and taken_over.name == 'repo'
+
+    # The first worker's next heartbeat notices, and its block exits normally
+    assert not lease.renew()
+    lease.lost = True
+    with lease:
+        pass
+
+    assert not os.path.exists(first._path('done', 'repo'))
+    assert _read_json(first._path('leases', 'repo'))['token'] == taken_over.token
+
+    taken_over.complete(rows=1)
+    assert _read_json(second._path('done', 'repo'))['worker'] == 'second'
+    assert not os.path.exists(second._path('leases', 'repo'))
+
+
+def test_reclaim_does_not_replace_a_newer_lease(tmp_path):
+    queue = WorkQueue(str(tmp_path), lease_timeout=5, heartbeat_interval=3600)
+    queue.enqueue('repo')
+    lease = queue.claim()
+    lease_file = queue._path('leases', 'repo')
+
+    # A renewed lease survives a reclaim pass
+    assert queue.reclaim_expired() == []
+    assert lease.renew()
+
+    # An expired one is removed, and a lease file left behind is never a temp file
+    expire(queue, 'repo')
+    assert queue.reclaim_expired() == ['repo']
+    assert not lease.renew()
+    assert not os.path.exists(lease_file)
+    assert [name for name in os.listdir(os.path.dirname(lease_file)) if name.endswith('.tmp')] == []
+    lease.release()
+
+
+# A queue worker run in its own process: writes `rows` rows per task through a
+# CheckpointedCSV that stops once the lease is lost, logging every completion
+WORKER = '''
+import os, sys, time
+sys.path.insert(0, {repo!r})
+from WorkQueue import WorkQueue
+from Checkpoint import CheckpointedCSV, RunCancelled
+
+queue_dir, output_dir, name, rows, delay = sys.argv[1:6]
+queue = WorkQueue(queue_dir, lease_timeout=1.0, heartbeat_interval=0.2, worker_id=name)
+for lease in queue.work(poll_interval=0.1):
+    with lease:
+        output = CheckpointedCSV(os.path.join(output_dir, lease.name + '.csv'), ['Row', 'Worker'], 'Row',
+                                 batch_size=1, cancelled=lambda: not lease.held())
+        try:
+            with output:
+                for row in range(int(rows)):
+                    if str(row) not in output.done:
+                        output.write([row, name])
+                        time.sleep(float(delay))
+                output.commit()
+        except RunCancelled:
+            lease.release()
+            continue
+        if lease.complete():
+            with open(os.path.join(output_dir, 'completions.log'), 'a') as f:
+                f.write(lease.name + ' ' + name + chr(10))
+'''
+
+
+def start_worker(tmp_path, name, rows, delay):
+    script = WORKER.format(repo=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return subprocess.Popen([sys.executable, '-c', script, str(tmp_path / 'queue'), str(tmp_path / 'out'),
+                             name, str(rows), str(delay)])
+
+
+def wait_for(condition, timeout=20):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.05)
+
+
+def test_stalled_worker_is_reclaimed_and_never_completes(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue'), lease_timeout=1.0)
+    for name in ['repo', 'other']:
+        queue.enqueue(name)
+    os.makedirs(tmp_path / 'out')
+    partial_file = tmp_path / 'out' / 'repo.csv.partial'
+
+    # The first worker stalls in the middle of 'repo' long enough for its lease to expire
+    stalled = start_worker(tmp_path, 'stalled', rows=40, delay=0.05)
+    wait_for(lambda: partial_file.exists() and len(partial_file.read_text().splitlines()) > 5)
+    os.kill(stalled.pid, signal.SIGSTOP)
+    time.sleep(1.5)
+
+    # Another worker reclaims it, and the stalled one wakes up while it is being redone
+    rescuer = start_worker(tmp_path, 'rescuer', rows=40, delay=0.05)
+    wait_for(lambda: (_read_json(queue._path('leases', 'repo')) or {}).get('worker') == 'rescuer')
+    time.sleep(0.3)
+    os.kill(stalled.pid, signal.SIGCONT)
+
+    assert rescuer.wait(timeout=30) == 0
+    assert stalled.wait(timeout=30) == 0
+
+    completions = (tmp_path / 'out' / 'completions.log').read_text().split('\n')[:-1]
+    assert sorted(line.split()[0] for line in completions) == ['other', 'repo']
+    assert 'repo rescuer' in completions
+    assert _read_json(queue._path('done', 'repo'))['worker'] == 'rescuer'
+    assert queue.counts()['done'] == 2
+
+    # Every row once, and none written by the stalled worker after it lost the task
+    rows = (tmp_path / 'out' / 'repo.csv').read_text().split('\n')[1:-1]
+    assert sorted(int(row.split(',')[0]) for row in rows) == list(range(40))
+    workers = [row.split(',')[1] for row in rows]
+    assert workers == sorted(workers, key=lambda worker: worker == 'rescuer')